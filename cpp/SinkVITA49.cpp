@@ -65,6 +65,50 @@ const int UDP_HEADER_SIZE = 8;				// Mandatory
 const int TCP_HEADER_SIZE = 20;				// Mandatory
 // TCP options has range of 0-40 bytes		// Optional
 
+// Longest a transmit session waits for queued packets to go out before closing
+const long QUEUE_DRAIN_TIMEOUT_MS = 1000;
+// Longest an idle transmit thread waits for work before checking whether to stop
+const long IDLE_WAIT_MS = 100;
+
+// Largest UDP payload, and the largest VRL frame (a 20-bit count of words)
+const size_t UDP_MAX_PAYLOAD_SIZE = IPV4_MAX_PACKET_SIZE - IPV4_HEADER_SIZE - UDP_DATAGRAM_HEADER_SIZE;
+const size_t VRL_MAX_FRAME_SIZE = 0xFFFFF * 4;
+
+// AF_PACKET transmit ring
+const unsigned int PACKET_RING_FRAMES = 1024;
+
+// Shared-memory ring slots hold the largest packet (payloads stop at 65503 bytes) in a VRL frame
+const unsigned int SHM_RING_SLOT_SIZE = 65536 + VRL_FRAME_SIZE;
+
+// Input ports, indexed in polling order by servicePort()
+const int NUM_INPUT_PORTS = 6;
+
+// Consecutive failed sends that take a transmit link out of service
+const int TRANSMIT_LINK_MAX_FAILURES = 16;
+
+// A paced transmit thread sleeps until this close to a packet's time, then spins
+const double PACING_SPIN_SECONDS = 100e-6;
+
+// Longest single sleep while pacing, so stop() is not held up by a far-off packet
+const double PACING_MAX_SLEEP_SECONDS = 0.1;
+
+// Paced packets sent later than this count as late
+const double PACING_LATE_SECONDS = 1e-3;
+
+// Seconds on a clock that never jumps, for deadlines
+static double monotonic_seconds() {
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return now.tv_sec + now.tv_nsec * 1e-9;
+}
+
+// Seconds since the epoch, to compare with packet timestamps
+static double realtime_seconds() {
+    struct timespec now;
+    clock_gettime(CLOCK_REALTIME, &now);
+    return now.tv_sec + now.tv_nsec * 1e-9;
+}
+
 /************************************************
  * Constructor
  *
@@ -77,10 +121,7 @@ SinkVITA49_base(uuid, label) {
 
 void SinkVITA49_i::__constructor__() {
 
-    timeOut = 1;
-
     _transmitThread = NULL;
-    _contextThread = NULL;
     //set ip address range for multicast
     lowMulti = inet_network("224.0.0.1");
     highMulti = inet_network("239.255.255.250");
@@ -88,6 +129,14 @@ void SinkVITA49_i::__constructor__() {
     multicast = true;
     waitingForSRI = true;
     shouldUpdateStream = false;
+    shouldRetarget = false;
+    shouldResizePayload = false;
+    leftOverDeadline = 0;
+    activePort = -1;
+    _defaultThreadDelay = getThreadDelay();
+    transportSwapPending = false;
+    pendingSock = -1;
+    _outputConnections = 0;
 
     createMem = true;
     numBuffers = 200000;
@@ -99,6 +148,12 @@ void SinkVITA49_i::__constructor__() {
     //initialize the _streamDef to some settings
 
     spareBuffer = NULL;
+    spareBufferSize = 0;
+    blankPacket = new BasicDataPacket();
+    interfaceMtu = 0;
+    automaticPayloadSize = 0;
+    _sampleSize = 0;
+    _signedPort = false;
 
     // t(io, boost::posix_time::seconds(5));
     convertEndian = false;
@@ -113,6 +168,51 @@ void SinkVITA49_i::__constructor__() {
     unicast_udp_open = false;
     unicast_tcp_open = false;
     multicast_udp_open = false;
+    tcp_server.sock = -1;
+    tcp_client.sock = -1;
+    useGso = false;
+    precomputeCrc = false;
+    packetRing = NULL;
+    shmRing = NULL;
+    shardBatchSize = 1;
+    strictStreamOrder = true;
+    shardFrameCounter = 0;
+    pacingMode = PACING_OFF;
+    pacingOffset = 0;
+    pacingAnchored = false;
+    pacingAnchor = 0;
+    memset(&pacingLateness, 0, sizeof(pacingLateness));
+    pacingLate = 0;
+    captureRing = NULL;
+    pacing_status.packets = 0;
+    pacing_status.late = 0;
+    pacing_status.lateness_mean = 0;
+    pacing_status.lateness_p50 = 0;
+    pacing_status.lateness_p99 = 0;
+    pacing_status.lateness_max = 0;
+    linkStatusTime = 0;
+    txTimestamps = NULL;
+    transmit_timing.timestamps = 0;
+    transmit_timing.missed = 0;
+    transmit_timing.hardware = false;
+    transmit_timing.latency_mean = 0;
+    transmit_timing.latency_p50 = 0;
+    transmit_timing.latency_p99 = 0;
+    transmit_timing.latency_max = 0;
+    transmit_timing.spacing_mean = 0;
+    transmit_timing.spacing_p50 = 0;
+    transmit_timing.spacing_p99 = 0;
+    transmit_timing.spacing_max = 0;
+    connection_status.packet_size = 0;
+    connection_status.payload_size = 0;
+    connection_status.mtu = 0;
+    connection_status.shared_memory_lag = 0;
+    connection_status.shared_memory_drops = 0;
+    connection_status.transmit_system_calls = 0;
+    connection_status.transmit_errors = 0;
+    connection_status.ready = false;
+    retiredBackendCalls = 0;
+    retiredBackendErrors = 0;
     
     this->dataVITA49_out->setLogger(this->__logger);
     
@@ -122,6 +222,9 @@ void SinkVITA49_i::__constructor__() {
     addPropertyChangeListener("VITA49IFDataPacket", this, &SinkVITA49_i::vita49IFDataPacketChanged);
     addPropertyChangeListener("VITA49IFContextPacket", this, &SinkVITA49_i::vita49IFContextPacketChanged);
     addPropertyChangeListener("advanced_configuration", this, &SinkVITA49_i::advancedConfigurationChanged);
+    addPropertyChangeListener("stripe_links", this, &SinkVITA49_i::stripeLinksChanged);
+    dataVITA49_out->setNewConnectListener(this, &SinkVITA49_i::outputConnected);
+    dataVITA49_out->setNewDisconnectListener(this, &SinkVITA49_i::outputDisconnected);
 }
 
 void SinkVITA49_i::resetCurrAttach() {
@@ -189,21 +292,27 @@ void SinkVITA49_i::initialize_values() {
     //	_streamMap.clear();
 
     burstPacketCount = 0;
+    multicast = false;
+    _dataRef = BYTE_ORDER;
+    _throttleTime = 0;
+    vita49_payload_size = 1428;
+
+    resetStreamState();
+}
+
+// Per-stream state; the transmit session and configuration outlive a stream
+void SinkVITA49_i::resetStreamState() {
     _attachMap.clear();
     remainingData = false;
-    dataIndex = 0;
     packetCount = 0;
     contextCount = 0;
     samplesPerPacket = 0;
     standardPacketClassID = "";
     leftOverDataSize = 0;
-    multicast = false;
+    leftOverOffset = 0;
 
-    _tContext.tfsec = 0.0;
-    _tContext.twsec = 0.0;
-    _dataRef = BYTE_ORDER;
-    _throttleTime = 0;
-    vita49_payload_size = 1428;
+    contextPending = false;
+    nextContextDeadline = 0;
 
     waitingForSRI = true;
 }
@@ -221,14 +330,17 @@ SinkVITA49_i::~SinkVITA49_i(void) {
         delete temp2;
     }
     boost::mutex::scoped_lock lock2(workQueueLock);
-    while (!workQueue2.empty()) {
-        temp2 = workQueue2.front();
-        workQueue2.pop();
+    while (!workQueueEmpty()) {
+        temp2 = workQueueFront();
+        popWorkQueue(false);
         delete temp2;
     }
     if (spareBuffer != NULL)
         free(spareBuffer);
+    delete blankPacket;
     delete pf;
+    if (captureRing != NULL)
+        capture_ring_close(captureRing);
    
     VITAProcess.IFCPacket.class_identifier = CORBA::string_dup("");
     VITAProcess.IFCPacket.device_identifier = CORBA::string_dup("");
@@ -239,12 +351,14 @@ void SinkVITA49_i::memoryManagement(int maxPacketLength) {
     if (spareBuffer != NULL)
         free(spareBuffer);
     spareBuffer = (char*) malloc(sizeof (char)*(maxPacketLength + 20 + 8));
+    spareBufferSize = maxPacketLength;
     createMem = false;
 
 }
 
 void SinkVITA49_i::start() throw (CF::Resource::StartError, CORBA::SystemException) {
     boost::mutex::scoped_lock runLock(startstop_lock);
+    prewarm();
     SinkVITA49_base::start();
 }
 
@@ -252,18 +366,168 @@ void SinkVITA49_i::stop() throw (CF::Resource::StopError, CORBA::SystemException
     boost::mutex::scoped_lock runLock(startstop_lock);
 
     SinkVITA49_base::stop();
-    
-    if (unicast_udp_open) {
-        close(uni_server.sock);
-        unicast_udp_open = false;
+
+    tearDownOutputStream();
+    endTransmitSession();
+    updateReadiness();
+    if (advanced_configuration.tracing && !advanced_configuration.trace_dump_file.empty())
+        dumpTrace();
+}
+
+/* Writes the trace records held to trace_dump_file */
+void SinkVITA49_i::dumpTrace() {
+    long records = trace_dump(advanced_configuration.trace_dump_file.c_str());
+    if (records < 0) {
+        LOG_WARN(SinkVITA49_i, "Unable to write the trace to '" << advanced_configuration.trace_dump_file << "': " << strerror(errno));
+    } else {
+        LOG_INFO(SinkVITA49_i, "Wrote " << records << " trace records to '" << advanced_configuration.trace_dump_file << "'");
     }
+}
 
-    if (unicast_tcp_open) {
-        unicast_tcp_open = false;
+/* Replaces the capture ring with an empty one of the configured size */
+void SinkVITA49_i::openCapture() {
+    long snap = advanced_configuration.capture_snap_length;
+    if (snap <= 0 || snap > 0xFFFF)
+        snap = 0xFFFF;
+    boost::mutex::scoped_lock lock(captureLock);
+    if (captureRing != NULL)
+        capture_ring_close(captureRing);
+    captureRing = NULL;
+    if (advanced_configuration.capture_packets > 0) {
+        captureRing = capture_ring_open(advanced_configuration.capture_packets, snap);
+        if (captureRing == NULL)
+            LOG_WARN(SinkVITA49_i, "Unable to allocate a capture ring of " << advanced_configuration.capture_packets << " packets");
     }
+}
 
-    tearDownOutputStream();
+/* Copies packets just sent into the capture ring, one per iovec */
+void SinkVITA49_i::capturePackets(const struct iovec *iov, size_t count) {
+    if (captureRing == NULL)
+        return;
+    boost::mutex::scoped_lock lock(captureLock);
+    if (captureRing != NULL)
+        capture_ring_add(captureRing, iov, count);
+}
 
+void SinkVITA49_i::captureFrame(void *frame, size_t length) {
+    struct iovec iov;
+    iov.iov_base = frame;
+    iov.iov_len = length;
+    capturePackets(&iov, 1);
+}
+
+/* The capture ring as a pcap file; empty without one */
+void SinkVITA49_i::buildCapture(std::vector<unsigned char> &pcap) {
+    struct sockaddr_in src, dst;
+    memset(&src, 0, sizeof(src));
+    memset(&dst, 0, sizeof(dst));
+    dst.sin_addr.s_addr = inet_addr(curr_attach.ip_address.c_str());
+    dst.sin_port = htons(curr_attach.port);
+    boost::mutex::scoped_lock lock(captureLock);
+    if (captureRing == NULL) {
+        pcap.clear();
+        return;
+    }
+    pcap.resize(capture_ring_pcap(captureRing, &src, &dst, NULL));
+    capture_ring_pcap(captureRing, &src, &dst, &pcap[0]);
+}
+
+/* Writes the capture ring to capture_dump_file */
+void SinkVITA49_i::dumpCapture() {
+    std::vector<unsigned char> pcap;
+    buildCapture(pcap);
+    const std::string &path = advanced_configuration.capture_dump_file;
+    FILE *file = fopen(path.c_str(), "w");
+    bool written = file != NULL && fwrite(&pcap[0], 1, pcap.size(), file) == pcap.size();
+    if (file != NULL && fclose(file) != 0)
+        written = false;
+    if (!written) {
+        LOG_WARN(SinkVITA49_i, "Unable to write the packet capture to '" << path << "': " << strerror(errno));
+    } else {
+        LOG_INFO(SinkVITA49_i, "Wrote " << pcap.size() << " bytes of captured packets to '" << path << "'");
+    }
+}
+
+/* packet_capture is built from the capture ring when it is asked for */
+void SinkVITA49_i::query(CF::Properties &configProperties) throw (CF::UnknownProperties, CORBA::SystemException) {
+    bool wanted = configProperties.length() == 0;
+    for (CORBA::ULong i = 0; i < configProperties.length() && !wanted; i++)
+        wanted = strcmp(configProperties[i].id, "packet_capture") == 0;
+    if (wanted) {
+        std::vector<unsigned char> pcap;
+        buildCapture(pcap);
+        boost::mutex::scoped_lock lock(propertySetAccess);
+        packet_capture.swap(pcap);
+    }
+    SinkVITA49_base::query(configProperties);
+}
+
+/* Does the setup the first packets would otherwise wait for, before the
+ * service thread runs: the sample accumulator and the packet pool are
+ * allocated and touched, and with prewarm the transmit session is opened
+ * without waiting for a connection. */
+void SinkVITA49_i::prewarm() {
+    if (createMem)
+        memoryManagement(maxPayloadSize());
+    memset(spareBuffer, 0, spareBufferSize);
+
+    // Fill the pool with packets already grown to a full payload
+    long buffers = 0;
+    {
+        boost::mutex::scoped_lock lock(BankLock);
+        while ((long) Bank2.size() < (long) advanced_configuration.number_of_buffers) {
+            BasicDataPacket *pkt = new BasicDataPacket();
+            pkt->setPayloadLength(maxPayloadSize());
+            pkt->bbuf = blankPacket->bbuf;
+            Bank2.push(pkt);
+            buffers++;
+        }
+    }
+
+    if (prewarmTransport() && _transmitThread == NULL) {
+        updateCurrAttach();
+        launch_tx_thread();
+    }
+    updateReadiness();
+    LOG_DEBUG(SinkVITA49_i, "Prewarmed " << buffers << " packet buffers and a " << spareBufferSize << " byte accumulator" << (_transmitThread != NULL ? "; transmit session open" : ""));
+}
+
+/* With prewarm, the transmit session stays open whether or not anyone is
+ * connected; TCP waits for its client, so it opens on the first connection */
+bool SinkVITA49_i::prewarmTransport() {
+    return advanced_configuration.prewarm && (network_settings.use_udp_protocol || !advanced_configuration.shared_memory_name.empty());
+}
+
+void SinkVITA49_i::updateReadiness() {
+    connection_status.ready = !createMem && _transmitThread != NULL;
+}
+
+/* A data packet from the pool, or a new one when the pool is empty */
+BasicDataPacket* SinkVITA49_i::takePacket() {
+    {
+        boost::mutex::scoped_lock lock(BankLock);
+        if (!Bank2.empty()) {
+            BasicDataPacket *pkt = static_cast<BasicDataPacket*>(Bank2.front());
+            Bank2.pop();
+            return pkt;
+        }
+    }
+    return new BasicDataPacket();
+}
+
+/* Returns a sent data packet to the pool, keeping its buffer's capacity;
+ * context packets, and data packets the pool has no room for, are freed */
+void SinkVITA49_i::recyclePacket(BasicVRTPacket *vrtPacket) {
+    BasicDataPacket *pkt = dynamic_cast<BasicDataPacket*>(vrtPacket);
+    if (pkt != NULL) {
+        boost::mutex::scoped_lock lock(BankLock);
+        if ((long) Bank2.size() < (long) advanced_configuration.number_of_buffers) {
+            pkt->bbuf = blankPacket->bbuf;
+            Bank2.push(pkt);
+            return;
+        }
+    }
+    delete vrtPacket;
 }
 
 void SinkVITA49_i::updateCurrAttach() {
@@ -298,7 +562,7 @@ void SinkVITA49_i::networkSettingsChanged(const network_settings_struct* oldVal,
       }
       }
     }
-    shouldUpdateStream = true;
+    shouldRetarget = true;
 }
 
 void SinkVITA49_i::vita49EncapsulationChanged(const VITA49Encapsulation_struct* oldVal,
@@ -306,6 +570,7 @@ void SinkVITA49_i::vita49EncapsulationChanged(const VITA49Encapsulation_struct*
     boost::mutex::scoped_lock lock(property_lock);
     VITAProcess.Encap.enable_crc = VITA49Encapsulation.enable_crc;
     VITAProcess.Encap.enable_vrl_frames = VITA49Encapsulation.enable_vrl_frames;   
+    VITAProcess.Encap.max_frame_size = VITA49Encapsulation.max_frame_size;
 }
 
 void SinkVITA49_i::vita49IFDataPacketChanged(const VITA49IFDataPacket_struct* oldVal,
@@ -360,8 +625,52 @@ void SinkVITA49_i::advancedConfigurationChanged(const advanced_configuration_str
     else
         vita49_payload_size = advanced_configuration.max_payload_size;
 
+    // Switching sizing modes resizes the active stream when the TX thread is relaunched
+    if (oldVal->auto_payload_size != newVal->auto_payload_size)
+        shouldUpdateStream = true;
+
+    // Packet sizing for the active stream changes without relaunching the session
+    if (oldVal->target_packet_rate != newVal->target_packet_rate)
+        shouldResizePayload = true;
+
+    if (oldVal->capture_packets != newVal->capture_packets || oldVal->capture_snap_length != newVal->capture_snap_length)
+        openCapture();
+    if (!advanced_configuration.capture_dump_file.empty() && oldVal->capture_dump_file != newVal->capture_dump_file)
+        dumpCapture();
+
+    trace_enable(advanced_configuration.tracing, std::max<long>(advanced_configuration.trace_records, 1));
+    if (!advanced_configuration.trace_dump_file.empty() && oldVal->trace_dump_file != newVal->trace_dump_file)
+        dumpTrace();
+
+    // Packets queued from here on are due under the new pacing
+    {
+        boost::mutex::scoped_lock queueLock(workQueueLock);
+        if (advanced_configuration.transmit_pacing == "timestamp")
+            pacingMode = PACING_TIMESTAMP;
+        else if (advanced_configuration.transmit_pacing == "relative")
+            pacingMode = PACING_RELATIVE;
+        else
+            pacingMode = PACING_OFF;
+        pacingOffset = advanced_configuration.pacing_offset;
+        pacingAnchored = false;
+    }
+
+    // Wake often enough to honour the latency bound while no data arrives
+    if (advanced_configuration.max_packet_latency > 0)
+        setThreadDelay(std::min(_defaultThreadDelay, advanced_configuration.max_packet_latency / 2000.0f));
+    else
+        setThreadDelay(_defaultThreadDelay);
+
+    // The transmit session persists across streams, so transport changes relaunch it
+    if (oldVal->udp_gso != newVal->udp_gso || oldVal->packet_mmap != newVal->packet_mmap ||
+        oldVal->destination_mac != newVal->destination_mac || oldVal->precompute_crc != newVal->precompute_crc ||
+        oldVal->shared_memory_name != newVal->shared_memory_name || oldVal->shared_memory_slots != newVal->shared_memory_slots ||
+        oldVal->transmit_threads != newVal->transmit_threads || oldVal->transmit_batch_size != newVal->transmit_batch_size ||
+        oldVal->strict_stream_order != newVal->strict_stream_order || oldVal->tx_timestamping != newVal->tx_timestamping ||
+        oldVal->transmit_backend != newVal->transmit_backend || oldVal->transmit_queue_depth != newVal->transmit_queue_depth)
+        shouldUpdateStream = true;
+
     _bulkioPriority = advanced_configuration.use_bulkio_sri;
-    timeOut = advanced_configuration.time_between_context_packets;
     burstPacketCount = (int) advanced_configuration.number_of_packets_in_burst;
     _throttleTime = (int) advanced_configuration.throttle_time_between_packet_bursts;
     
@@ -372,20 +681,32 @@ void SinkVITA49_i::advancedConfigurationChanged(const advanced_configuration_str
     //}
 }
 
+void SinkVITA49_i::stripeLinksChanged(const std::vector<stripe_link_struct> *oldVal,
+                                      const std::vector<stripe_link_struct> *newVal) {
+    // Links are opened with the transmit session
+    if (*oldVal != *newVal)
+        shouldUpdateStream = true;
+}
+
 void SinkVITA49_i::destroy_tx_thread() {
     if (_transmitThread != NULL) {
         LOG_DEBUG(SinkVITA49_i, "DESTROYING TX THREAD");
-        runThread = false;
+        {
+            boost::mutex::scoped_lock lock(workQueueLock);
+            runThread = false;
+            workQueued.notify_all();
+        }
         _transmitThread->join();
         delete _transmitThread;
         _transmitThread = NULL;
     }
-    if (_contextThread != NULL) {
-        LOG_DEBUG(SinkVITA49_i, "DESTROYING CONTEXT THREAD");
-        runThread = false;
-        _contextThread->join();
-        delete _contextThread;
-        _contextThread = NULL;
+    if (packetRing != NULL) {
+        packet_ring_close(packetRing);
+        packetRing = NULL;
+    }
+    if (shmRing != NULL) {
+        shm_ring_close(shmRing);
+        shmRing = NULL;
     }
     curr_attach.attach = false;
 }
@@ -394,21 +715,43 @@ bool SinkVITA49_i::launch_tx_thread() {
     packetCount = 0;
     destroy_tx_thread();
     LOG_DEBUG(SinkVITA49_i, "STARTING TX THREAD");
-    /* build the iterface string */
-    std::ostringstream iface;
-    iface << curr_attach.eth_dev;
-    //connect to VLAN
-    if (curr_attach.vlan != 0) {
-        iface << "." << curr_attach.vlan;
-    }
-
     in_addr_t attachedIP = inet_network(curr_attach.ip_address.c_str());
     const char *attachedIPstr = curr_attach.ip_address.c_str();
-    std::string attachedInterfaceStr = iface.str();
+    std::string attachedInterfaceStr = outputInterface();
     const char *attachedInterface = attachedInterfaceStr.c_str();
+    bool multicastAddress = (attachedIP > lowMulti && attachedIP < highMulti && !curr_attach.ip_address.empty());
+
+    // Co-located consumers read frames from shared memory; no sockets are opened
+    if (!advanced_configuration.shared_memory_name.empty()) {
+        LOG_DEBUG(SinkVITA49_i, "Enabling shm_ring_server " << advanced_configuration.shared_memory_name);
+        try {
+            shmRing = shm_ring_server(advanced_configuration.shared_memory_name.c_str(), SHM_RING_SLOT_SIZE,
+                                      std::max<long>(advanced_configuration.shared_memory_slots, 1));
+        } catch (std::exception &e) {
+            LOG_ERROR(SinkVITA49_i, "Unable to create shared-memory ring '" << advanced_configuration.shared_memory_name << "' (" << e.what() << ")");
+            shmRing = NULL;
+            return false;
+        }
+        multicast = false;
+    }
+
+    // The packet ring tags VLAN frames itself, so it opens on the physical device
+    if (shmRing == NULL && advanced_configuration.packet_mmap && !curr_attach.ip_address.empty() && (multicastAddress || curr_attach.use_udp_protocol)) {
+        LOG_DEBUG(SinkVITA49_i, "Enabling packet_ring_server on " << curr_attach.eth_dev << " vlan " << curr_attach.vlan << " " << attachedIPstr << " " << curr_attach.port);
+        try {
+            packetRing = packet_ring_server(curr_attach.eth_dev.c_str(), curr_attach.vlan, NULL,
+                                            advanced_configuration.destination_mac.c_str(), attachedIPstr, curr_attach.port, PACKET_RING_FRAMES);
+            multicast = multicastAddress;
+        } catch (std::exception &e) {
+            LOG_WARN(SinkVITA49_i, "Unable to open a packet ring on '" << curr_attach.eth_dev << "' (" << e.what() << "), using a UDP socket");
+            packetRing = NULL;
+        }
+    }
 
     //check to see if this a multicast address or not
-    if (attachedIP > lowMulti && attachedIP < highMulti && !curr_attach.ip_address.empty()) {
+    if (packetRing != NULL || shmRing != NULL) {
+        // Sockets are not needed; the ring carries all traffic
+    } else if (multicastAddress) {
         LOG_DEBUG(SinkVITA49_i, "Enabling multicast_client on " << attachedInterface << " " << attachedIPstr << " " << curr_attach.port);
         multi_server = multicast_server(attachedInterface, attachedIPstr, curr_attach.port);
         if (multi_server.sock < 0) {
@@ -434,155 +777,1055 @@ bool SinkVITA49_i::launch_tx_thread() {
             unicast_tcp_open = true;
         }
     }
+
+    // Resize the active stream for the (possibly new) interface
+    if (advanced_configuration.auto_payload_size) {
+        updateInterfaceMtu();
+    }
+    if (hasActiveOutputStream() && !waitingForSRI && _sampleSize > 0) {
+        createPayload(_sampleSize, _signedPort);
+    }
+
+    precomputeCrc = advanced_configuration.precompute_crc;
+    crcCountTerms.length = 0;
+    useGso = false;
+    if (packetRing == NULL && shmRing == NULL && advanced_configuration.udp_gso && advanced_configuration.transmit_backend == "socket" &&
+        (multicast || curr_attach.use_udp_protocol) && !curr_attach.ip_address.empty()) {
+        useGso = udp_gso_supported(multicast ? multi_server.sock : uni_server.sock);
+        if (!useGso)
+            LOG_WARN(SinkVITA49_i, "UDP segmentation offload is not supported by this kernel, sending one datagram at a time");
+    }
+
+    if (packetRing == NULL && shmRing == NULL && (multicast || curr_attach.use_udp_protocol) && !curr_attach.ip_address.empty() &&
+        (advanced_configuration.transmit_threads > 1 || !stripe_links.empty()))
+        openTransmitLinks();
+    shardBatchSize = std::max<long>(advanced_configuration.transmit_batch_size, 1);
+    strictStreamOrder = advanced_configuration.strict_stream_order;
+    shardFrameCounter = 0;
+    streamsInFlight.clear();
+    retiredBackendCalls = 0;
+    retiredBackendErrors = 0;
     runThread = true;
 
-    // Create context thread BEFORE transmit thread so that context packet is the
-    // first packet that gets sent
-    if (timeOut > 0)
-        _contextThread = new boost::thread(&SinkVITA49_i::timerThread, this);
-    if (multicast)
-        _transmitThread = new boost::thread(&SinkVITA49_i::TRANSMITTER_M, this);
+    if (shmRing != NULL)
+        _transmitThread = new boost::thread(&SinkVITA49_i::TRANSMITTER_SHM, this);
+    else if (packetRing != NULL)
+        _transmitThread = new boost::thread(&SinkVITA49_i::TRANSMITTER_RING, this);
+    else if (!transmitLinks.empty())
+        _transmitThread = new boost::thread(&SinkVITA49_i::TRANSMITTER_SHARDED, this);
     else {
         _transmitThread = new boost::thread(&SinkVITA49_i::TRANSMITTER, this);
     }
     
     LOG_INFO(SinkVITA49_i, " =============================================================================");
-    LOG_INFO(SinkVITA49_i, " ---- TRANSMITTING PACKETS ON '" << curr_attach.eth_dev << "' AT " << curr_attach.ip_address << ":" << curr_attach.port);
+    if (shmRing != NULL) {
+        LOG_INFO(SinkVITA49_i, " ---- WRITING PACKETS TO SHARED MEMORY '" << shmRing->name << "'");
+    } else {
+        LOG_INFO(SinkVITA49_i, " ---- TRANSMITTING PACKETS ON '" << curr_attach.eth_dev << "' AT " << curr_attach.ip_address << ":" << curr_attach.port);
+    }
     LOG_INFO(SinkVITA49_i, " =============================================================================");
     return true;
 }
 
-//create a context packet every X seconds
+/* Points a running UDP session at new network_settings without stopping it.
+ * The new socket is opened alongside the old one, the transmit thread swaps
+ * to it between packets, and only then is the old socket closed and the
+ * stream definition updated. Returns false when the change needs a full
+ * relaunch (TCP, the packet ring, or switching between unicast and multicast). */
+bool SinkVITA49_i::retargetTransmitSession() {
+    if (_transmitThread == NULL)
+        return true;
+
+    network_settings_struct settings;
+    {
+        boost::mutex::scoped_lock lock(property_lock);
+        settings = network_settings;
+    }
+    in_addr_t newIP = inet_network(settings.ip_address.c_str());
+    bool newMulticast = (newIP > lowMulti && newIP < highMulti && !settings.ip_address.empty());
+    if (packetRing != NULL || !transmitLinks.empty() || unicast_tcp_open || settings.ip_address.empty() ||
+        newMulticast != multicast || !(newMulticast || settings.use_udp_protocol) ||
+        !(multicast ? multicast_udp_open : unicast_udp_open))
+        return false;
+
+    std::ostringstream iface;
+    iface << settings.interface;
+    if (settings.vlan != 0)
+        iface << "." << settings.vlan;
+    int sock;
+    struct sockaddr_in addr;
+    std::string error;
+    try {
+        if (newMulticast) {
+            multicast_t server = multicast_server(iface.str().c_str(), settings.ip_address.c_str(), settings.port);
+            sock = server.sock;
+            addr = server.addr;
+        } else {
+            unicast_t server = unicast_server(iface.str().c_str(), settings.ip_address.c_str(), settings.port);
+            sock = server.sock;
+            addr = server.addr;
+        }
+    } catch (std::exception &e) {
+        sock = -1;
+        error = e.what();
+    }
+    if (sock < 0) {
+        LOG_WARN(SinkVITA49_i, "Unable to open a socket for " << settings.ip_address << ":" << settings.port << " on '" << iface.str() << "' (" << error << "), relaunching the transmit session");
+        return false;
+    }
+
+    // Hand the new socket over; the transmit thread checks between packets
+    {
+        boost::mutex::scoped_lock lock(transportLock);
+        pendingSock = sock;
+        pendingAddr = addr;
+        transportSwapPending = true;
+        workQueued.notify_all();
+        boost::system_time timeout = boost::get_system_time() + boost::posix_time::milliseconds(QUEUE_DRAIN_TIMEOUT_MS);
+        while (transportSwapPending) {
+            if (!transportSwapped.timed_wait(lock, timeout))
+                break;
+        }
+        if (transportSwapPending) {
+            transportSwapPending = false;
+            close(pendingSock);
+            pendingSock = -1;
+            return false;
+        }
+        // pendingSock now holds the retired socket
+        close(pendingSock);
+        pendingSock = -1;
+    }
+
+    updateCurrAttach();
+    if (advanced_configuration.auto_payload_size) {
+        updateInterfaceMtu();
+        if (hasActiveOutputStream() && !waitingForSRI && _sampleSize > 0)
+            createPayload(_sampleSize, _signedPort);
+    }
+    LOG_INFO(SinkVITA49_i, " ---- NOW TRANSMITTING PACKETS ON '" << iface.str() << "' AT " << curr_attach.ip_address << ":" << curr_attach.port);
+    return true;
+}
+
+/* Called by the transmit thread between packets to pick up a new destination */
+void SinkVITA49_i::applyTransportSwap(int &sock, struct sockaddr_in &addr) {
+    boost::mutex::scoped_lock lock(transportLock);
+    if (!transportSwapPending)
+        return;
+    std::swap(sock, pendingSock);
+    std::swap(addr, pendingAddr);
+    transportSwapPending = false;
+    transportSwapped.notify_all();
+}
+
+std::string SinkVITA49_i::outputInterface() {
+    /* build the iterface string */
+    std::ostringstream iface;
+    iface << curr_attach.eth_dev;
+    //connect to VLAN
+    if (curr_attach.vlan != 0) {
+        iface << "." << curr_attach.vlan;
+    }
+    return iface.str();
+}
+
+void SinkVITA49_i::updateInterfaceMtu() {
+    std::string iface = outputInterface();
+    int mtu = interface_mtu(iface.c_str());
+    if (mtu < 0 && curr_attach.vlan != 0) {
+        // The 802.1Q tag does not count against the MTU, so the parent device's MTU applies
+        mtu = interface_mtu(curr_attach.eth_dev.c_str());
+    }
+
+    in_addr_t attachedIP = inet_network(curr_attach.ip_address.c_str());
+    if (!curr_attach.ip_address.empty() && !(attachedIP > lowMulti && attachedIP < highMulti)) {
+        int pmtu = path_mtu(iface.c_str(), curr_attach.ip_address.c_str(), curr_attach.port);
+        if (pmtu > 0 && (mtu < 0 || pmtu < mtu))
+            mtu = pmtu;
+    }
+
+    if (mtu < 0) {
+        LOG_WARN(SinkVITA49_i, "Unable to determine the MTU of '" << iface << "', assuming 1500 bytes");
+        mtu = 1500;
+    }
+    if (mtu != interfaceMtu)
+        LOG_INFO(SinkVITA49_i, "Sizing packets for an MTU of " << mtu << " bytes on '" << iface << "'");
+    interfaceMtu = mtu;
+}
+
+/* Largest payload that keeps a whole packet in one IP datagram and holds a
+ * whole number of samples (and 32-bit words, as VRT lengths are in words). */
+int SinkVITA49_i::autoPayloadSize(int size, int overhead) {
+    if (interfaceMtu <= 0)
+        updateInterfaceMtu();
+
+    int available = std::min(interfaceMtu, IPV4_MAX_PACKET_SIZE) - IPV4_HEADER_SIZE - overhead;
+    int sampleBytes = (1 * currSRI.mode + 1) * size;
+    int granularity = std::max(sampleBytes, 4);
+    if (available < granularity) {
+        LOG_WARN(SinkVITA49_i, "MTU of " << interfaceMtu << " bytes cannot carry a VITA49 sample, using max_payload_size");
+        return vita49_payload_size;
+    }
+    return (available / granularity) * granularity;
+}
+
+/* Largest payload a data packet carries before target_packet_rate: the
+ * automatic size when one is in use, otherwise max_payload_size */
+int SinkVITA49_i::maxPayloadSize() {
+    return automaticPayloadSize > 0 ? automaticPayloadSize : vita49_payload_size;
+}
+
+/* Sends a run of queued packets with one segmented (UDP GSO) send. The run
+ * continues while datagrams match the size of the first; a shorter datagram,
+ * such as the last packet of a stream or a context packet, may close the run
+ * as its final segment, so packet order is preserved. Returns the number of
+ * datagrams sent. */
+long SinkVITA49_i::transmitSegmented(int sock, const struct sockaddr_in &addr, std::vector<BasicVRLFrame*> &frames, int &frameCounter, long maxDatagrams) {
+    std::vector<BasicVRTPacket*> packets;
+    struct iovec iov[UDP_GSO_MAX_SEGMENTS];
+    size_t segmentSize = 0;
+    size_t totalBytes = 0;
+    {
+        boost::mutex::scoped_lock lock(workQueueLock);
+        while (!workQueueEmpty() && frontDue() && (long) packets.size() < maxDatagrams && packets.size() < UDP_GSO_MAX_SEGMENTS) {
+            BasicVRTPacket *vrtPacket = workQueueFront();
+            size_t length = vrtPacket->getPacketLength();
+            if (VITAProcess.Encap.enable_vrl_frames)
+                length += VRL_FRAME_SIZE;
+            if (segmentSize == 0)
+                segmentSize = length;
+            else if (length > segmentSize || totalBytes + length > UDP_GSO_MAX_BYTES)
+                break;
+
+            size_t index = packets.size();
+            if (VITAProcess.Encap.enable_vrl_frames) {
+                frameVRTPacket(frames[index], vrtPacket, frameCounter);
+                iov[index].iov_base = frames[index]->getFramePointer();
+                iov[index].iov_len = frames[index]->getFrameLength();
+            } else {
+                iov[index].iov_base = vrtPacket->getPacketPointer();
+                iov[index].iov_len = vrtPacket->getPacketLength();
+            }
+            packets.push_back(vrtPacket);
+            popWorkQueue();
+            totalBytes += length;
+            if (length < segmentSize)
+                break;
+        }
+    }
+
+    if (packets.size() > 1) {
+        timestampBegin();
+        ssize_t result = udp_gso_transmit(sock, &addr, iov, packets.size(), segmentSize);
+        if (result < 0) {
+            // EIO: no checksum offload on the device; EINVAL: segments larger than the MTU
+            LOG_WARN(SinkVITA49_i, "Segmented send failed (" << strerror(errno) << "), sending one datagram at a time");
+            useGso = false;
+            for (size_t i = 0; i < packets.size(); i++) {
+                timestampBegin();
+                timestampSent(sendto(sock, iov[i].iov_base, iov[i].iov_len, 0, (const struct sockaddr*)&addr, sizeof(addr)));
+            }
+        } else {
+            timestampSent(result);
+        }
+    } else if (packets.size() == 1) {
+        timestampBegin();
+        timestampSent(sendto(sock, iov[0].iov_base, iov[0].iov_len, 0, (const struct sockaddr*)&addr, sizeof(addr)));
+    }
+
+    TRACE(TRACE_SEND, packets.size(), totalBytes);
+    capturePackets(iov, packets.size());
+    for (size_t i = 0; i < packets.size(); i++)
+        recyclePacket(packets[i]);
+    return packets.size();
+}
+
+/* Payload carrying 1/target_packet_rate seconds of samples, so packets leave
+ * at about that rate whatever the sample rate; never larger than limit. */
+int SinkVITA49_i::ratePayloadSize(int size, int limit) {
+    if (currSRI.xdelta <= 0)
+        return limit;
+    int sampleBytes = (1 * currSRI.mode + 1) * size;
+    int granularity = std::max(sampleBytes, 4);
+    double samples = ceil(1.0 / (currSRI.xdelta * advanced_configuration.target_packet_rate));
+    double bytes = ceil(samples * sampleBytes / granularity) * granularity;
+    if (bytes >= limit)
+        return limit;
+    return (int) bytes;
+}
+
+/* The transmit thread for a UDP (unicast or multicast) or TCP socket: takes
+ * batches of packets from the work queue and hands them to the transmit
+ * backend */
+void SinkVITA49_i::TRANSMITTER() {
+    ShardBatch batch;
+    long pCount = 0;
+    std::vector<BasicVRLFrame*> gsoFrames;
+    for (int i = 0; i < UDP_GSO_MAX_SEGMENTS; i++)
+        gsoFrames.push_back(new BasicVRLFrame());
 
-void SinkVITA49_i::timerThread() {
-	long sleepAmount = (timeOut*1e6)/10;
-	while (runThread) {
-        if (!waitingForSRI) {
-            createIFContextPacket(_tContext, 0);
-            boost::this_thread::interruption_point();
+    // TODO: Right now this only accepts one connection.
+    // Should be replaced with the boost version borrowed
+    // from the Sink and Source Socket
+    if (unicast_tcp_open) {
+        if (tcp_client.sock >= 0)
+            unicast_tcp_close(tcp_client);
+    	tcp_client = unicast_tcp_accept(tcp_server);
+    }
+    int &sock = multicast ? multi_server.sock : (unicast_tcp_open ? tcp_client.sock : uni_server.sock);
+    struct sockaddr_in &addr = multicast ? multi_server.addr : (unicast_tcp_open ? tcp_client.addr : uni_server.addr);
+    // TCP frames are bounded only by the property
+    size_t maxFrameSize = unicast_tcp_open ? VRL_MAX_FRAME_SIZE : UDP_MAX_PAYLOAD_SIZE;
+    transmit_backend_t *backend = openTransmitBackend(sock, unicast_tcp_open, addr);
+    openTimestamps(sock, unicast_tcp_open);
+
+    while (runThread) {
+        boost::this_thread::interruption_point();
+        if (transportSwapPending) {
+            // Sends still in flight finish on the old socket before it is closed
+            closeTransmitBackend(backend);
+            applyTransportSwap(sock, addr);
+            backend = openTransmitBackend(sock, false, addr);
+            openTimestamps(sock, false);
         }
-        for (int i =0; i<10;i++) {
-        	if (not(runThread))
-        		break;
-        	usleep(sleepAmount);
+        if (workQueueEmpty()) {
+            // Sends completing while idle are reaped when the wait times out
+            if (!waitForWork())
+                transmit_backend_poll(backend, 0);
+            continue;
         }
+        paceQueue();
+        if (_throttleTime > 0 && pCount >= burstPacketCount) {
+            pCount = 0;
+            usleep(_throttleTime);
+        }
+        long maxDatagrams = (_throttleTime > 0) ? std::max(burstPacketCount - pCount, 1L) : shardBatchSize;
+        if (useGso && !packingFrames()) {
+            pCount += transmitSegmented(sock, addr, gsoFrames, shardFrameCounter, std::min<long>(maxDatagrams, UDP_GSO_MAX_SEGMENTS));
+            continue;
+        }
+        size_t count = claimShardBatch(batch, std::min(maxDatagrams, shardBatchSize), maxFrameSize);
+        if (count == 0)
+            continue;
+        timestampBegin();
+        ssize_t sent = transmit_backend_send(backend, &batch.iov[0], count);
+        size_t bytes = 0;
+        for (ssize_t i = 0; i < sent; i++)
+            bytes += batch.iov[i].iov_len;
+        timestampSent(sent < 0 ? sent : bytes, std::max<ssize_t>(sent, 0));
+        TRACE(TRACE_SEND, sent, bytes);
+        if (sent > 0)
+            capturePackets(&batch.iov[0], sent);
+        releaseShardBatch(batch);
+        pCount += batch.packetCount;
     }
+    closeTransmitBackend(backend);
+    closeTimestamps();
+    for (size_t i = 0; i < batch.frames.size(); i++)
+        delete batch.frames[i];
+    for (size_t i = 0; i < gsoFrames.size(); i++)
+        delete gsoFrames[i];
 }
 
-void SinkVITA49_i::TRANSMITTER_M() {
+/* Opens the configured transmit backend on a transmit thread's socket, or
+ * plain socket calls when it is not available */
+transmit_backend_t* SinkVITA49_i::openTransmitBackend(int sock, bool tcp, const struct sockaddr_in &addr) {
+    std::string name = advanced_configuration.transmit_backend;
+    unsigned int depth = std::max<long>(advanced_configuration.transmit_queue_depth, 1);
+    transmit_backend_t *backend = transmit_backend_open(name.c_str(), sock, tcp, &addr, depth);
+    if (backend == NULL) {
+        LOG_WARN(SinkVITA49_i, "Unable to open the '" << name << "' transmit backend (" << strerror(errno) << "), using socket calls");
+        backend = transmit_backend_open("socket", sock, tcp, &addr, depth);
+    }
+    boost::mutex::scoped_lock lock(backendLock);
+    txBackends.push_back(backend);
+    return backend;
+}
+
+/* Keeps the backend's statistics, then waits for its sends to finish */
+void SinkVITA49_i::closeTransmitBackend(transmit_backend_t *backend) {
+    {
+        boost::mutex::scoped_lock lock(backendLock);
+        txBackends.erase(std::find(txBackends.begin(), txBackends.end(), backend));
+        retiredBackendCalls += backend->stats.syscalls;
+        retiredBackendErrors += backend->stats.errors;
+    }
+    transmit_backend_close(backend);
+}
+
+/* Publishes which backend the transmit threads use and what they have done */
+void SinkVITA49_i::updateBackendStatus() {
+    boost::mutex::scoped_lock lock(backendLock);
+    uint64_t calls = retiredBackendCalls;
+    uint64_t errors = retiredBackendErrors;
+    for (size_t i = 0; i < txBackends.size(); i++) {
+        calls += __sync_add_and_fetch(&txBackends[i]->stats.syscalls, 0);
+        errors += __sync_add_and_fetch(&txBackends[i]->stats.errors, 0);
+    }
+    connection_status.transmit_system_calls = calls;
+    connection_status.transmit_errors = errors;
+    if (!txBackends.empty() && connection_status.transmit_backend != txBackends[0]->ops->name) {
+        boost::mutex::scoped_lock lock(propertySetAccess);
+        connection_status.transmit_backend = txBackends[0]->ops->name;
+    }
+}
+/* Turns on kernel transmit timestamps for the transmit thread's socket when
+ * tx_timestamping is set, replacing any earlier socket's */
+void SinkVITA49_i::openTimestamps(int sock, bool tcp) {
+    closeTimestamps();
+    if (!advanced_configuration.tx_timestamping || sock < 0)
+        return;
+    tx_timestamp_t *timestamps = tx_timestamp_open(sock, tcp, outputInterface().c_str(), true);
+    if (timestamps == NULL) {
+        LOG_WARN(SinkVITA49_i, "Transmit timestamps are not available on this socket (" << strerror(errno) << ")");
+        return;
+    }
+    boost::mutex::scoped_lock lock(timingLock);
+    txTimestamps = timestamps;
+}
+
+void SinkVITA49_i::closeTimestamps() {
+    boost::mutex::scoped_lock lock(timingLock);
+    if (txTimestamps != NULL) {
+        tx_timestamp_close(txTimestamps);
+        txTimestamps = NULL;
+    }
+}
+
+/* Call just before each send on the transmit thread's socket... */
+void SinkVITA49_i::timestampBegin() {
+    if (txTimestamps != NULL)
+        tx_timestamp_begin(txTimestamps);
+}
+
+/* ...and after it with its result (bytes for TCP) and the number of UDP
+ * sends it made, to match the sends with their timestamps and collect any
+ * timestamps the kernel has reported */
+void SinkVITA49_i::timestampSent(ssize_t result, size_t sends) {
+    if (txTimestamps == NULL || result < 0)
+        return;
+    boost::mutex::scoped_lock lock(timingLock);
+    tx_timestamp_sent(txTimestamps, txTimestamps->tcp ? result : sends);
+    tx_timestamp_poll(txTimestamps);
+}
+
+/* Publishes the transmit timestamp statistics, in microseconds */
+void SinkVITA49_i::updateTransmitTiming() {
+    boost::mutex::scoped_lock lock(timingLock);
+    if (txTimestamps == NULL)
+        return;
+    const tx_timing_stats_t &latency = txTimestamps->latency;
+    const tx_timing_stats_t &spacing = txTimestamps->spacing;
+    transmit_timing.timestamps = latency.count;
+    transmit_timing.missed = txTimestamps->missed;
+    transmit_timing.hardware = txTimestamps->hardware;
+    transmit_timing.latency_mean = latency.count ? latency.sum / latency.count / 1e3 : 0;
+    transmit_timing.latency_p50 = tx_timing_percentile(&latency, 0.5) / 1e3;
+    transmit_timing.latency_p99 = tx_timing_percentile(&latency, 0.99) / 1e3;
+    transmit_timing.latency_max = latency.max / 1e3;
+    transmit_timing.spacing_mean = spacing.count ? spacing.sum / spacing.count / 1e3 : 0;
+    transmit_timing.spacing_p50 = tx_timing_percentile(&spacing, 0.5) / 1e3;
+    transmit_timing.spacing_p99 = tx_timing_percentile(&spacing, 0.99) / 1e3;
+    transmit_timing.spacing_max = spacing.max / 1e3;
+}
+
+/* Queues a packet for the transmit thread. With precompute_crc the CRC of the
+ * frame that will carry it is computed here, off the transmit thread, for a
+ * zero frame count; a CRC is queued either way so the queues stay paired.
+ * Unless pacing, context packets take the priority lane, which is sent before
+ * any queued data; the data packets they describe are queued after them, so they still
+ * follow their context, and data queued earlier keeps the associated-context
+ * count of the context it was made under. */
+void SinkVITA49_i::queuePacket(BasicVRTPacket *vrtPacket, double time) {
+    QueuedPacket info;
+    info.crc = 0;
+    info.due = 0;
+    if (precomputeCrc) {
+        uint32_t header[2] = { htonl(0x56524C50), htonl((vrtPacket->getPacketLength() + VRL_FRAME_SIZE) / 4) };
+        info.crc = vrl_crc(vrl_crc(0, header, sizeof(header)), vrtPacket->getPacketPointer(), vrtPacket->getPacketLength());
+    }
+    boost::mutex::scoped_lock lock(workQueueLock);
+    if (pacingMode == PACING_RELATIVE && !pacingAnchored) {
+        pacingAnchor = realtime_seconds() - time;
+        pacingAnchored = true;
+    }
+    if (pacingMode != PACING_OFF)
+        info.due = time + pacingOffset + (pacingMode == PACING_RELATIVE ? pacingAnchor : 0);
+    // Paced context keeps its place in the schedule
+    if (pacingMode == PACING_OFF && vrtPacket->getPacketType() == PacketType_Context) {
+        contextQueue.push(vrtPacket);
+        contextInfo.push(info);
+    } else {
+        workQueue2.push(vrtPacket);
+        packetInfo.push(info);
+    }
+    TRACE(TRACE_QUEUE_PUSH, vrtPacket->getPacketLength(), workQueueSize());
+    workQueued.notify_all();
+}
+
+/* Seconds since the epoch of the sample sampleOffset samples after T */
+double SinkVITA49_i::sampleTime(const BULKIO::PrecisionUTCTime &T, int sampleOffset) {
+    return T.twsec + T.tfsec + sampleOffset * currSRI.xdelta;
+}
+
+/* Nothing is queued in either lane */
+bool SinkVITA49_i::workQueueEmpty() {
+    return contextQueue.empty() && workQueue2.empty();
+}
+
+/* Waits up to IDLE_WAIT_MS for a packet to be queued; returns false on
+ * timeout. Transmit threads call this when the queue is empty. */
+bool SinkVITA49_i::waitForWork() {
+    boost::mutex::scoped_lock lock(workQueueLock);
+    if (!workQueueEmpty() || !runThread)
+        return true;
+    boost::system_time timeout = boost::get_system_time() + boost::posix_time::milliseconds(IDLE_WAIT_MS);
+    return workQueued.timed_wait(lock, timeout) || !workQueueEmpty();
+}
+
+size_t SinkVITA49_i::workQueueSize() {
+    return contextQueue.size() + workQueue2.size();
+}
+
+/* The next packet to send: the oldest context packet, if any, otherwise the
+ * oldest data packet; call with workQueueLock held and the queue not empty */
+BasicVRTPacket* SinkVITA49_i::workQueueFront() {
+    return contextQueue.empty() ? workQueue2.front() : contextQueue.front();
+}
+
+QueuedPacket& SinkVITA49_i::workQueueFrontInfo() {
+    return contextQueue.empty() ? packetInfo.front() : contextInfo.front();
+}
+
+/* Removes the front of the work queue, noting how late it was when it is
+ * being sent rather than discarded; call with workQueueLock held */
+void SinkVITA49_i::popWorkQueue(bool sent) {
+    double due = workQueueFrontInfo().due;
+    if (sent && due > 0) {
+        double lateness = std::max(realtime_seconds() - due, 0.0);
+        tx_timing_add(&pacingLateness, lateness * 1e9);
+        if (lateness > PACING_LATE_SECONDS)
+            pacingLate++;
+    }
+    if (sent)
+        TRACE(TRACE_QUEUE_POP, workQueueFront()->getPacketLength(), workQueueSize() - 1);
+    if (!contextQueue.empty()) {
+        contextQueue.pop();
+        contextInfo.pop();
+    } else {
+        workQueue2.pop();
+        packetInfo.pop();
+    }
+}
+
+/* The front of the work queue may be sent now; call with workQueueLock held
+ * and the queue not empty */
+bool SinkVITA49_i::frontDue() {
+    double due = workQueueFrontInfo().due;
+    return due <= 0 || due <= realtime_seconds();
+}
+
+/* With transmit_pacing, waits until the front of the work queue is due:
+ * sleeps on the monotonic clock until just short of it, then spins */
+void SinkVITA49_i::paceQueue() {
+    double due;
+    {
+        boost::mutex::scoped_lock lock(workQueueLock);
+        if (workQueueEmpty())
+            return;
+        due = workQueueFrontInfo().due;
+    }
+    if (due <= 0)
+        return;
+    double wait = due - realtime_seconds();
+    if (wait <= 0)
+        return;
+    double deadline = monotonic_seconds() + wait;
+    while (runThread) {
+        double sleep = std::min(deadline - monotonic_seconds() - PACING_SPIN_SECONDS, PACING_MAX_SLEEP_SECONDS);
+        if (sleep <= 0)
+            break;
+        usleep(sleep * 1e6);
+    }
+    while (runThread && monotonic_seconds() < deadline)
+        ;
+}
+
+/* Publishes how late paced packets went out, in microseconds */
+void SinkVITA49_i::updatePacingStatus() {
+    boost::mutex::scoped_lock lock(workQueueLock);
+    pacing_status.packets = pacingLateness.count;
+    pacing_status.late = pacingLate;
+    pacing_status.lateness_mean = pacingLateness.count ? pacingLateness.sum / pacingLateness.count / 1e3 : 0;
+    pacing_status.lateness_p50 = tx_timing_percentile(&pacingLateness, 0.5) / 1e3;
+    pacing_status.lateness_p99 = tx_timing_percentile(&pacingLateness, 0.99) / 1e3;
+    pacing_status.lateness_max = pacingLateness.max / 1e3;
+}
+
+/* Wraps the packet at the front of the work queue in frame with the next
+ * frame count and, if enabled, its CRC; call with workQueueLock held */
+void SinkVITA49_i::frameVRTPacket(BasicVRLFrame *frame, BasicVRTPacket *vrtPacket, int &frameCounter) {
+    frame->setVRTPacket(vrtPacket);
+    unsigned count = (frameCounter++) & 0xFFF;
+    frame->setFrameCount(count);
+    if (VITAProcess.Encap.enable_crc) {
+        // The CRC covers the frame count, so it is computed after the count is set
+        void *data = frame->getFramePointer();
+        size_t length = frame->getFrameLength();
+        if (precomputeCrc) {
+            uint32_t crc = htonl(workQueueFrontInfo().crc ^ vrl_crc_count(&crcCountTerms, count, length));
+            memcpy((char*) data + length - 4, &crc, sizeof(crc));
+        } else {
+            vrl_crc_update(data, length);
+        }
+    }
+}
+
+/* Packing several packets per VRL frame is on */
+bool SinkVITA49_i::packingFrames() {
+    return VITAProcess.Encap.enable_vrl_frames && VITAProcess.Encap.max_frame_size > 0;
+}
+
+/* Moves packets from the front of the work queue into one VRL frame no larger
+ * than max_frame_size or maxFrameSize, whichever is smaller, and returns the
+ * frame's length. A frame always takes at least one packet; frameCounter
+ * counts frames, and the packets taken are added to packets, if given.
+ * Call with workQueueLock held and the queue not empty. */
+size_t SinkVITA49_i::packFrame(std::vector<char> &frame, int &frameCounter, size_t maxFrameSize, long *packets) {
+    size_t limit = std::min(maxFrameSize, (size_t) VITAProcess.Encap.max_frame_size);
+    size_t length = VRL_FRAME_SIZE - VRL_CRC_SIZE;
+    while (!workQueueEmpty() && frontDue()) {
+        BasicVRTPacket *vrtPacket = workQueueFront();
+        size_t packetLength = vrtPacket->getPacketLength();
+        if (length > VRL_FRAME_SIZE - VRL_CRC_SIZE && length + packetLength + VRL_CRC_SIZE > limit)
+            break;
+        if (frame.size() < length + packetLength + VRL_CRC_SIZE)
+            frame.resize(length + packetLength + VRL_CRC_SIZE);
+        memcpy(&frame[length], vrtPacket->getPacketPointer(), packetLength);
+        length += packetLength;
+        popWorkQueue();
+        recyclePacket(vrtPacket);
+        if (packets != NULL)
+            (*packets)++;
+    }
+    length += VRL_CRC_SIZE;
+
+    uint32_t header[2] = { htonl(0x56524C50), htonl((uint32_t) ((frameCounter++) & 0xFFF) << 20 | (length / 4)) };
+    memcpy(&frame[0], header, sizeof(header));
+    if (VITAProcess.Encap.enable_crc)
+        vrl_crc_update(&frame[0], length);
+    else
+        memcpy(&frame[length - VRL_CRC_SIZE], "VEND", VRL_CRC_SIZE);
+    return length;
+}
+
+/* Fills packet ring frames with everything queued (up to the burst size or a
+ * full ring) and hands the batch to the device with a single send. */
+void SinkVITA49_i::TRANSMITTER_RING() {
     BasicVRTPacket *vrtPacket;
     BasicVRLFrame *vrl_frame = new BasicVRLFrame();
+    std::vector<char> packedFrame;
     int frameCounter = 0;
     long pCount = 0;
     while (runThread) {
         boost::this_thread::interruption_point();
-        if (!workQueue2.empty()) {
+        if (!workQueueEmpty()) {
+            paceQueue();
+            bool ringFull = false;
             {
-                if (_throttleTime > 0 && burstPacketCount == pCount) {
-                    pCount = 0;
-                    usleep(_throttleTime);
-                }
                 boost::mutex::scoped_lock lock(workQueueLock);
-                vrtPacket = workQueue2.front();
-                if (VITAProcess.Encap.enable_vrl_frames) {
-                    vrl_frame->setVRTPacket(vrtPacket);
-                    if (VITAProcess.Encap.enable_crc)
-                        vrl_frame->updateCRC();
-                    vrl_frame->setFrameCount((frameCounter++) & 0xFFF);
-                    multicast_transmit(multi_server, vrl_frame->getFramePointer(), vrl_frame->getFrameLength());
-                    pCount++;
-                } else {
-                    multicast_transmit(multi_server, vrtPacket->getPacketPointer(), vrtPacket->getPacketLength());
+                while (!workQueueEmpty() && frontDue() && !(_throttleTime > 0 && pCount >= burstPacketCount)) {
+                    if (!packet_ring_poll_out(packetRing, 0)) {
+                        ringFull = true;
+                        break;
+                    }
+                    if (packingFrames()) {
+                        size_t length = packFrame(packedFrame, frameCounter, packetRing->max_payload, &pCount);
+                        if (packet_ring_queue(packetRing, &packedFrame[0], length) < 0) {
+                            LOG_WARN(SinkVITA49_i, "Dropped a " << length << " byte frame larger than the packet ring's " << packetRing->max_payload << " byte datagrams");
+                        } else {
+                            captureFrame(&packedFrame[0], length);
+                        }
+                        continue;
+                    }
+                    vrtPacket = workQueueFront();
+                    int result;
+                    if (VITAProcess.Encap.enable_vrl_frames) {
+                        frameVRTPacket(vrl_frame, vrtPacket, frameCounter);
+                        result = packet_ring_queue(packetRing, vrl_frame->getFramePointer(), vrl_frame->getFrameLength());
+                        if (result >= 0)
+                            captureFrame(vrl_frame->getFramePointer(), vrl_frame->getFrameLength());
+                    } else {
+                        result = packet_ring_queue(packetRing, vrtPacket->getPacketPointer(), vrtPacket->getPacketLength());
+                        if (result >= 0)
+                            captureFrame(vrtPacket->getPacketPointer(), vrtPacket->getPacketLength());
+                    }
+                    if (result < 0)
+                        LOG_WARN(SinkVITA49_i, "Dropped a " << vrtPacket->getPacketLength() << " byte packet larger than the packet ring's " << packetRing->max_payload << " byte datagrams");
+                    popWorkQueue();
+                    recyclePacket(vrtPacket);
                     pCount++;
                 }
-                workQueue2.pop();
             }
-            delete vrtPacket;
-
+            int flushed = packet_ring_flush(packetRing);
+            TRACE(TRACE_SEND, flushed, 0);
+            if (flushed < 0)
+                LOG_WARN(SinkVITA49_i, "Packet ring send failed: " << strerror(errno));
+            if (_throttleTime > 0 && pCount >= burstPacketCount) {
+                pCount = 0;
+                usleep(_throttleTime);
+            } else if (ringFull) {
+                packet_ring_poll_out(packetRing, 100);
+            }
         } else {
-            usleep(1e5);
+            waitForWork();
         }
         boost::this_thread::interruption_point();
     }
+    delete vrl_frame;
 }
 
-void SinkVITA49_i::TRANSMITTER() {
-    BasicVRTPacket *vrtPacket;
-    BasicVRLFrame *vrl_frame = new BasicVRLFrame();
-    int frameCounter = 0;
-    long pCount = 0;
-    int result;
-    unicast_tcp_t client;
-    bool firstPacket = true;
+/* Opens a transmit link for each of the transmit_threads, all sharing the
+ * session's source port, or when striping one for the session's destination
+ * and one for each stripe_links entry. Leaves no links, for a single
+ * transmit thread, when that fails. */
+void SinkVITA49_i::openTransmitLinks() {
+    TransmitLink *first = new TransmitLink();
+    first->sock = multicast ? multi_server.sock : uni_server.sock;
+    first->addr = multicast ? multi_server.addr : uni_server.addr;
+    first->ownsSocket = false;
+    first->interface = outputInterface();
+    first->ipAddress = curr_attach.ip_address;
+    first->port = curr_attach.port;
+    transmitLinks.push_back(first);
+
+    if (!stripe_links.empty()) {
+        for (size_t i = 0; i < stripe_links.size(); i++) {
+            const stripe_link_struct &settings = stripe_links[i];
+            std::ostringstream iface;
+            iface << settings.interface;
+            if (settings.vlan != 0)
+                iface << "." << settings.vlan;
+            in_addr_t ip = inet_network(settings.ip_address.c_str());
+            TransmitLink *link = new TransmitLink();
+            std::string error;
+            try {
+                if (ip > lowMulti && ip < highMulti) {
+                    multicast_t server = multicast_server(iface.str().c_str(), settings.ip_address.c_str(), settings.port);
+                    link->sock = server.sock;
+                    link->addr = server.addr;
+                } else {
+                    unicast_t server = unicast_server(iface.str().c_str(), settings.ip_address.c_str(), settings.port);
+                    link->sock = server.sock;
+                    link->addr = server.addr;
+                }
+            } catch (std::exception &e) {
+                // The socket helpers throw rather than return -1 for most failures
+                link->sock = -1;
+                error = e.what();
+            }
+            if (link->sock < 0) {
+                LOG_WARN(SinkVITA49_i, "Unable to open a socket for " << settings.ip_address << ":" << settings.port << " on '" << iface.str() << "' (" << error << "), leaving it out of the stripe");
+                delete link;
+                continue;
+            }
+            link->ownsSocket = true;
+            link->interface = iface.str();
+            link->ipAddress = settings.ip_address;
+            link->port = settings.port;
+            transmitLinks.push_back(link);
+        }
+    } else {
+        std::vector<int> socks(1, first->sock);
+        for (long i = 1; i < advanced_configuration.transmit_threads; i++) {
+            TransmitLink *link = new TransmitLink(*first);
+            try {
+                link->sock = multicast ? multicast_server(first->interface.c_str(), first->ipAddress.c_str(), first->port).sock
+                                       : unicast_server(first->interface.c_str(), first->ipAddress.c_str(), first->port).sock;
+            } catch (std::exception &e) {
+                link->sock = -1;
+            }
+            if (link->sock < 0) {
+                delete link;
+                break;
+            }
+            link->ownsSocket = true;
+            transmitLinks.push_back(link);
+            socks.push_back(link->sock);
+        }
+        if ((long) socks.size() < advanced_configuration.transmit_threads || udp_shard_bind(&socks[0], socks.size()) < 0) {
+            LOG_WARN(SinkVITA49_i, "Unable to open " << advanced_configuration.transmit_threads << " sockets sharing a source port (" << strerror(errno) << "), using one transmit thread");
+            closeTransmitLinks();
+        }
+    }
+    if (transmitLinks.size() == 1)
+        closeTransmitLinks();
+    for (size_t i = 0; i < transmitLinks.size(); i++)
+        transmitLinks[i]->active = true;
+    linkStatusTime = 0;
+}
 
-    // TODO: Right now this only accepts one connection.
-    // Should be replaced with the boost version borrowed
-    // from the Sink and Source Socket
-    if (unicast_tcp_open) {
-    	client = unicast_tcp_accept(tcp_server);
+void SinkVITA49_i::closeTransmitLinks() {
+    for (size_t i = 0; i < transmitLinks.size(); i++) {
+        if (transmitLinks[i]->ownsSocket)
+            close(transmitLinks[i]->sock);
+        delete transmitLinks[i];
     }
+    transmitLinks.clear();
+    boost::mutex::scoped_lock lock(propertySetAccess);
+    stripe_link_status.clear();
+}
 
-    while (runThread) {
+/* Publishes each link's traffic, with rates over the last second */
+void SinkVITA49_i::updateLinkStatus() {
+    double now = monotonic_seconds();
+    if (stripe_link_status.size() == transmitLinks.size() && now - linkStatusTime < 1.0)
+        return;
+    boost::mutex::scoped_lock lock(propertySetAccess);
+    if (stripe_link_status.size() != transmitLinks.size()) {
+        stripe_link_status.clear();
+        for (size_t i = 0; i < transmitLinks.size(); i++) {
+            stripe_link_state_struct state;
+            state.interface = transmitLinks[i]->interface;
+            state.ip_address = transmitLinks[i]->ipAddress;
+            state.port = transmitLinks[i]->port;
+            state.active = true;
+            state.packets = 0;
+            state.bytes = 0;
+            state.bit_rate = 0;
+            state.send_errors = 0;
+            stripe_link_status.push_back(state);
+        }
+        linkStatusTime = now;
+        return;
+    }
+    for (size_t i = 0; i < transmitLinks.size(); i++) {
+        TransmitLink *link = transmitLinks[i];
+        stripe_link_state_struct &state = stripe_link_status[i];
+        uint64_t bytes = __sync_add_and_fetch(&link->bytes, 0);
+        state.bit_rate = (bytes - state.bytes) * 8 / (now - linkStatusTime);
+        state.bytes = bytes;
+        state.packets = __sync_add_and_fetch(&link->packets, 0);
+        state.send_errors = __sync_add_and_fetch(&link->errors, 0);
+        state.active = link->active;
+    }
+    linkStatusTime = now;
+}
+
+/* Runs a transmit thread for each link; this thread serves the first link
+ * and the others stop with it. */
+void SinkVITA49_i::TRANSMITTER_SHARDED() {
+    std::vector<boost::thread*> threads;
+    for (size_t i = 1; i < transmitLinks.size(); i++)
+        threads.push_back(new boost::thread(&SinkVITA49_i::transmitShard, this, transmitLinks[i]));
+    transmitShard(transmitLinks[0]);
+    for (size_t i = 0; i < threads.size(); i++) {
+        threads[i]->join();
+        delete threads[i];
+    }
+}
+
+/* A link's transmit thread: takes batches of consecutive packets from the
+ * work queue and sends each batch on the link. A link whose sends keep
+ * failing stops taking packets and leaves them to the others. */
+void SinkVITA49_i::transmitShard(TransmitLink *link) {
+    ShardBatch batch;
+    long pCount = 0;
+    transmit_backend_t *backend = openTransmitBackend(link->sock, false, link->addr);
+    while (runThread && link->active) {
         boost::this_thread::interruption_point();
-       
-        if (!workQueue2.empty()) {
-            {
-                if (_throttleTime > 0 && burstPacketCount == pCount) {
-                    pCount = 0;
-                    usleep(_throttleTime);
-                }
-                boost::mutex::scoped_lock lock(workQueueLock);
-                vrtPacket = workQueue2.front();
-                if (VITAProcess.Encap.enable_vrl_frames) {
-                    vrl_frame->setVRTPacket(vrtPacket);
+        if (workQueueEmpty()) {
+            // Sends completing while idle are reaped when the wait times out
+            if (!waitForWork())
+                transmit_backend_poll(backend, 0);
+            continue;
+        }
+        paceQueue();
+        if (_throttleTime > 0 && pCount >= burstPacketCount) {
+            pCount = 0;
+            usleep(_throttleTime);
+        }
+        long maxDatagrams = (_throttleTime > 0) ? std::min(std::max(burstPacketCount - pCount, 1L), shardBatchSize) : shardBatchSize;
+        size_t count = claimShardBatch(batch, maxDatagrams, UDP_MAX_PAYLOAD_SIZE);
+        if (count == 0) {
+            // Another thread is still sending the stream at the front of the queue,
+            // or another took the packets that were due
+            usleep(50);
+            continue;
+        }
+        // Failures include sends of earlier batches the backend has since reaped
+        uint64_t errors = backend->stats.errors;
+        ssize_t sent = transmit_backend_send(backend, &batch.iov[0], count);
+        uint64_t failed = backend->stats.errors - errors;
+        size_t bytes = 0;
+        for (ssize_t i = 0; i < sent; i++)
+            bytes += batch.iov[i].iov_len;
+        TRACE(TRACE_SEND, sent, bytes);
+        if (sent > 0)
+            capturePackets(&batch.iov[0], sent);
+        __sync_fetch_and_add(&link->packets, std::max<ssize_t>(sent, 0));
+        __sync_fetch_and_add(&link->bytes, bytes);
+        if (failed > 0) {
+            __sync_fetch_and_add(&link->errors, failed);
+            if (++link->failures >= TRANSMIT_LINK_MAX_FAILURES)
+                retireTransmitLink(link, backend->error);
+        } else {
+            link->failures = 0;
+        }
+        releaseShardBatch(batch);
+        pCount += batch.packetCount;
+    }
+    closeTransmitBackend(backend);
+    for (size_t i = 0; i < batch.frames.size(); i++)
+        delete batch.frames[i];
+}
 
-                    if (VITAProcess.Encap.enable_crc)
-                        vrl_frame->updateCRC();
+/* Frees a sent batch's packets and lets other threads take its stream */
+void SinkVITA49_i::releaseShardBatch(ShardBatch &batch) {
+    for (size_t i = 0; i < batch.packets.size(); i++)
+        recyclePacket(batch.packets[i]);
+    batch.packets.clear();
+    if (batch.holdsStream) {
+        boost::mutex::scoped_lock lock(workQueueLock);
+        streamsInFlight.erase(batch.stream);
+        batch.holdsStream = false;
+    }
+}
 
-                    vrl_frame->setFrameCount((frameCounter++) & 0xFFF);
-                    
-                    if (unicast_udp_open) {
-                    	result = unicast_transmit(uni_server, vrl_frame->getFramePointer(), vrl_frame->getFrameLength());
-                    	LOG_DEBUG(SinkVITA49_i, "Transmitted UDP data..." << result << strerror(errno));
-                    }
+/* Takes a failing link out of service, unless it is the last one left */
+void SinkVITA49_i::retireTransmitLink(TransmitLink *link, int error) {
+    boost::mutex::scoped_lock lock(workQueueLock);
+    link->failures = 0;
+    for (size_t i = 0; i < transmitLinks.size(); i++) {
+        if (transmitLinks[i] != link && transmitLinks[i]->active) {
+            LOG_WARN(SinkVITA49_i, "Removing " << link->ipAddress << ":" << link->port << " on '" << link->interface << "' after " << TRANSMIT_LINK_MAX_FAILURES << " failed sends (" << strerror(error) << ")");
+            link->active = false;
+            return;
+        }
+    }
+}
+
+/* Data packets and the context packets describing them keep their order
+ * relative to each other, so they count as one stream */
+int32_t SinkVITA49_i::orderingStream(BasicVRTPacket *vrtPacket) {
+    int32_t stream = vrtPacket->getStreamIdentifier();
+    if (vrtPacket->getPacketType() == PacketType_Context)
+        stream -= VITAProcess.IFCPacket.stream_identifier_offset;
+    return stream;
+}
 
-                    if (unicast_tcp_open) {
-                    	result = unicast_tcp_transmit(client, vrl_frame->getFramePointer(), vrl_frame->getFrameLength());
-                    	LOG_DEBUG(SinkVITA49_i, "Transmitted TCP data..." << result << strerror(errno));
+/* Moves up to maxDatagrams packets from the front of the work queue into
+ * batch, framed with consecutive frame counts, and returns how many
+ * datagrams (or, for TCP, frames) they make. With strict_stream_order the batch holds packets of
+ * one stream, and none are taken while another thread is still sending that
+ * stream; the batch then holds the stream until it has been sent. */
+size_t SinkVITA49_i::claimShardBatch(ShardBatch &batch, long maxDatagrams, size_t maxFrameSize) {
+    batch.packets.clear();
+    batch.iov.clear();
+    batch.holdsStream = false;
+    batch.packetCount = 0;
+    boost::mutex::scoped_lock lock(workQueueLock);
+    if (workQueueEmpty() || !frontDue())
+        return 0;
+    if (strictStreamOrder) {
+        batch.stream = orderingStream(workQueueFront());
+        if (streamsInFlight.count(batch.stream))
+            return 0;
+        streamsInFlight.insert(batch.stream);
+        batch.holdsStream = true;
+    }
+    while (!workQueueEmpty() && frontDue() && (long) batch.iov.size() < maxDatagrams) {
+        BasicVRTPacket *vrtPacket = workQueueFront();
+        if (strictStreamOrder && orderingStream(vrtPacket) != batch.stream)
+            break;
+        size_t index = batch.iov.size();
+        struct iovec iov;
+        if (packingFrames()) {
+            if (batch.packed.size() <= index)
+                batch.packed.resize(index + 1);
+            iov.iov_len = packFrame(batch.packed[index], shardFrameCounter, maxFrameSize, &batch.packetCount);
+            iov.iov_base = &batch.packed[index][0];
+            batch.iov.push_back(iov);
+            continue;
+        }
+        if (VITAProcess.Encap.enable_vrl_frames) {
+            while (batch.frames.size() <= index)
+                batch.frames.push_back(new BasicVRLFrame());
+            frameVRTPacket(batch.frames[index], vrtPacket, shardFrameCounter);
+            iov.iov_base = batch.frames[index]->getFramePointer();
+            iov.iov_len = batch.frames[index]->getFrameLength();
+        } else {
+            iov.iov_base = vrtPacket->getPacketPointer();
+            iov.iov_len = vrtPacket->getPacketLength();
+        }
+        batch.iov.push_back(iov);
+        batch.packets.push_back(vrtPacket);
+        batch.packetCount++;
+        popWorkQueue();
+    }
+    return batch.iov.size();
+}
+
+/* Writes everything queued into the shared-memory ring. The ring never blocks
+ * the writer, so there is no burst throttling; slow readers lose frames. */
+void SinkVITA49_i::TRANSMITTER_SHM() {
+    BasicVRTPacket *vrtPacket;
+    BasicVRLFrame *vrl_frame = new BasicVRLFrame();
+    std::vector<char> packedFrame;
+    int frameCounter = 0;
+    while (runThread) {
+        boost::this_thread::interruption_point();
+        if (!workQueueEmpty()) {
+            paceQueue();
+            boost::mutex::scoped_lock lock(workQueueLock);
+            while (!workQueueEmpty() && frontDue()) {
+                if (packingFrames()) {
+                    size_t length = packFrame(packedFrame, frameCounter, shmRing->header->slot_size, NULL);
+                    int result = shm_ring_write(shmRing, &packedFrame[0], length);
+                    TRACE(TRACE_SEND, result < 0 ? -1 : 1, length);
+                    if (result < 0) {
+                        LOG_WARN(SinkVITA49_i, "Dropped a " << length << " byte frame larger than the shared-memory ring's " << shmRing->header->slot_size << " byte slots");
+                    } else {
+                        captureFrame(&packedFrame[0], length);
                     }
+                    continue;
+                }
+                vrtPacket = workQueueFront();
+                int result;
+                if (VITAProcess.Encap.enable_vrl_frames) {
+                    frameVRTPacket(vrl_frame, vrtPacket, frameCounter);
+                    result = shm_ring_write(shmRing, vrl_frame->getFramePointer(), vrl_frame->getFrameLength());
+                    if (result >= 0)
+                        captureFrame(vrl_frame->getFramePointer(), vrl_frame->getFrameLength());
                 } else {
-                	if (unicast_udp_open) {
-                		result = unicast_transmit(uni_server, vrtPacket->getPacketPointer(), vrtPacket->getPacketLength());
-                		LOG_DEBUG(SinkVITA49_i, "Transmitted UDP data..." << result << strerror(errno));
-                	}
-
-                	if (unicast_tcp_open) {
-                		result = unicast_tcp_transmit(client, vrtPacket->getPacketPointer(), vrtPacket->getPacketLength());
-                		LOG_DEBUG(SinkVITA49_i, "Transmitted TCP data..." << result << strerror(errno));
-
-                		if (firstPacket && vrtPacket->getPacketType() == PacketType_Data) {
-                			firstPacket = false;
-                		}
-                	}
+                    result = shm_ring_write(shmRing, vrtPacket->getPacketPointer(), vrtPacket->getPacketLength());
+                    if (result >= 0)
+                        captureFrame(vrtPacket->getPacketPointer(), vrtPacket->getPacketLength());
                 }
-                workQueue2.pop();
+                TRACE(TRACE_SEND, result < 0 ? -1 : 1, vrtPacket->getPacketLength());
+                if (result < 0)
+                    LOG_WARN(SinkVITA49_i, "Dropped a " << vrtPacket->getPacketLength() << " byte packet larger than the shared-memory ring's " << shmRing->header->slot_size << " byte slots");
+                popWorkQueue();
+                recyclePacket(vrtPacket);
             }
-            delete vrtPacket;
         } else {
-            usleep(1e5);
+            waitForWork();
         }
         boost::this_thread::interruption_point();
     }
+    delete vrl_frame;
 }
 
 int SinkVITA49_i::createPayload(int size, bool signed_v) {
     try {
         int bytesPerPacket = 0;
+        int payloadSize = vita49_payload_size;
         int difference = 0;
         in_addr_t attachedIP = inet_network(curr_attach.ip_address.c_str());
+        bool udp = curr_attach.use_udp_protocol || (attachedIP > lowMulti && attachedIP < highMulti && not curr_attach.ip_address.empty());
 
         // UDP Header
-        if (curr_attach.use_udp_protocol || (attachedIP > lowMulti && attachedIP < highMulti && not curr_attach.ip_address.empty())) {
+        if (udp) {
         	bytesPerPacket += UDP_HEADER_SIZE;
         }
         // TCP Header
@@ -616,11 +1859,25 @@ int SinkVITA49_i::createPayload(int size, bool signed_v) {
         		bytesPerPacket += VITA49_FRAC_SECS_SIZE;
         	}
 
-        	bytesPerPacket += vita49_payload_size;
-
         	if (VITAProcess.IFDPacket.enable_trailer) {
         		bytesPerPacket += VITA49_TRAILER_SIZE;
         	}
+
+        	// Automatic sizing only applies to datagrams; TCP is a byte stream
+        	if (advanced_configuration.auto_payload_size && udp) {
+        		automaticPayloadSize = autoPayloadSize(size, bytesPerPacket);
+        		connection_status.mtu = interfaceMtu;
+        	} else {
+        		automaticPayloadSize = 0;
+        		connection_status.mtu = 0;
+        	}
+
+        	payloadSize = maxPayloadSize();
+        	if (advanced_configuration.target_packet_rate > 0) {
+        		payloadSize = ratePayloadSize(size, payloadSize);
+        	}
+
+        	bytesPerPacket += payloadSize;
         }
 
         if (bytesPerPacket > 65515) {
@@ -672,9 +1929,16 @@ int SinkVITA49_i::createPayload(int size, bool signed_v) {
 
         if (difference > 0) {
             int subtract_bytes = (difference - ((1 * currSRI.mode + 1) * size)) - 1 - (difference - 1) % ((1 * currSRI.mode + 1) * size);
-            vita49_payload_size -= subtract_bytes;
+            payloadSize -= subtract_bytes;
+        }
+        samplesPerPacket = floor(payloadSize / ((1 * currSRI.mode + 1) * size));
+        connection_status.payload_size = samplesPerPacket * ((1 * currSRI.mode + 1) * size);
+
+        // Keep room for a full packet of leftover samples
+        if (spareBuffer != NULL && (unsigned int) payloadSize > spareBufferSize) {
+            spareBuffer = (char*) realloc(spareBuffer, sizeof (char)*(payloadSize + 20 + 8));
+            spareBufferSize = payloadSize;
         }
-        samplesPerPacket = floor(vita49_payload_size / ((1 * currSRI.mode + 1) * size));
 
         //add set classid here
         //create the classid assuming we are using a standardPacket
@@ -741,7 +2005,7 @@ void SinkVITA49_i::createPacket(BasicDataPacket* pkt, TimeStamp vrt_ts, int samp
     packetCount++;
 }
 
-int SinkVITA49_i::createIFContextPacket(BULKIO::PrecisionUTCTime t, int index) {
+int SinkVITA49_i::createIFContextPacket(BULKIO::PrecisionUTCTime t, int index, bool changed) {
     BasicContextPacket* pkt = new BasicContextPacket();
     TimeStamp ts;
     if (runThread) {
@@ -752,7 +2016,6 @@ int SinkVITA49_i::createIFContextPacket(BULKIO::PrecisionUTCTime t, int index) {
         }
         ts = calcNextTimeStamp(t, (double) currSRI.xdelta, index);
         //createIFContextPacket(cp,nextTimeStamp);
-        bool changed = false;
         /* fill out the packet will all fields per the VITA49 Spec */
         pkt->setChangePacket(false);
         pkt->setReferencePointIdentifier(0);
@@ -818,115 +2081,93 @@ int SinkVITA49_i::createIFContextPacket(BULKIO::PrecisionUTCTime t, int index) {
                 currSRI.keywords[i].value >>= value_d;
 
                 pkt->setBandwidth(value_d);
-                changed = true;
             } else if (strcmp("COL_IF_FREQUENCY", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_d;
                 pkt->setFrequencyIF(value_d);
-                changed = true;
             } else if (strcmp("COL_RF", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_d;
                 pkt->setFrequencyRF(value_d);
-                changed = true;
             } else if (strcmp("COL_RF_OFFSET", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_d;
                 pkt->setFrequencyOffsetRF(value_d);
-                changed = true;
             } else if (strcmp("COL_IF_FREQUENCY_OFFSET", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_d;
                 pkt->setBandOffsetIF(value_d);
-                changed = true;
             } else if (strcmp("COL_REFERENCE_LEVEL", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_f;
                 pkt->setReferenceLevel(value_f);
-                changed = true;
             } else if (strcmp("REFERENCE_POINT_IDENTIFIER", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_l;
                 pkt->setReferencePointIdentifier(value_l);
-                changed = true;
             } else if (strcmp("COL_GAIN", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_f;
                 pkt->setGain1(value_f);
-                changed = true;
             } else if (strcmp("DATA_GAIN", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_f;
                 pkt->setGain2(value_f);
-                changed = true;
             } else if (strcmp("OVER_RANGE_SUM", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_d;
                 pkt->setOverRangeCount((long long) value_d);
-                changed = true;
             } else if (strcmp("USER_DEFINED", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_l;
                 pkt->setUserDefinedBits((int32_t) value_l);
-                changed = true;
             } else if (strcmp("TIMESTAMP_ADJUSTMENT_PICOSECONDS", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_d;
                 pkt->setTimeStampAdjustment((long long) value_d);
-                changed = true;
             } else if (strcmp("TIMESTAMP_CALIBRATION", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_l;
                 pkt->setTimeStampCalibration((int32_t) value_l);
-                changed = true;
             } else if (strcmp("TEMPERATURE", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_f;
                 pkt->setTemperature(value_f);
-                changed = true;
             } else if (strcmp("DATA_VALID", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_b;
                 if (value_b)
                     pkt->setDataValid(_TRUE);
                 if (!value_b)
                     pkt->setDataValid(_FALSE);
-                changed = true;
             } else if (strcmp("REFERENCE_LOCKED", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_b;
                 if (value_b)
                     pkt->setReferenceLocked(_TRUE);
                 if (!value_b)
                     pkt->setReferenceLocked(_FALSE);
-                changed = true;
             } else if (strcmp("CALIBRATED_TIME_STAMP", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_b;
                 if (value_b)
                     pkt->setCalibratedTimeStamp(_TRUE);
                 if (!value_b)
                     pkt->setCalibratedTimeStamp(_FALSE);
-                changed = true;
             } else if (strcmp("AUTO_GAIN_CONTROL", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_b;
                 if (value_b)
                     pkt->setAutomaticGainControl(_TRUE);
                 if (!value_b)
                     pkt->setAutomaticGainControl(_FALSE);
-                changed = true;
             } else if (strcmp("SIGNAL_DETECTION", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_b;
                 if (value_b)
                     pkt->setSignalDetected(_TRUE);
                 if (!value_b)
                     pkt->setSignalDetected(_FALSE);
-                changed = true;
             } else if (strcmp("DATA_INVERSION", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_b;
                 if (value_b)
                     pkt->setInvertedSpectrum(_TRUE);
                 if (!value_b)
                     pkt->setInvertedSpectrum(_FALSE);
-                changed = true;
             } else if (strcmp("OVER_RANGE", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_b;
                 if (value_b)
                     pkt->setOverRange(_TRUE);
                 if (!value_b)
                     pkt->setOverRange(_FALSE);
-                changed = true;
             } else if (strcmp("SAMPLE_LOSS", currSRI.keywords[i].id) == 0) {
                 currSRI.keywords[i].value >>= value_b;
                 if (value_b)
                     pkt->setDiscontinuous(_TRUE);
                 if (!value_b)
                     pkt->setDiscontinuous(_FALSE);
-                changed = true;
             }
             else if (strcmp("GEOLOCATION_GPS", currSRI.keywords[i].id) == 0) {
                 GEOLOCATION_GPS_struct geolocation_gps;
@@ -1023,11 +2264,9 @@ int SinkVITA49_i::createIFContextPacket(BULKIO::PrecisionUTCTime t, int index) {
         }
         
         pkt->setChangePacket(changed);
+        TRACE(TRACE_CONTEXT, contextCount, changed);
         
-        {
-            boost::mutex::scoped_lock lock(workQueueLock);
-            workQueue2.push(pkt);
-        }
+        queuePacket(pkt, sampleTime(t, index));
     }
     return NORMAL;
 }
@@ -1045,29 +2284,83 @@ int SinkVITA49_i::createIFContextPacket(BULKIO::PrecisionUTCTime t, int index) {
  *   If the return value for the previous call was NOOP, then the serviceThread waits
  *   an amount of time defined in the serviceThread's constructor.
  *
- *   This function calls the singleService function for each of the input ports and
- *   returns NORMAL if one or more of those ports received and processed data. 
+ *   Input is drained from the port that carried the last transfer, up to
+ *   max_transfers_per_service transfers per call. Only when that port is empty are the
+ *   other ports checked, and ports with nothing queued are skipped without a getPacket.
+ *   When no port has data, the call blocks on the active port's queue until data
+ *   arrives (or the held samples' latency deadline expires) instead of returning NOOP
+ *   and sleeping for the full thread delay.
  *********************************************************************************************/
 int SinkVITA49_i::serviceFunction() {
-    bool retService;
+    bool retService = false;
     if (createMem) {
-        memoryManagement(vita49_payload_size);
+        memoryManagement(maxPayloadSize());
+    }
+    if (shouldRetarget) {
+        shouldRetarget = false;
+        if (!retargetTransmitSession())
+            shouldUpdateStream = true;
     }
     if (shouldUpdateStream) {
-        destroy_tx_thread();
+        endTransmitSession();
         shouldUpdateStream = false;
     }
-    if (_transmitThread == NULL and ((numberOutputConnections() > 0) or advanced_configuration.force_transmit)) {
+    if (shouldResizePayload) {
+        shouldResizePayload = false;
+        if (hasActiveOutputStream() && !waitingForSRI && _sampleSize > 0) {
+            flushAccumulator();
+            createPayload(_sampleSize, _signedPort);
+        }
+    }
+    if (_transmitThread == NULL and ((numberOutputConnections() > 0) or advanced_configuration.force_transmit or prewarmTransport())) {
         updateCurrAttach();
         launch_tx_thread();
     }
+    updateReadiness();
     //assumes only one provides port is active at a time
-    retService = singleService(dataDouble_in, false);
-    retService = retService || singleService(dataFloat_in, false);
-    retService = retService || singleService(dataUshort_in, false);
-    retService = retService || singleService(dataShort_in, true);
-    retService = retService || singleService(dataChar_in, true);
-    retService = retService || singleService(dataOctet_in, false);
+    long budget = std::max<long>(advanced_configuration.max_transfers_per_service, 1);
+    long transfers = 0;
+    if (activePort >= 0) {
+        while (transfers < budget && servicePort(activePort, 0))
+            transfers++;
+    }
+    for (int port = 0; port < NUM_INPUT_PORTS && transfers == 0; port++) {
+        if (port == activePort || not servicePort(port, 0))
+            continue;
+        activePort = port;
+        transfers++;
+        while (transfers < budget && servicePort(activePort, 0))
+            transfers++;
+    }
+    retService = (transfers > 0);
+
+    // Nothing queued anywhere: wait on the active stream's port rather than sleeping
+    if (not retService && activePort >= 0) {
+        float timeout = getThreadDelay();
+        if (leftOverDataSize > 0 && advanced_configuration.max_packet_latency > 0)
+            timeout = std::max(std::min(timeout, float(leftOverDeadline - monotonic_seconds())), 0.0f);
+        servicePort(activePort, timeout);
+        // The wait already stood in for the thread delay
+        retService = true;
+    }
+
+    if (!transmitLinks.empty())
+        updateLinkStatus();
+    if (advanced_configuration.tx_timestamping)
+        updateTransmitTiming();
+    if (advanced_configuration.transmit_pacing != "off")
+        updatePacingStatus();
+    updateBackendStatus();
+    if (shmRing != NULL) {
+        connection_status.shared_memory_lag = shm_ring_lag(shmRing);
+        connection_status.shared_memory_drops = shm_ring_drops(shmRing);
+    }
+
+    // Don't let held samples wait longer than max_packet_latency
+    if (leftOverDataSize > 0 && advanced_configuration.max_packet_latency > 0 && monotonic_seconds() >= leftOverDeadline) {
+        flushAccumulator();
+        retService = true;
+    }
 
     if (retService) {
         return NORMAL;
@@ -1076,6 +2369,29 @@ int SinkVITA49_i::serviceFunction() {
     return NOOP;
 }
 
+/***********************************************************************************************
+ * servicePort()
+ *
+ * Takes:   int port -> index of an input port, in the order the ports are polled
+ *          float timeout -> seconds to wait for a transfer
+ * Returns: bool
+ *
+ * Functionality:
+ *   Calls singleService for the indexed port, so the service loop can remember which
+ *   port carries the active stream.
+ *************************************************************************************************/
+bool SinkVITA49_i::servicePort(int port, float timeout) {
+    switch (port) {
+    case 0: return singleService(dataDouble_in, false, timeout);
+    case 1: return singleService(dataFloat_in, false, timeout);
+    case 2: return singleService(dataUshort_in, false, timeout);
+    case 3: return singleService(dataShort_in, true, timeout);
+    case 4: return singleService(dataChar_in, true, timeout);
+    case 5: return singleService(dataOctet_in, false, timeout);
+    }
+    return NOOP;
+}
+
 /***********************************************************************************************
  * singleService()
  *
@@ -1114,7 +2430,9 @@ bool SinkVITA49_i::readyToProcessPacket(const std::string incomingStreamId) {
             LOG_INFO(SinkVITA49_i, "SinkVITA49_out stream '" << _streamMap.streamID << "' interrupted!");
             tearDownOutputStream();
         }
-        LOG_DEBUG(SinkVITA49_i, "NO LISTENERS...NOT SENDING CONVERTING/SENDING PACKETS...")
+        // Nobody is listening, so release the sockets until someone connects
+        if (_transmitThread != NULL && !prewarmTransport())
+            endTransmitSession();
         return false;
     }
     
@@ -1128,26 +2446,24 @@ bool SinkVITA49_i::readyToProcessPacket(const std::string incomingStreamId) {
     return true;
 }
 
-template <class IN> bool SinkVITA49_i::singleService(IN *dataIn, bool signedPort) {
-    LOG_TRACE(SinkVITA49_i, __PRETTY_FUNCTION__);
-    
+template <class IN> bool SinkVITA49_i::singleService(IN *dataIn, bool signedPort, float timeout) {
+    // Ports with nothing queued (e.g. unconnected ones) are skipped without polling
+    if (timeout <= 0 && dataIn->getCurrentQueueDepth() == 0)
+        return NOOP;
+
     // Grab a packet and return if no packet exists in queue
-    typename IN::dataTransfer *CORBApacket = dataIn->getPacket(0);
+    typename IN::dataTransfer *CORBApacket = dataIn->getPacket(timeout);
     if (CORBApacket == NULL)
         return NOOP;
       
     // Setup processing parameters
     std::string incomingStreamId = CORBApacket->streamID;
-    BasicDataPacket *vrtPacket = NULL;
-    int complexMultiplier = currSRI.mode + 1;
     int sampleSize = sizeof (CORBApacket->dataBuffer.front());
-    int leftOverSamples = (leftOverDataSize / sampleSize) / (1 * complexMultiplier);
-    int numSamples = (CORBApacket->dataBuffer.size() / complexMultiplier) + leftOverSamples;
-    int dataSizeInBytes = numSamples*sampleSize *(1+currSRI.mode);
+    TRACE(TRACE_RECEIVE, CORBApacket->dataBuffer.size() * sampleSize, dataIn->getCurrentQueueDepth());
     
     // Validate that we can process received packet
     if (not readyToProcessPacket(incomingStreamId)) {
-        LOG_DEBUG(SinkVITA49_i, "DROPPING PACKET...")
+        TRACE(TRACE_DROP, CORBApacket->dataBuffer.size() * sampleSize, 0);
         delete CORBApacket;
         return NOOP;
     }
@@ -1160,119 +2476,125 @@ template <class IN> bool SinkVITA49_i::singleService(IN *dataIn, bool signedPort
     
     // Handle SRI changes
     if (curr_attach.attach && (CORBApacket->sriChanged || waitingForSRI)) {
+        // A packet never mixes samples from before and after an SRI change
+        flushAccumulator();
         bool t = mergeRecSRI(CORBApacket->SRI, CORBApacket->T);
+        TRACE(TRACE_SRI_MERGE, t, currSRI.keywords.length());
         if (t && VITAProcess.IFCPacket.enable) {
             createPayload(sampleSize, signedPort);
-            //cp = new BasicContextPacket();
-            //nextTimeStamp = calcNextTimeStamp(CORBApacket->T,currSRI.xdelta,dataIndex);
-            if (leftOverDataSize == 0)
-                createIFContextPacket(CORBApacket->T, 0);
-            else
-                createIFContextPacket(CORBApacket->T, -leftOverSamples);
+            // Sent ahead of the next data packet, which starts with this transfer
+            contextPending = true;
         }
         waitingForSRI = false;
     }
     
     // Validate that we can process received packet
     if (samplesPerPacket < 1) {
-        LOG_DEBUG(SinkVITA49_i, "Property 'samplesPerPacket' must be greater than 0!: DROPPING PACKET...")
+        TRACE(TRACE_DROP, CORBApacket->dataBuffer.size() * sampleSize, 1);
         delete CORBApacket;
         return NOOP;
     }
     
-    // Create VRT packets and push them to the queue
-    while (dataSizeInBytes >= (samplesPerPacket * complexMultiplier * sampleSize)) {
-        try {
-            vrtPacket = new BasicDataPacket();
-            vrtPacket->setPayloadFormat(pf->getBits());
-            //PayloadFormat pf_l = vrtPacket->getPayloadFormat();
-            vrtPacket->setPayloadLength(samplesPerPacket * ((1 * currSRI.mode + 1) * sampleSize));
-
-            nextTimeStamp = calcNextTimeStamp(CORBApacket->T, (double) currSRI.xdelta, dataIndex/(1*currSRI.mode + 1));
-            createPacket(vrtPacket, nextTimeStamp, dataIndex);
-            if (VITAProcess.IFDPacket.enable_trailer) {
-                vrtPacket->setAssocPacketCount(contextCount & 0x7F);
-            }
-
-            if (leftOverDataSize > 0) {
-                //memcpy(spareBuffer,leftoverCORBApacket->dataBuffer.data()+(leftoverCORBApacket->dataBuffer.size()-leftOverDataSize),leftOverDataSize*sampleSize);
-                memcpy(&spareBuffer[leftOverDataSize], CORBApacket->dataBuffer.data(), (samplesPerPacket * ((1 * currSRI.mode + 1) * sampleSize)) - leftOverDataSize);
-                nextTimeStamp = calcNextTimeStamp(CORBApacket->T, (double) currSRI.xdelta, -(leftOverDataSize / sampleSize) / (1 * currSRI.mode + 1));
-                vrtPacket->setTimeStamp(nextTimeStamp);
-                vrtPacket->setData(pf->getBits(), spareBuffer, samplesPerPacket * ((1 * currSRI.mode + 1) * sampleSize), convertEndian);
-                dataIndex += (samplesPerPacket * (1 * currSRI.mode + 1))-(leftOverDataSize / sampleSize);
-                leftOverDataSize = 0;
-            } else {
-                //nextTimeStamp = calcNextTimeStamp(CORBApacket->T,currSRI.xdelta,dataIndex);
-
-                vrtPacket->setData(pf->getBits(), &CORBApacket->dataBuffer[dataIndex], samplesPerPacket * ((1 * currSRI.mode + 1) * sampleSize), convertEndian);
-                dataIndex += (samplesPerPacket * (1 * currSRI.mode + 1));
-            }
-            dataSizeInBytes -= (samplesPerPacket * ((1 * currSRI.mode + 1) * sampleSize));
-            //update the context packet time
-            _tContext.tfsec = nextTimeStamp.getFractionalSeconds() / 10e9;
-            _tContext.twsec = nextTimeStamp.getUTCSeconds();
-            //LOG_DEBUG(SinkVITA49_i, __PRETTY_FUNCTION__ << " ABOUT TO PUSH TO QUEUE ");
-            {
-                boost::mutex::scoped_lock lock(workQueueLock);
-                workQueue2.push(vrtPacket);
-            }
-        } catch (vrt::VRTException &ex) {
-           std::cout << "CAUGHT VRT EXCEPTION!: what(): " << ex.what() << std::endl;
+    int complexMultiplier = currSRI.mode + 1;
+    int frameSize = complexMultiplier * sampleSize;
+    unsigned int packetBytes = samplesPerPacket * frameSize;
+    unsigned int inputBytes = CORBApacket->dataBuffer.size() * sampleSize;
+    char *input = inputBytes > 0 ? (char*) &CORBApacket->dataBuffer[0] : NULL;
+    unsigned int offset = 0;
+    
+    // Complete the partial packet held over from earlier pushes first
+    while (leftOverDataSize > 0 && (leftOverDataSize >= packetBytes || offset < inputBytes)) {
+        if (leftOverDataSize < packetBytes) {
+            unsigned int take = std::min(packetBytes - leftOverDataSize, inputBytes - offset);
+            memcpy(&spareBuffer[leftOverDataSize], input + offset, take);
+            leftOverDataSize += take;
+            offset += take;
         }
+        if (leftOverDataSize < packetBytes)
+            break;
+        pushDataPacket(spareBuffer, packetBytes, leftOverTime, leftOverOffset);
+        leftOverDataSize -= packetBytes;
+        leftOverOffset += samplesPerPacket;
+        if (leftOverDataSize > 0)
+            memmove(spareBuffer, &spareBuffer[packetBytes], leftOverDataSize);
     }
-
-    // Save off remainder of data that doesn't fill an entire packet
-    if (dataSizeInBytes > 0) {
-        // EdgeCase: 
-        //   1.) If there are left over packets
-        //   2.) If the next packet coming in still doesn't have enough data to make
-        //       a pushPacket call
-        //   * Don't
-        //
-        if ((&CORBApacket->dataBuffer)->size() > 0) {
-          memcpy(&spareBuffer[0], &CORBApacket->dataBuffer[dataIndex], dataSizeInBytes);
-          leftOverDataSize = dataSizeInBytes; //in bytes
-        }
+    
+    // Full packets go straight from the transfer with no intermediate copy
+    while (inputBytes - offset >= packetBytes) {
+        pushDataPacket(input + offset, packetBytes, CORBApacket->T, offset / frameSize);
+        offset += packetBytes;
     }
-
+    
+    // Hold the tail until enough samples arrive, remembering when its first sample was taken
+    if (offset < inputBytes) {
+        leftOverDeadline = monotonic_seconds() + advanced_configuration.max_packet_latency / 1000.0;
+        leftOverTime = CORBApacket->T;
+        leftOverOffset = offset / frameSize;
+        memcpy(spareBuffer, input + offset, inputBytes - offset);
+        leftOverDataSize = inputBytes - offset;
+    }
+    
     // Push remainder of data if we reached end of stream
     if (CORBApacket->EOS) {
         LOG_DEBUG(SinkVITA49_i, "ServiceFunction: Received EOS for stream '" << CORBApacket->streamID << "'")
-        try {
-            if (dataSizeInBytes > 0) {
-                vrtPacket = new BasicDataPacket();
-                vrtPacket->setPayloadFormat(pf->getBits());
-                vrtPacket->setPayloadLength(dataSizeInBytes);
-                nextTimeStamp = calcNextTimeStamp(CORBApacket->T, (double) currSRI.xdelta, dataIndex/(1*currSRI.mode+1));
-                createPacket(vrtPacket, nextTimeStamp, dataIndex);
-
-                vrtPacket->setData(pf->getBits(), &spareBuffer[0], dataSizeInBytes, convertEndian);
-                {
-                    boost::mutex::scoped_lock lock(workQueueLock);
-                    workQueue2.push(vrtPacket);
-                }
-            }
-        } catch (vrt::VRTException &ex) {
-           std::cout << "CAUGHT VRT EXCEPTION!: what(): " << ex.what() << std::endl;
-        }
+        flushAccumulator();
         tearDownOutputStream();
     }
-
-    dataIndex = 0;
-
+    
     /* delete the dataTransfer object */
     delete CORBApacket;
-
+    
     return true;
 }
 
+/* Builds a data packet from bytes of samples whose first sample was taken
+ * sampleOffset samples after T, and queues it for transmission */
+void SinkVITA49_i::pushDataPacket(char *data, int bytes, const BULKIO::PrecisionUTCTime &T, int sampleOffset) {
+    // Context goes out just ahead of the data packet it describes, stamped with the same
+    // time: right after an SRI change, otherwise as a heartbeat on the monotonic clock
+    long heartbeat = advanced_configuration.time_between_context_packets;
+    if (VITAProcess.IFCPacket.enable && (contextPending || (heartbeat > 0 && monotonic_seconds() >= nextContextDeadline))) {
+        double now = monotonic_seconds();
+        createIFContextPacket(T, sampleOffset, contextPending);
+        // Heartbeats keep their cadence; a change, or falling a period behind, restarts it
+        if (!contextPending && now < nextContextDeadline + heartbeat)
+            nextContextDeadline += heartbeat;
+        else
+            nextContextDeadline = now + heartbeat;
+        contextPending = false;
+    }
+    try {
+        BasicDataPacket *vrtPacket = takePacket();
+        vrtPacket->setPayloadFormat(pf->getBits());
+        vrtPacket->setPayloadLength(bytes);
+        nextTimeStamp = calcNextTimeStamp(T, (double) currSRI.xdelta, sampleOffset);
+        createPacket(vrtPacket, nextTimeStamp, sampleOffset);
+        if (VITAProcess.IFDPacket.enable_trailer) {
+            vrtPacket->setAssocPacketCount(contextCount & 0x7F);
+        }
+        vrtPacket->setData(pf->getBits(), data, bytes, convertEndian);
+        queuePacket(vrtPacket, sampleTime(T, sampleOffset));
+    } catch (vrt::VRTException &ex) {
+       std::cout << "CAUGHT VRT EXCEPTION!: what(): " << ex.what() << std::endl;
+    }
+}
+
+/* Sends whatever the accumulator holds as a short packet */
+void SinkVITA49_i::flushAccumulator() {
+    if (leftOverDataSize > 0 && samplesPerPacket > 0) {
+        pushDataPacket(spareBuffer, leftOverDataSize, leftOverTime, leftOverOffset);
+    }
+    leftOverDataSize = 0;
+}
+
 void SinkVITA49_i::setupOutputStream(const std::string streamID, int sampleSize, bool signedPort) {
     //we need a hash of the string to create the stream ID for the context packet
     boost::hash<std::string> string_hash;
     string_hash(streamID);
     _streamMap.hash = (unsigned int) string_hash(streamID);
     _streamMap.streamID = streamID;
+    _sampleSize = sampleSize;
+    _signedPort = signedPort;
     initstreamDef(sampleSize, signedPort);
 
     addModifyKeyword<long>(&currSRI, "dataRef", _dataRef);
@@ -1282,56 +2604,126 @@ void SinkVITA49_i::setupOutputStream(const std::string streamID, int sampleSize,
     printStreamDef(_streamDef);
     dataVITA49_out->addStream(_streamDef);
     curr_attach.attach = true;
+
+    // A relatively paced stream is scheduled from its own first packet
+    boost::mutex::scoped_lock lock(workQueueLock);
+    pacingAnchored = false;
 }
 
+/* Ends the current stream only. The transmit threads and sockets stay up so
+ * the next stream starts sending immediately; packets already queued for
+ * this stream, including the EOS remainder, still go out in order. */
 void SinkVITA49_i::tearDownOutputStream() {
   try {
     dataVITA49_out->removeStream(_streamMap.streamID.c_str());
     resetStreamMap();
-    destroy_tx_thread(); // TODO: Why is this needed?
-    initialize_values();
+    resetStreamState();
   } catch (...) {
     LOG_ERROR(SinkVITA49_i, "TODO: Fix issue with tearDownOutputStream");
   };
 }
 
+/* Waits (bounded) for the transmit thread to send everything queued */
+void SinkVITA49_i::drainWorkQueue() {
+    boost::posix_time::ptime deadline = boost::posix_time::microsec_clock::universal_time() +
+                                        boost::posix_time::milliseconds(QUEUE_DRAIN_TIMEOUT_MS);
+    while (_transmitThread != NULL && boost::posix_time::microsec_clock::universal_time() < deadline) {
+        {
+            boost::mutex::scoped_lock lock(workQueueLock);
+            if (workQueueEmpty())
+                return;
+        }
+        usleep(1000);
+    }
+}
+
+/* Stops the transmit threads and closes the sockets once queued packets have
+ * been sent; used on stop, disconnect and network changes, not on EOS. */
+void SinkVITA49_i::endTransmitSession() {
+    drainWorkQueue();
+    destroy_tx_thread();
+
+    if (unicast_udp_open) {
+        unicast_close(uni_server);
+        unicast_udp_open = false;
+    }
+    if (multicast_udp_open) {
+        multicast_close(multi_server);
+        multicast_udp_open = false;
+    }
+    if (unicast_tcp_open) {
+        if (tcp_client.sock >= 0) {
+            unicast_tcp_close(tcp_client);
+            tcp_client.sock = -1;
+        }
+        unicast_tcp_close(tcp_server);
+        tcp_server.sock = -1;
+        unicast_tcp_open = false;
+    }
+    closeTransmitLinks();
+
+    boost::mutex::scoped_lock lock(workQueueLock);
+    if (!workQueueEmpty())
+        LOG_WARN(SinkVITA49_i, "Discarding " << workQueueSize() << " packets that could not be sent");
+    while (!workQueueEmpty()) {
+        recyclePacket(workQueueFront());
+        popWorkQueue(false);
+    }
+}
+
 bool SinkVITA49_i::hasActiveOutputStream() {
     return (_streamMap.hash != 0);
 }
 
 int SinkVITA49_i::numberOutputConnections() {
-    ExtendedCF::UsesConnectionSequence* connections = dataVITA49_out->connections();
-    size_t connCount = connections->length();
-    delete connections;
-    return connCount;
+    return __sync_add_and_fetch(&_outputConnections, 0);
+}
+
+void SinkVITA49_i::outputConnected(const char *connectionId) {
+    boost::mutex::scoped_lock lock(connectionLock);
+    // Reconnecting an existing id replaces the connection rather than adding one
+    outputConnectionIds.insert(connectionId);
+    __sync_lock_test_and_set(&_outputConnections, outputConnectionIds.size());
+}
+
+void SinkVITA49_i::outputDisconnected(const char *connectionId) {
+    boost::mutex::scoped_lock lock(connectionLock);
+    outputConnectionIds.erase(connectionId);
+    __sync_lock_test_and_set(&_outputConnections, outputConnectionIds.size());
+}
+
+/* The address consumers attach to: the network destination, or shm:<name>
+ * when frames go to a shared-memory ring */
+std::string SinkVITA49_i::attachAddress() {
+    if (!advanced_configuration.shared_memory_name.empty())
+        return "shm:" + advanced_configuration.shared_memory_name;
+    return curr_attach.ip_address;
 }
 
 void SinkVITA49_i::updateStreamDef() {
     _streamDef.vlan = curr_attach.vlan;
     _streamDef.port = curr_attach.port;
-    _streamDef.ip_address = CORBA::string_dup(curr_attach.ip_address.c_str());
+    _streamDef.ip_address = CORBA::string_dup(attachAddress().c_str());
     if (curr_attach.use_udp_protocol)
         _streamDef.protocol = BULKIO::VITA49_UDP_TRANSPORT;
     else
         _streamDef.protocol = BULKIO::VITA49_TCP_TRANSPORT;
     
-    // If running attachments
-    BULKIO::VITA49StreamSequence* attachedStreams = this->dataVITA49_out->attachedStreams();
-    if (attachedStreams->length() > 0) {
+    // If running attachments; an added stream is attached to every connection
+    if (hasActiveOutputStream() && numberOutputConnections() > 0) {
         try {
           this->dataVITA49_out->updateStream(_streamDef);
         } catch(...) {
            LOG_ERROR(SinkVITA49_i, "TODO: Fix updateStream exception handling!")
         }
     }
-    delete attachedStreams;
 }
 
 void SinkVITA49_i::initstreamDef(int sampleSize, bool signedPort) {
     //always required info
     _streamDef.vlan = curr_attach.vlan;
     _streamDef.port = curr_attach.port;
-    _streamDef.ip_address = CORBA::string_dup(curr_attach.ip_address.c_str());
+    _streamDef.ip_address = CORBA::string_dup(attachAddress().c_str());
     if (curr_attach.use_udp_protocol)
         _streamDef.protocol = BULKIO::VITA49_UDP_TRANSPORT;
     else
@@ -37,10 +37,22 @@
 #include "multicast.h"
 #include "unicast.h"
 #include "unicast_tcp.h"
+#include "mtu.h"
+#include "udp_gso.h"
+#include "udp_shard.h"
+#include "transmit_backend.h"
+#include "tx_timestamp.h"
+#include "trace_ring.h"
+#include "capture_ring.h"
+#include "packet_ring.h"
+#include "shm_ring.h"
+#include "vrl_crc.h"
 #include "boost_tcp_server.h"
 
 #include <boost/date_time/posix_time/posix_time.hpp>
 #include <boost/asio.hpp>
+#include <boost/thread/condition_variable.hpp>
+#include <set>
 #include "VITA49_struct_keywords.h"
 #include "ossie/prop_helpers.h"
 
@@ -49,11 +61,57 @@ struct VITA49Settings{
 	VITA49IFDataPacket_struct IFDPacket;
 	VITA49IFContextPacket_struct IFCPacket;
 } ;
+
+// What a transmit thread needs to know of a queued packet besides the packet:
+// the CRC of its frame with a zero count, with precomputeCrc, and the wall-clock
+// time it is due, with pacing (0 to send at once)
+struct QueuedPacket {
+	uint32_t crc;
+	double due;
+};
+
+// advanced_configuration::transmit_pacing
+enum PacingMode {
+	PACING_OFF,
+	PACING_TIMESTAMP,
+	PACING_RELATIVE
+};
+
+// A transmit thread's share of the work queue
+struct ShardBatch {
+	std::vector<BasicVRLFrame*> frames;
+	std::vector<std::vector<char> > packed;
+	std::vector<BasicVRTPacket*> packets;
+	std::vector<struct iovec> iov;
+	long packetCount;  // VRT packets the datagrams carry, several per packed frame
+	int32_t stream;
+	bool holdsStream;
+};
+
+// A destination with a transmit thread of its own, when transmit_threads > 1
+// or the stream is striped across stripe_links
+struct TransmitLink {
+	int sock;
+	struct sockaddr_in addr;
+	bool ownsSocket;
+	std::string interface;
+	std::string ipAddress;
+	long port;
+	volatile bool active;
+	int failures;
+	// Read by the service thread with __sync builtins
+	uint64_t packets;
+	uint64_t bytes;
+	uint64_t errors;
+};
+
 class SinkVITA49_i;
 
 class SinkVITA49_i : public SinkVITA49_base
 {
 	ENABLE_LOGGING
+	// packet_bench.cpp drives the packetizing path without a transmit thread
+	friend class PacketBench;
 public:
 	SinkVITA49_i(const char *uuid, const char *label);
 	void __constructor__();
@@ -65,19 +123,33 @@ public:
     void vita49IFDataPacketChanged(const VITA49IFDataPacket_struct* oldVal, const VITA49IFDataPacket_struct* newVal);
     void vita49IFContextPacketChanged(const VITA49IFContextPacket_struct *oldVal, const VITA49IFContextPacket_struct *newVal);
     void advancedConfigurationChanged(const advanced_configuration_struct *oldVal, const advanced_configuration_struct *newVal);
+    void stripeLinksChanged(const std::vector<stripe_link_struct> *oldVal, const std::vector<stripe_link_struct> *newVal);
+
+    // Output port connection listeners
+    void outputConnected(const char *connectionId);
+    void outputDisconnected(const char *connectionId);
         
 	int serviceFunction();
 	void start() throw (CF::Resource::StartError, CORBA::SystemException);
 	void stop() throw (CF::Resource::StopError, CORBA::SystemException);
-	template <class IN> bool singleService(IN *dataIn, bool value);
+	void query(CF::Properties &configProperties) throw (CF::UnknownProperties, CORBA::SystemException);
+	template <class IN> bool singleService(IN *dataIn, bool value, float timeout = 0);
+	bool servicePort(int port, float timeout);
 	void TRANSMITTER();
-	void TRANSMITTER_M();
+	void TRANSMITTER_RING();
+	void TRANSMITTER_SHM();
+	void TRANSMITTER_SHARDED();
 	bool compareSRI(BULKIO::StreamSRI A, BULKIO::StreamSRI B);
 	bool mergeRecSRI(BULKIO::StreamSRI &recSRI, BULKIO::PrecisionUTCTime T);
 	void setDefaultSRI();
 	int createPayload(int, bool);
+	int autoPayloadSize(int size, int overhead);
+	int maxPayloadSize();
+	int ratePayloadSize(int size, int limit);
 	void createPacket(vrt::BasicDataPacket* pkt, TimeStamp T, int index);
-	int createIFContextPacket(BULKIO::PrecisionUTCTime t, int index);
+	void pushDataPacket(char *data, int bytes, const BULKIO::PrecisionUTCTime &T, int sampleOffset);
+	void flushAccumulator();
+	int createIFContextPacket(BULKIO::PrecisionUTCTime t, int index, bool changed);
 
 protected:
     bool readyToProcessPacket(const std::string incomingStreamId);
@@ -92,19 +164,64 @@ protected:
 
 private:
 	void initialize_values();
+	void resetStreamState();
+	void drainWorkQueue();
+	void endTransmitSession();
+	bool retargetTransmitSession();
+	void applyTransportSwap(int &sock, struct sockaddr_in &addr);
+	void queuePacket(BasicVRTPacket *vrtPacket, double time);
+	bool workQueueEmpty();
+	bool waitForWork();
+	size_t workQueueSize();
+	BasicVRTPacket* workQueueFront();
+	QueuedPacket& workQueueFrontInfo();
+	void popWorkQueue(bool sent = true);
+	bool frontDue();
+	void paceQueue();
+	void updatePacingStatus();
+	void dumpTrace();
+	void openCapture();
+	void capturePackets(const struct iovec *iov, size_t count);
+	void captureFrame(void *frame, size_t length);
+	void buildCapture(std::vector<unsigned char> &pcap);
+	void dumpCapture();
+	double sampleTime(const BULKIO::PrecisionUTCTime &T, int sampleOffset);
+	void frameVRTPacket(BasicVRLFrame *frame, BasicVRTPacket *vrtPacket, int &frameCounter);
+	size_t packFrame(std::vector<char> &frame, int &frameCounter, size_t maxFrameSize, long *packets);
+	bool packingFrames();
+	void transmitShard(TransmitLink *link);
+	void releaseShardBatch(ShardBatch &batch);
+	transmit_backend_t* openTransmitBackend(int sock, bool tcp, const struct sockaddr_in &addr);
+	void closeTransmitBackend(transmit_backend_t *backend);
+	void updateBackendStatus();
+	void openTransmitLinks();
+	void closeTransmitLinks();
+	void updateLinkStatus();
+	void retireTransmitLink(TransmitLink *link, int error);
+	void openTimestamps(int sock, bool tcp);
+	void closeTimestamps();
+	void timestampBegin();
+	void timestampSent(ssize_t result, size_t sends = 1);
+	void updateTransmitTiming();
+	size_t claimShardBatch(ShardBatch &batch, long maxDatagrams, size_t maxFrameSize);
+	int32_t orderingStream(BasicVRTPacket *vrtPacket);
 	void memoryManagement(int maxPacketLength);
+	void prewarm();
+	bool prewarmTransport();
+	void updateReadiness();
+	BasicDataPacket* takePacket();
+	void recyclePacket(BasicVRTPacket *vrtPacket);
 	void createIFContextHeader();
 	void initstreamDef(int sampleSize, bool signedPort);
     void updateStreamDef();
+    std::string attachAddress();
     void updateCurrAttach();
-    void timerThread();
 
     std::string standardPacketClassID;
 	std::string streamID;
 	TimeStamp nextTimeStamp;
 	BULKIO::VITA49StreamDefinition _streamDef;
 	boost::thread* _transmitThread;
-	boost::thread* _contextThread;
 	boost::asio::io_service io;
 	boost::asio::deadline_timer *t;
 	bool timer_valid;
@@ -114,6 +231,9 @@ private:
 	boost::mutex sriLock;
 	bool launch_tx_thread();
 	void destroy_tx_thread();
+	std::string outputInterface();
+	void updateInterfaceMtu();
+	long transmitSegmented(int sock, const struct sockaddr_in &addr, std::vector<BasicVRLFrame*> &frames, int &frameCounter, long maxDatagrams);
 	bool runThread;
 	bool waitForContext;
 	bool tx_thead_running;
@@ -122,7 +242,8 @@ private:
 	int remainingSize;
 	multicast_t multi_server;
 	unicast_t uni_server;
-	long timeOut;
+	packet_ring_t* packetRing;
+	shm_ring_t* shmRing;
 	PayloadFormat *pf;
 	BasicContextPacket *contextPacket;
 
@@ -136,21 +257,78 @@ private:
 
 
 	bool multicast;
+	bool useGso;
+	bool precomputeCrc;
+	vrl_crc_count_t crcCountTerms;
+	// Kernel transmit timestamps of the single transmit thread's socket, with tx_timestamping
+	boost::mutex timingLock;
+	tx_timestamp_t *txTimestamps;
+
+	// Backends of the running transmit threads, and the totals of closed ones
+	boost::mutex backendLock;
+	std::vector<transmit_backend_t*> txBackends;
+	uint64_t retiredBackendCalls;
+	uint64_t retiredBackendErrors;
+
+	// The first link sends on uni_server or multi_server
+	std::vector<TransmitLink*> transmitLinks;
+	double linkStatusTime;
+	long shardBatchSize;
+	bool strictStreamOrder;
+	int shardFrameCounter;
+	std::set<int32_t> streamsInFlight;
 	unsigned long lowMulti;
 	unsigned long highMulti;
 
 	VITA49Settings VITAProcess;
 	bool waitingForSRI;
     bool shouldUpdateStream;
+    bool shouldRetarget;
+    bool shouldResizePayload;
+    float _defaultThreadDelay;
+
+	// Destination switch handed from the service thread to the transmit thread
+	boost::mutex transportLock;
+	boost::condition_variable transportSwapped;
+	bool transportSwapPending;
+	int pendingSock;
+	struct sockaddr_in pendingAddr;
+
+	// Output connections, maintained by the port listeners so the data path never
+	// copies the port's connection sequence; read and written with __sync builtins
+	boost::mutex connectionLock;
+	std::set<std::string> outputConnectionIds;
+	volatile int _outputConnections;
 
 	omni_mutex dataAvailableMutex;
 	omni_condition* dataAvailableSignal;
 
+	// Pool of data packets, up to number_of_buffers, reset to blankPacket's header
 	boost::mutex BankLock;
 	std::queue<BasicVRTPacket* > Bank2;
+	BasicDataPacket *blankPacket;
 
 	boost::mutex workQueueLock;
+	// Signalled by queuePacket, so idle transmit threads wake for new packets
+	boost::condition_variable workQueued;
 	std::queue<BasicVRTPacket* > workQueue2;
+	std::queue<QueuedPacket> packetInfo;
+	// Priority lane for context packets, sent ahead of workQueue2 unless pacing
+	std::queue<BasicVRTPacket* > contextQueue;
+	std::queue<QueuedPacket> contextInfo;
+
+	// Pacing, guarded by workQueueLock; with PACING_RELATIVE a packet is due
+	// pacingAnchor seconds after its timestamp, set by the stream's first packet
+	int pacingMode;
+	double pacingOffset;
+	bool pacingAnchored;
+	double pacingAnchor;
+	tx_timing_stats_t pacingLateness;
+	uint64_t pacingLate;
+
+	// Copies of the last packets sent, with capture_packets
+	boost::mutex captureLock;
+	capture_ring_t *captureRing;
 
 	bool createMem;
 	long numBuffers;
@@ -184,7 +362,6 @@ private:
 			sri->keywords[keySize].value = value;
 			return true;
 		}
-	int dataIndex;
 	int packetCount;
 	int contextCount;
 	int samplesPerPacket;
@@ -229,14 +406,20 @@ private:
 		return curr;
 	}
 
-	BULKIO::PrecisionUTCTime _tContext;
+	bool contextPending;
+	double nextContextDeadline;
 
 
 	char* spareBuffer;
+	unsigned int spareBufferSize;
 	int _throttleTime;
 
 	StandardDataPacket *standardDPacket;
 	unsigned int leftOverDataSize;
+	BULKIO::PrecisionUTCTime leftOverTime;
+	int leftOverOffset;
+	double leftOverDeadline;
+	int activePort;
 	bool was_it_valid;
 
 	Ephemeris processingEphemeris;
@@ -247,6 +430,12 @@ private:
 	GEOLOCATION_GPS_struct geolocation_structure;
 	int streamIDoffset;
 	int vita49_payload_size;
+	// Payload sized for the interface MTU with auto_payload_size, 0 when not in use;
+	// it takes the place of vita49_payload_size, which keeps max_payload_size
+	int automaticPayloadSize;
+	int interfaceMtu;
+	int _sampleSize;
+	bool _signedPort;
 	long burstPacketCount;
 	bool sendAttach;
 
@@ -270,6 +459,8 @@ private:
 	bool multicast_udp_open;
 
 	unicast_tcp_t tcp_server;
+	// The connection TRANSMITTER accepted on tcp_server, -1 when there is none
+	unicast_tcp_t tcp_client;
 };
 
 
@@ -160,6 +160,48 @@ void SinkVITA49_base::loadProperties()
                 "external",
                 "configure");
 
+    addProperty(transmit_timing,
+                transmit_timing_struct(),
+                "transmit_timing",
+                "",
+                "readonly",
+                "",
+                "external",
+                "configure");
+
+    addProperty(pacing_status,
+                pacing_status_struct(),
+                "pacing_status",
+                "",
+                "readonly",
+                "",
+                "external",
+                "configure");
+
+    addProperty(packet_capture,
+                "packet_capture",
+                "",
+                "readonly",
+                "",
+                "external",
+                "configure");
+
+    addProperty(stripe_links,
+                "stripe_links",
+                "",
+                "readwrite",
+                "",
+                "external",
+                "configure");
+
+    addProperty(stripe_link_status,
+                "stripe_link_status",
+                "",
+                "readonly",
+                "",
+                "external",
+                "configure");
+
 }
 
 
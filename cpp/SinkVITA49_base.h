@@ -55,6 +55,11 @@ class SinkVITA49_base : public Resource_impl, protected ThreadedComponent
         VITA49IFContextPacket_struct VITA49IFContextPacket;
         advanced_configuration_struct advanced_configuration;
         connection_status_struct connection_status;
+        transmit_timing_struct transmit_timing;
+        pacing_status_struct pacing_status;
+        std::vector<unsigned char> packet_capture;
+        std::vector<stripe_link_struct> stripe_links;
+        std::vector<stripe_link_state_struct> stripe_link_status;
 
         // Ports
         bulkio::InShortPort *dataShort_in;
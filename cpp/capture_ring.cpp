@@ -0,0 +1,157 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include "capture_ring.h"
+
+/* pcap with nanosecond timestamps, each record a raw IPv4 packet */
+#define PCAP_MAGIC_NSEC 0xA1B23C4D
+#define PCAP_LINKTYPE_RAW 101
+#define CAPTURE_HEADERS 28     /* IPv4 and UDP */
+
+typedef struct {
+    uint32_t magic;
+    uint16_t version_major;
+    uint16_t version_minor;
+    int32_t thiszone;
+    uint32_t sigfigs;
+    uint32_t snaplen;
+    uint32_t network;
+} pcap_file_header_t;
+
+typedef struct {
+    uint32_t ts_sec;
+    uint32_t ts_nsec;
+    uint32_t incl_len;
+    uint32_t orig_len;
+} pcap_record_header_t;
+
+static inline capture_slot_t* slot_ (const capture_ring_t* ring, uint64_t index)
+{
+    return (capture_slot_t*)(ring->slots + (index % ring->count) * ring->stride);
+}
+
+capture_ring_t* capture_ring_open (unsigned int count, unsigned int snap)
+{
+    capture_ring_t* ring = (capture_ring_t*)calloc(1, sizeof(capture_ring_t));
+    if (ring == NULL)
+        return NULL;
+    ring->count = count;
+    ring->snap = snap;
+    ring->stride = (sizeof(capture_slot_t) + snap + 7) & ~(size_t)7;
+    ring->slots = (uint8_t*)malloc(ring->stride * count);
+    if (ring->slots == NULL) {
+        free(ring);
+        return NULL;
+    }
+    return ring;
+}
+
+void capture_ring_add (capture_ring_t* ring, const struct iovec* iov, size_t count)
+{
+    struct timespec now;
+    clock_gettime(CLOCK_REALTIME, &now);
+    uint64_t ns = now.tv_sec * 1000000000ULL + now.tv_nsec;
+    for (size_t ii = 0; ii < count; ii++) {
+        capture_slot_t* slot = slot_(ring, ring->captured++);
+        slot->ns = ns;
+        slot->length = iov[ii].iov_len;
+        slot->kept = iov[ii].iov_len < ring->snap ? iov[ii].iov_len : ring->snap;
+        memcpy(slot + 1, iov[ii].iov_base, slot->kept);
+    }
+}
+
+static uint16_t ip_checksum_ (const uint8_t* header, size_t length)
+{
+    uint32_t sum = 0;
+    for (size_t ii = 0; ii < length; ii += 2)
+        sum += (header[ii] << 8) | header[ii + 1];
+    while (sum >> 16)
+        sum = (sum & 0xFFFF) + (sum >> 16);
+    return ~sum;
+}
+
+/* Writes the IPv4 and UDP headers of a datagram carrying length bytes;
+ * lengths past what the headers hold, such as large TCP frames, are capped */
+static void headers_ (uint8_t* out, size_t length, const struct sockaddr_in* src, const struct sockaddr_in* dst)
+{
+    size_t total = length + CAPTURE_HEADERS > 0xFFFF ? 0xFFFF : length + CAPTURE_HEADERS;
+    memset(out, 0, CAPTURE_HEADERS);
+    out[0] = 0x45;
+    out[2] = total >> 8;
+    out[3] = total;
+    out[6] = 0x40;                     /* don't fragment */
+    out[8] = 64;                       /* TTL */
+    out[9] = IPPROTO_UDP;
+    memcpy(out + 12, &src->sin_addr, 4);
+    memcpy(out + 16, &dst->sin_addr, 4);
+    uint16_t checksum = ip_checksum_(out, 20);
+    out[10] = checksum >> 8;
+    out[11] = checksum;
+    memcpy(out + 20, &src->sin_port, 2);
+    memcpy(out + 22, &dst->sin_port, 2);
+    out[24] = (total - 20) >> 8;
+    out[25] = total - 20;
+}
+
+size_t capture_ring_pcap (const capture_ring_t* ring, const struct sockaddr_in* src, const struct sockaddr_in* dst, void* out)
+{
+    uint64_t first = ring->captured > ring->count ? ring->captured - ring->count : 0;
+    size_t size = sizeof(pcap_file_header_t);
+    for (uint64_t ii = first; ii < ring->captured; ii++)
+        size += sizeof(pcap_record_header_t) + CAPTURE_HEADERS + slot_(ring, ii)->kept;
+    if (out == NULL)
+        return size;
+
+    uint8_t* pos = (uint8_t*)out;
+    pcap_file_header_t file;
+    file.magic = PCAP_MAGIC_NSEC;
+    file.version_major = 2;
+    file.version_minor = 4;
+    file.thiszone = 0;
+    file.sigfigs = 0;
+    file.snaplen = ring->snap + CAPTURE_HEADERS;
+    file.network = PCAP_LINKTYPE_RAW;
+    memcpy(pos, &file, sizeof(file));
+    pos += sizeof(file);
+    for (uint64_t ii = first; ii < ring->captured; ii++) {
+        const capture_slot_t* slot = slot_(ring, ii);
+        pcap_record_header_t record;
+        record.ts_sec = slot->ns / 1000000000ULL;
+        record.ts_nsec = slot->ns % 1000000000ULL;
+        record.incl_len = CAPTURE_HEADERS + slot->kept;
+        record.orig_len = CAPTURE_HEADERS + slot->length;
+        memcpy(pos, &record, sizeof(record));
+        pos += sizeof(record);
+        headers_(pos, slot->length, src, dst);
+        pos += CAPTURE_HEADERS;
+        memcpy(pos, slot + 1, slot->kept);
+        pos += slot->kept;
+    }
+    return size;
+}
+
+void capture_ring_close (capture_ring_t* ring)
+{
+    free(ring->slots);
+    free(ring);
+}
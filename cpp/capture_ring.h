@@ -0,0 +1,68 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#ifndef CAPTURE_RING_H_
+#define CAPTURE_RING_H_
+
+#include <stddef.h>
+#include <stdint.h>
+#include <sys/uio.h>
+#include <netinet/in.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*
+ * Copies of the last packets sent, for inspection without a packet capture
+ * tool. Each packet is copied, up to snap bytes, into the oldest of count
+ * fixed slots. The ring is written out in pcap format, each packet behind an
+ * IPv4 and a UDP header made up from the given addresses, so capture tools
+ * decode it as they would traffic from the wire. Not thread safe; callers
+ * serialize.
+ */
+typedef struct {
+    uint64_t ns;           /* CLOCK_REALTIME when copied */
+    uint32_t length;       /* bytes in the packet */
+    uint32_t kept;         /* bytes copied, at most snap */
+} capture_slot_t;
+
+typedef struct {
+    unsigned int count;    /* slots */
+    unsigned int snap;     /* bytes kept of each packet */
+    size_t stride;
+    uint64_t captured;     /* packets copied since opened */
+    uint8_t* slots;
+} capture_ring_t;
+
+/* A ring of count packets keeping up to snap bytes of each; NULL if memory runs out */
+capture_ring_t* capture_ring_open (unsigned int count, unsigned int snap);
+/* Copies count packets, one per iovec */
+void capture_ring_add (capture_ring_t* ring, const struct iovec* iov, size_t count);
+/* Writes the ring, oldest packet first, as a pcap file into out and returns
+ * its size; with out NULL, only returns the size */
+size_t capture_ring_pcap (const capture_ring_t* ring, const struct sockaddr_in* src, const struct sockaddr_in* dst, void* out);
+void capture_ring_close (capture_ring_t* ring);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif /* CAPTURE_RING_H_ */
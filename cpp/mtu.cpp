@@ -0,0 +1,75 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#include <sys/types.h>
+#include <sys/socket.h>
+#include <sys/ioctl.h>
+#include <netinet/in.h>
+#include <arpa/inet.h>
+#include <net/if.h>
+#include <string.h>
+#include <unistd.h>
+#include "mtu.h"
+
+int interface_mtu (const char* iface)
+{
+    int sock = socket(AF_INET, SOCK_DGRAM, IPPROTO_UDP);
+    if (sock < 0)
+        return -1;
+
+    struct ifreq dev;
+    memset(&dev, 0, sizeof(dev));
+    strncpy(dev.ifr_name, iface, IFNAMSIZ - 1);
+    int mtu = -1;
+    if (ioctl(sock, SIOCGIFMTU, &dev) == 0)
+        mtu = dev.ifr_mtu;
+
+    close(sock);
+    return mtu;
+}
+
+int path_mtu (const char* iface, const char* address, int port)
+{
+    int sock = socket(AF_INET, SOCK_DGRAM, IPPROTO_UDP);
+    if (sock < 0)
+        return -1;
+
+    /* Restrict the route lookup to the requested device when we are allowed to */
+    if (iface && *iface)
+        setsockopt(sock, SOL_SOCKET, SO_BINDTODEVICE, iface, strlen(iface));
+
+    struct sockaddr_in addr;
+    memset(&addr, 0, sizeof(addr));
+    addr.sin_family = AF_INET;
+    addr.sin_addr.s_addr = inet_addr(address);
+    addr.sin_port = htons(port);
+
+    /* Connecting a UDP socket sends nothing; it only resolves the route,
+     * which carries the path MTU learned by the kernel */
+    int mtu = -1;
+    if (connect(sock, (struct sockaddr*)&addr, sizeof(addr)) == 0) {
+        socklen_t len = sizeof(mtu);
+        if (getsockopt(sock, IPPROTO_IP, IP_MTU, &mtu, &len) != 0)
+            mtu = -1;
+    }
+
+    close(sock);
+    return mtu;
+}
@@ -0,0 +1,44 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#ifndef MTU_H_
+#define MTU_H_
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/* Size in bytes of the IPv4 and UDP headers that precede every datagram */
+#define IPV4_HEADER_SIZE 20
+#define UDP_DATAGRAM_HEADER_SIZE 8
+/* Largest datagram the IPv4 total length field can describe */
+#define IPV4_MAX_PACKET_SIZE 65535
+
+/* Returns the MTU of the named interface, or -1 if it does not exist */
+int interface_mtu (const char* iface);
+/* Returns the MTU of the route to address (the path MTU when one has been
+ * discovered), or -1 if no route could be determined */
+int path_mtu (const char* iface, const char* address, int port);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif /* MTU_H_ */
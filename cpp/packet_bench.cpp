@@ -0,0 +1,368 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+/* Measures the per-packet cost of the packetizing path: calcNextTimeStamp,
+ * createPacket, createIFContextPacket, mergeRecSRI and the singleService
+ * loop, for each input port type, using synthetic SRI and samples pushed
+ * straight into the component's input ports. No transmit thread runs; the
+ * work queue is emptied back into the packet pool between measurements, as
+ * the transmitter would. Built with `./configure --enable-benchmarks`.
+ *
+ * Allocations are counted by interposing malloc, calloc and realloc, and
+ * copies by interposing memcpy and memmove, on the benchmark thread only;
+ * copies the compiler inlines are not seen. */
+
+#include <dlfcn.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include <ossie/CorbaUtils.h>
+#include "SinkVITA49.h"
+
+extern "C" {
+void* __libc_malloc (size_t size);
+void* __libc_calloc (size_t count, size_t size);
+void* __libc_realloc (void* ptr, size_t size);
+}
+
+static __thread bool counting = false;
+static __thread unsigned long long allocations = 0;
+static __thread unsigned long long copied = 0;
+
+extern "C" void* malloc (size_t size) throw ()
+{
+    if (counting)
+        allocations++;
+    return __libc_malloc(size);
+}
+
+extern "C" void* calloc (size_t count, size_t size) throw ()
+{
+    if (counting)
+        allocations++;
+    return __libc_calloc(count, size);
+}
+
+extern "C" void* realloc (void* ptr, size_t size) throw ()
+{
+    if (counting)
+        allocations++;
+    return __libc_realloc(ptr, size);
+}
+
+typedef void* (*copy_function)(void*, const void*, size_t);
+static copy_function real_memcpy = NULL;
+static copy_function real_memmove = NULL;
+
+/* Used only while dlsym itself is looking up the real functions */
+static void* bootstrap_copy (void* dst, const void* src, size_t length)
+{
+    volatile char* d = (volatile char*) dst;
+    const volatile char* s = (const volatile char*) src;
+    if (d < s) {
+        for (size_t i = 0; i < length; i++)
+            d[i] = s[i];
+    } else {
+        for (size_t i = length; i > 0; i--)
+            d[i - 1] = s[i - 1];
+    }
+    return dst;
+}
+
+static copy_function resolve (copy_function* slot, const char* name)
+{
+    if (*slot == NULL) {
+        *slot = bootstrap_copy;
+        *slot = (copy_function) dlsym(RTLD_NEXT, name);
+        if (*slot == NULL)
+            *slot = bootstrap_copy;
+    }
+    return *slot;
+}
+
+extern "C" void* memcpy (void* dst, const void* src, size_t length) throw ()
+{
+    if (counting)
+        copied += length;
+    return resolve(&real_memcpy, "memcpy")(dst, src, length);
+}
+
+extern "C" void* memmove (void* dst, const void* src, size_t length) throw ()
+{
+    if (counting)
+        copied += length;
+    return resolve(&real_memmove, "memmove")(dst, src, length);
+}
+
+static double now ()
+{
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+/* Accumulates time, allocations and copies over the measured sections */
+struct Meter {
+    double elapsed;
+    unsigned long long allocations;
+    unsigned long long copied;
+    unsigned long long packets;
+    double started;
+
+    Meter () : elapsed(0), allocations(0), copied(0), packets(0), started(0) {}
+
+    void start ()
+    {
+        ::allocations = 0;
+        ::copied = 0;
+        counting = true;
+        started = now();
+    }
+
+    void stop (unsigned long long count)
+    {
+        double stopped = now();
+        counting = false;
+        elapsed += stopped - started;
+        allocations += ::allocations;
+        copied += ::copied;
+        packets += count;
+    }
+
+    void report (const char* name, const char* type) const
+    {
+        double n = packets > 0 ? (double) packets : 1.0;
+        printf("%-24s %-7s %10.1f %14.2f %20.1f\n", name, type, elapsed * 1e9 / n, allocations / n, copied / n);
+    }
+};
+
+struct Options {
+    long packets;
+    long transferSamples;
+    bool complex;
+    const char* type;
+};
+
+/* Friend of SinkVITA49_i, so it can reach the work queue and packet pool */
+class PacketBench {
+public:
+    static void run (const char* type, int port, size_t sampleSize, const Options& options);
+
+private:
+    template <class PORT> static void push (PORT* in, const BULKIO::StreamSRI* sri, size_t count, const BULKIO::PrecisionUTCTime& T, const std::string& streamID);
+    static void queueTransfer (SinkVITA49_i* sink, int port, const BULKIO::StreamSRI* sri, size_t count, const BULKIO::PrecisionUTCTime& T, const std::string& streamID);
+    static unsigned long drain (SinkVITA49_i* sink);
+    static BULKIO::StreamSRI makeSRI (const std::string& streamID, bool complex, double rf);
+};
+
+template <class PORT> void PacketBench::push (PORT* in, const BULKIO::StreamSRI* sri, size_t count, const BULKIO::PrecisionUTCTime& T, const std::string& streamID)
+{
+    if (sri != NULL)
+        in->pushSRI(*sri);
+    typename PORT::PortSequenceType data;
+    data.length(count);
+    for (size_t i = 0; i < count; i++)
+        data[i] = i % 100;
+    in->pushPacket(data, T, false, streamID.c_str());
+}
+
+/* Queues one transfer, preceded by sri when given, on the input port with
+ * the given index (servicePort's numbering) */
+void PacketBench::queueTransfer (SinkVITA49_i* sink, int port, const BULKIO::StreamSRI* sri, size_t count, const BULKIO::PrecisionUTCTime& T, const std::string& streamID)
+{
+    switch (port) {
+    case 0: push(sink->dataDouble_in, sri, count, T, streamID); break;
+    case 1: push(sink->dataFloat_in, sri, count, T, streamID); break;
+    case 2: push(sink->dataUshort_in, sri, count, T, streamID); break;
+    case 3: push(sink->dataShort_in, sri, count, T, streamID); break;
+    case 4: push(sink->dataChar_in, sri, count, T, streamID); break;
+    case 5: push(sink->dataOctet_in, sri, count, T, streamID); break;
+    }
+}
+
+/* Empties the work queue into the packet pool the way the transmitter does
+ * after sending; returns the number of packets removed */
+unsigned long PacketBench::drain (SinkVITA49_i* sink)
+{
+    unsigned long count = 0;
+    boost::mutex::scoped_lock lock(sink->workQueueLock);
+    while (!sink->workQueueEmpty()) {
+        BasicVRTPacket* pkt = sink->workQueueFront();
+        sink->popWorkQueue(false);
+        sink->recyclePacket(pkt);
+        count++;
+    }
+    return count;
+}
+
+BULKIO::StreamSRI PacketBench::makeSRI (const std::string& streamID, bool complex, double rf)
+{
+    BULKIO::StreamSRI sri = bulkio::sri::create(streamID, 10e6);
+    sri.mode = complex ? 1 : 0;
+    sri.keywords.length(3);
+    sri.keywords[0].id = CORBA::string_dup("COL_RF");
+    sri.keywords[0].value <<= rf;
+    sri.keywords[1].id = CORBA::string_dup("COL_BW");
+    sri.keywords[1].value <<= 8e6;
+    sri.keywords[2].id = CORBA::string_dup("DATA_GAIN");
+    sri.keywords[2].value <<= (CORBA::Float) 10.0;
+    return sri;
+}
+
+void PacketBench::run (const char* type, int port, size_t sampleSize, const Options& options)
+{
+    SinkVITA49_i* sink = new SinkVITA49_i("packet_bench", "packet_bench");
+    sink->advanced_configuration.force_transmit = true;
+    sink->advancedConfigurationChanged(&sink->advanced_configuration, &sink->advanced_configuration);
+    sink->runThread = true;
+
+    std::string streamID = std::string("packet_bench_") + type;
+    BULKIO::StreamSRI sri[2] = { makeSRI(streamID, options.complex, 1e9), makeSRI(streamID, options.complex, 2e9) };
+    BULKIO::PrecisionUTCTime T = bulkio::time::utils::now();
+    size_t transferSamples = options.transferSamples * (options.complex ? 2 : 1);
+
+    // The first transfer sets up the stream and the payload for this type
+    queueTransfer(sink, port, &sri[0], transferSamples, T, streamID);
+    sink->servicePort(port, 0);
+    drain(sink);
+    if (sink->samplesPerPacket < 1) {
+        printf("%-24s %-7s no packets (payload setup failed)\n", "singleService", type);
+        delete sink;
+        return;
+    }
+    const long batch = 64;
+
+    Meter timestamps;
+    for (long done = 0; done < options.packets; done += batch) {
+        timestamps.start();
+        for (long i = 0; i < batch; i++)
+            sink->calcNextTimeStamp(T, sri[0].xdelta, (done + i) * sink->samplesPerPacket);
+        timestamps.stop(batch);
+    }
+    timestamps.report("calcNextTimeStamp", type);
+
+    Meter packets;
+    BasicDataPacket* pkt = sink->takePacket();
+    pkt->setPayloadFormat(sink->pf->getBits());
+    pkt->setPayloadLength(sink->samplesPerPacket * (sri[0].mode + 1) * sampleSize);
+    TimeStamp ts = sink->calcNextTimeStamp(T, sri[0].xdelta, 0);
+    for (long done = 0; done < options.packets; done += batch) {
+        packets.start();
+        for (long i = 0; i < batch; i++)
+            sink->createPacket(pkt, ts, (done + i) * sink->samplesPerPacket);
+        packets.stop(batch);
+    }
+    sink->recyclePacket(pkt);
+    packets.report("createPacket", type);
+
+    Meter contexts;
+    for (long done = 0; done < options.packets; done += batch) {
+        contexts.start();
+        for (long i = 0; i < batch; i++)
+            sink->createIFContextPacket(T, (done + i) * sink->samplesPerPacket, false);
+        contexts.stop(batch);
+        drain(sink);
+    }
+    contexts.report("createIFContextPacket", type);
+
+    // Alternating keyword values make every merge a change; each batch of
+    // those ends on sri[1], so merging sri[1] again changes nothing
+    Meter merged, unchanged;
+    for (long done = 0; done < options.packets; done += batch) {
+        merged.start();
+        for (long i = 0; i < batch; i++)
+            sink->mergeRecSRI(sri[i & 1], T);
+        merged.stop(batch);
+        unchanged.start();
+        for (long i = 0; i < batch; i++)
+            sink->mergeRecSRI(sri[1], T);
+        unchanged.stop(batch);
+    }
+    merged.report("mergeRecSRI (changed)", type);
+    unchanged.report("mergeRecSRI (unchanged)", type);
+
+    // Only the service call is measured; queuing the transfer is the sender's
+    // cost. Heartbeat context packets count as packets here.
+    Meter loop;
+    while ((long) loop.packets < options.packets) {
+        queueTransfer(sink, port, NULL, transferSamples, T, streamID);
+        loop.start();
+        sink->servicePort(port, 0);
+        loop.stop(0);
+        unsigned long count = drain(sink);
+        if (count == 0)
+            break;
+        loop.packets += count;
+    }
+    loop.report("singleService", type);
+
+    delete sink;
+}
+
+static void usage (const char* name)
+{
+    printf("usage: %s [--packets N] [--transfer-samples N] [--complex] [--type double|float|ushort|short|char|octet]\n", name);
+}
+
+int main (int argc, char* argv[])
+{
+    Options options;
+    options.packets = 100000;
+    options.transferSamples = 16384;
+    options.complex = false;
+    options.type = NULL;
+    for (int i = 1; i < argc; i++) {
+        if (strcmp(argv[i], "--packets") == 0 && i + 1 < argc) {
+            options.packets = atol(argv[++i]);
+        } else if (strcmp(argv[i], "--transfer-samples") == 0 && i + 1 < argc) {
+            options.transferSamples = atol(argv[++i]);
+        } else if (strcmp(argv[i], "--complex") == 0) {
+            options.complex = true;
+        } else if (strcmp(argv[i], "--type") == 0 && i + 1 < argc) {
+            options.type = argv[++i];
+        } else if (strcmp(argv[i], "--help") == 0) {
+            usage(argv[0]);
+            return 0;
+        } else {
+            usage(argv[0]);
+            return 2;
+        }
+    }
+    if (options.packets < 1 || options.transferSamples < 1) {
+        usage(argv[0]);
+        return 2;
+    }
+
+    ossie::corba::CorbaInit(argc, argv);
+
+    // In servicePort's order
+    const struct {
+        const char* name;
+        size_t size;
+    } types[] = { { "double", 8 }, { "float", 4 }, { "ushort", 2 }, { "short", 2 }, { "char", 1 }, { "octet", 1 } };
+
+    printf("%-24s %-7s %10s %14s %20s\n", "benchmark", "type", "ns/packet", "allocs/packet", "bytes copied/packet");
+    for (int port = 0; port < (int) (sizeof(types) / sizeof(types[0])); port++) {
+        if (options.type == NULL || strcmp(options.type, types[port].name) == 0)
+            PacketBench::run(types[port].name, port, types[port].size, options);
+    }
+    return 0;
+}
@@ -0,0 +1,322 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#include <sys/types.h>
+#include <sys/socket.h>
+#include <sys/ioctl.h>
+#include <sys/mman.h>
+#include <sys/poll.h>
+#include <netinet/in.h>
+#include <arpa/inet.h>
+#include <net/if.h>
+#include <net/ethernet.h>
+#include <string.h>
+#include <stdlib.h>
+#include <unistd.h>
+#include <stdio.h>
+#include <errno.h>
+#include <string>
+#include "packet_ring.h"
+#include "mtu.h"
+
+/* it is probably desirable to convert to C++ and throw exceptions instead. */
+static inline void verify_ (int condition, const char* message, const char* condtext, const char* file, int line) {
+    if (!condition) {
+        char msg[256];
+        snprintf(msg, sizeof(msg), "Verify failed '%s' at line %d: %s (%s)\n", file, line, message, condtext);
+        fprintf(stderr, "%s", msg);
+        perror("perror");
+        throw(BadParameterError5(msg));
+    }
+}
+#define verify(CONDITION, MESSAGE) verify_(CONDITION, MESSAGE, #CONDITION, __FILE__, __LINE__)
+
+
+static int parse_mac_ (const char* text, uint8_t* mac)
+{
+    unsigned int b[6];
+    if (sscanf(text, "%x:%x:%x:%x:%x:%x", &b[0], &b[1], &b[2], &b[3], &b[4], &b[5]) != 6)
+        return -1;
+    for (int ii = 0; ii < 6; ii++)
+        mac[ii] = (uint8_t)b[ii];
+    return 0;
+}
+
+/* Looks the address up in the kernel neighbour table */
+static int arp_lookup_ (const char* address, uint8_t* mac)
+{
+    FILE* arp = fopen("/proc/net/arp", "r");
+    if (!arp)
+        return -1;
+    char line[256], ip[64], hw[64];
+    int found = -1;
+    unsigned int type, flags;
+    /* skip the column titles */
+    if (fgets(line, sizeof(line), arp)) {
+        while (fgets(line, sizeof(line), arp)) {
+            if (sscanf(line, "%63s 0x%x 0x%x %63s", ip, &type, &flags, hw) == 4 &&
+                !strcmp(ip, address) && (flags & 0x2) && parse_mac_(hw, mac) == 0) {
+                found = 0;
+                break;
+            }
+        }
+    }
+    fclose(arp);
+    return found;
+}
+
+/* Resolves the destination MAC address, prompting the kernel to ARP for a
+ * unicast destination that is not in the neighbour table yet */
+static int resolve_mac_ (const char* iface, const char* group, int loopback, uint8_t* mac)
+{
+    in_addr_t ip = ntohl(inet_addr(group));
+    if (loopback) {
+        memset(mac, 0, 6);
+        return 0;
+    }
+    if (IN_MULTICAST(ip)) {
+        mac[0] = 0x01; mac[1] = 0x00; mac[2] = 0x5e;
+        mac[3] = (ip >> 16) & 0x7f; mac[4] = (ip >> 8) & 0xff; mac[5] = ip & 0xff;
+        return 0;
+    }
+    if (arp_lookup_(group, mac) == 0)
+        return 0;
+
+    int sock = socket(AF_INET, SOCK_DGRAM, IPPROTO_UDP);
+    if (sock < 0)
+        return -1;
+    setsockopt(sock, SOL_SOCKET, SO_BINDTODEVICE, iface, strlen(iface));
+    struct sockaddr_in addr;
+    memset(&addr, 0, sizeof(addr));
+    addr.sin_family = AF_INET;
+    addr.sin_addr.s_addr = inet_addr(group);
+    /* the discard port, so the VITA49 receiver never sees the probe */
+    addr.sin_port = htons(9);
+    sendto(sock, NULL, 0, 0, (struct sockaddr*)&addr, sizeof(addr));
+    close(sock);
+
+    for (int ii = 0; ii < 20; ii++) {
+        usleep(50000);
+        if (arp_lookup_(group, mac) == 0)
+            return 0;
+    }
+    return -1;
+}
+
+static uint32_t checksum_add_ (uint32_t sum, const uint8_t* data, size_t bytes)
+{
+    for (size_t ii = 0; ii + 1 < bytes; ii += 2)
+        sum += (data[ii] << 8) | data[ii + 1];
+    return sum;
+}
+
+static uint16_t checksum_fold_ (uint32_t sum)
+{
+    while (sum >> 16)
+        sum = (sum & 0xffff) + (sum >> 16);
+    return (uint16_t)~sum;
+}
+
+
+packet_ring_t* packet_ring_server (const char* iface, unsigned short vlan, const char* src_ip, const char* dest_mac, const char* group, int port, unsigned int frames)
+{
+    packet_ring_t* ring = (packet_ring_t*)calloc(1, sizeof(packet_ring_t));
+    verify(ring != 0, "memory allocation");
+    ring->sock = -1;
+    ring->ring = (uint8_t*)MAP_FAILED;
+    try {
+        ring->sock = socket(AF_PACKET, SOCK_RAW, 0);
+        verify(ring->sock >= 0, "create packet socket (requires CAP_NET_RAW)");
+
+        struct ifreq dev;
+        memset(&dev, 0, sizeof(dev));
+        strncpy(dev.ifr_name, iface, IFNAMSIZ - 1);
+        verify(ioctl(ring->sock, SIOCGIFFLAGS, &dev) >= 0, "get flags");
+        verify(dev.ifr_flags & IFF_UP, "interface up");
+        int loopback = (dev.ifr_flags & IFF_LOOPBACK) != 0;
+        verify(ioctl(ring->sock, SIOCGIFINDEX, &dev) == 0, "get index");
+        int ifindex = dev.ifr_ifindex;
+        verify(ioctl(ring->sock, SIOCGIFHWADDR, &dev) == 0, "get hardware address");
+        uint8_t src_mac[6];
+        memcpy(src_mac, dev.ifr_hwaddr.sa_data, 6);
+
+        /* Source address: explicit, else the VLAN sub-interface if the host has one, else the device */
+        in_addr_t saddr = 0;
+        if (src_ip && *src_ip) {
+            saddr = inet_addr(src_ip);
+        } else {
+            char vlan_iface[IFNAMSIZ];
+            snprintf(vlan_iface, sizeof(vlan_iface), "%s.%u", iface, vlan);
+            struct ifreq addr_dev;
+            memset(&addr_dev, 0, sizeof(addr_dev));
+            strncpy(addr_dev.ifr_name, vlan ? vlan_iface : iface, IFNAMSIZ - 1);
+            if (ioctl(ring->sock, SIOCGIFADDR, &addr_dev) != 0 && vlan) {
+                strncpy(addr_dev.ifr_name, iface, IFNAMSIZ - 1);
+                ioctl(ring->sock, SIOCGIFADDR, &addr_dev);
+            }
+            saddr = ((struct sockaddr_in*)&addr_dev.ifr_addr)->sin_addr.s_addr;
+        }
+
+        uint8_t dst_mac[6];
+        if (dest_mac && *dest_mac) {
+            verify(parse_mac_(dest_mac, dst_mac) == 0, "parse destination MAC address");
+        } else {
+            verify(resolve_mac_(vlan ? "" : iface, group, loopback, dst_mac) == 0, "resolve destination MAC address");
+        }
+
+        /* Ethernet, optional 802.1Q tag, IPv4 and UDP header template */
+        uint8_t* h = ring->header;
+        memcpy(h, dst_mac, 6);
+        memcpy(h + 6, src_mac, 6);
+        h += 12;
+        if (vlan) {
+            *h++ = 0x81; *h++ = 0x00;
+            *h++ = (vlan >> 8) & 0x0f; *h++ = vlan & 0xff;
+        }
+        *h++ = 0x08; *h++ = 0x00;
+        ring->ip_offset = h - ring->header;
+        uint8_t* ip = h;
+        ip[0] = 0x45;           /* version 4, 5 word header */
+        ip[6] = 0x40;           /* don't fragment */
+        ip[8] = 32;             /* ttl, as the UDP sockets use */
+        ip[9] = IPPROTO_UDP;
+        memcpy(ip + 12, &saddr, 4);
+        in_addr_t daddr = inet_addr(group);
+        memcpy(ip + 16, &daddr, 4);
+        uint8_t* udp = ip + IPV4_HEADER_SIZE;
+        uint16_t sport = htons(port), dport = htons(port);
+        memcpy(udp, &sport, 2);
+        memcpy(udp + 2, &dport, 2);
+        ring->header_len = (udp + UDP_DATAGRAM_HEADER_SIZE) - ring->header;
+        /* Only the total length and id change per datagram */
+        ring->ip_checksum_base = checksum_add_(0, ip, IPV4_HEADER_SIZE);
+
+        /* Frames are sized for the device MTU */
+        int mtu = interface_mtu(iface);
+        verify(mtu > 0, "get mtu");
+        ring->max_payload = mtu - IPV4_HEADER_SIZE - UDP_DATAGRAM_HEADER_SIZE;
+        unsigned int needed = TPACKET_ALIGN(sizeof(struct tpacket2_hdr)) + ring->header_len + ring->max_payload;
+        ring->frame_size = TPACKET_ALIGNMENT;
+        while (ring->frame_size < needed)
+            ring->frame_size <<= 1;
+        unsigned int block_size = getpagesize();
+        while (block_size < ring->frame_size)
+            block_size <<= 1;
+        unsigned int frames_per_block = block_size / ring->frame_size;
+        unsigned int blocks = (frames + frames_per_block - 1) / frames_per_block;
+        if (blocks == 0)
+            blocks = 1;
+
+        int version = TPACKET_V2;
+        verify(setsockopt(ring->sock, SOL_PACKET, PACKET_VERSION, &version, sizeof(version)) == 0, "set tpacket version");
+        struct tpacket_req req;
+        memset(&req, 0, sizeof(req));
+        req.tp_block_size = block_size;
+        req.tp_block_nr = blocks;
+        req.tp_frame_size = ring->frame_size;
+        req.tp_frame_nr = blocks * frames_per_block;
+        verify(setsockopt(ring->sock, SOL_PACKET, PACKET_TX_RING, &req, sizeof(req)) == 0, "set tx ring");
+        ring->frame_nr = req.tp_frame_nr;
+        ring->ring_size = (size_t)block_size * blocks;
+        ring->ring = (uint8_t*)mmap(NULL, ring->ring_size, PROT_READ | PROT_WRITE, MAP_SHARED, ring->sock, 0);
+        verify(ring->ring != MAP_FAILED, "map tx ring");
+
+        ring->addr.sll_family = AF_PACKET;
+        ring->addr.sll_protocol = htons(ETH_P_ALL);
+        ring->addr.sll_ifindex = ifindex;
+        verify(bind(ring->sock, (struct sockaddr*)&ring->addr, sizeof(ring->addr)) == 0, "bind packet socket");
+    } catch (...) {
+        packet_ring_close(ring);
+        throw;
+    }
+    return ring;
+}
+
+
+int packet_ring_queue (packet_ring_t* ring, const void* buffer, size_t bytes)
+{
+    if (bytes > ring->max_payload)
+        return -1;
+    uint8_t* frame = ring->ring + (size_t)ring->head * ring->frame_size;
+    struct tpacket2_hdr* hdr = (struct tpacket2_hdr*)frame;
+    if (hdr->tp_status != TP_STATUS_AVAILABLE)
+        return -1;
+
+    uint8_t* data = frame + TPACKET_ALIGN(sizeof(struct tpacket2_hdr));
+    memcpy(data, ring->header, ring->header_len);
+    memcpy(data + ring->header_len, buffer, bytes);
+
+    uint8_t* ip = data + ring->ip_offset;
+    uint16_t ip_len = IPV4_HEADER_SIZE + UDP_DATAGRAM_HEADER_SIZE + bytes;
+    uint16_t id = ring->ip_id++;
+    ip[2] = ip_len >> 8; ip[3] = ip_len & 0xff;
+    ip[4] = id >> 8; ip[5] = id & 0xff;
+    uint16_t sum = checksum_fold_(ring->ip_checksum_base + ip_len + id);
+    ip[10] = sum >> 8; ip[11] = sum & 0xff;
+    uint8_t* udp = ip + IPV4_HEADER_SIZE;
+    uint16_t udp_len = UDP_DATAGRAM_HEADER_SIZE + bytes;
+    udp[4] = udp_len >> 8; udp[5] = udp_len & 0xff;
+    /* A zero UDP checksum means none was computed, which IPv4 allows */
+    udp[6] = 0; udp[7] = 0;
+
+    hdr->tp_len = ring->header_len + bytes;
+    __sync_synchronize();
+    hdr->tp_status = TP_STATUS_SEND_REQUEST;
+    ring->head = (ring->head + 1) % ring->frame_nr;
+    ring->queued++;
+    return 0;
+}
+
+
+int packet_ring_flush (packet_ring_t* ring)
+{
+    int queued = ring->queued;
+    if (queued == 0)
+        return 0;
+    if (send(ring->sock, NULL, 0, MSG_DONTWAIT) < 0 && errno != EAGAIN && errno != ENOBUFS)
+        return -1;
+    ring->queued = 0;
+    return queued;
+}
+
+
+int packet_ring_poll_out (packet_ring_t* ring, int timeout)
+{
+    struct tpacket2_hdr* hdr = (struct tpacket2_hdr*)(ring->ring + (size_t)ring->head * ring->frame_size);
+    if (hdr->tp_status == TP_STATUS_AVAILABLE)
+        return 1;
+    struct pollfd pfd;
+    pfd.fd = ring->sock;
+    pfd.events = POLLOUT;
+    poll(&pfd, 1, timeout);
+    return hdr->tp_status == TP_STATUS_AVAILABLE;
+}
+
+
+void packet_ring_close (packet_ring_t* ring)
+{
+    if (!ring)
+        return;
+    if (ring->ring != MAP_FAILED)
+        munmap(ring->ring, ring->ring_size);
+    if (ring->sock >= 0)
+        close(ring->sock);
+    free(ring);
+}
@@ -0,0 +1,84 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#ifndef PACKET_RING_H_
+#define PACKET_RING_H_
+
+#include <arpa/inet.h>
+#include <linux/if_packet.h>
+#include <stdint.h>
+#include <stdexcept>
+
+class BadParameterError5 : public std::runtime_error {
+public:
+    BadParameterError5(const std::string& what_arg) : std::runtime_error(what_arg) {
+    }
+};
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/* Ethernet + 802.1Q + IPv4 + UDP */
+#define PACKET_RING_MAX_HEADER_SIZE (14 + 4 + 20 + 8)
+
+/*
+ * A raw AF_PACKET socket with a memory-mapped TPACKET_V2 transmit ring.
+ * Datagrams are copied straight into ring frames behind a prebuilt
+ * Ethernet/802.1Q/IPv4/UDP header, then handed to the device with one
+ * send per batch.
+ */
+typedef struct {
+    int sock;
+    uint8_t* ring;
+    size_t ring_size;
+    unsigned int frame_size;
+    unsigned int frame_nr;
+    unsigned int head;
+    unsigned int queued;
+    unsigned int max_payload;
+    uint8_t header[PACKET_RING_MAX_HEADER_SIZE];
+    unsigned int header_len;
+    unsigned int ip_offset;
+    uint32_t ip_checksum_base;
+    uint16_t ip_id;
+    struct sockaddr_ll addr;
+} packet_ring_t;
+
+/* Opens a transmit ring on the physical device iface. A non-zero vlan adds an
+ * 802.1Q tag in the frame, so no host VLAN sub-interface is needed. dest_mac
+ * may be NULL or empty to resolve the destination (multicast mapping or the
+ * neighbour table); src_ip may be NULL or empty to use the device address. */
+packet_ring_t* packet_ring_server (const char* iface, unsigned short vlan, const char* src_ip, const char* dest_mac, const char* group, int port, unsigned int frames);
+/* Copies one UDP payload into the next ring frame. Returns 0 on success, or
+ * -1 when the ring is full (flush and wait) or the payload is too large. */
+int packet_ring_queue (packet_ring_t* ring, const void* buffer, size_t bytes);
+/* Hands all queued frames to the device. Returns the number of frames queued
+ * since the last flush, or -1 on error. */
+int packet_ring_flush (packet_ring_t* ring);
+/* Waits up to timeout milliseconds for the device to release ring frames */
+int packet_ring_poll_out (packet_ring_t* ring, int timeout);
+void packet_ring_close (packet_ring_t* ring);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif /* PACKET_RING_H_ */
@@ -0,0 +1,261 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#include <sys/types.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <sys/syscall.h>
+#include <linux/futex.h>
+#include <fcntl.h>
+#include <signal.h>
+#include <string.h>
+#include <stdlib.h>
+#include <unistd.h>
+#include <stdio.h>
+#include <errno.h>
+#include <limits.h>
+#include <time.h>
+#include <string>
+#include "shm_ring.h"
+
+/* it is probably desirable to convert to C++ and throw exceptions instead. */
+static inline void verify_ (int condition, const char* message, const char* condtext, const char* file, int line) {
+    if (!condition) {
+        char msg[100];
+        snprintf(msg, sizeof(msg), "Verify failed '%s' at line %d: %s (%s)\n", file, line, message, condtext);
+        fprintf(stderr, "%s", msg);
+        perror("perror");
+        throw(BadParameterError6(msg));
+    }
+}
+#define verify(CONDITION, MESSAGE) verify_(CONDITION, MESSAGE, #CONDITION, __FILE__, __LINE__)
+
+
+/* Shared (not process-private) futex operations, since waiters live in other processes */
+static void futex_wake_ (volatile uint32_t* word)
+{
+    syscall(SYS_futex, word, FUTEX_WAKE, INT_MAX, NULL, NULL, 0);
+}
+
+static void futex_wait_ (volatile uint32_t* word, uint32_t expected, int timeout)
+{
+    struct timespec ts;
+    ts.tv_sec = timeout / 1000;
+    ts.tv_nsec = (timeout % 1000) * 1000000L;
+    syscall(SYS_futex, word, FUTEX_WAIT, expected, timeout < 0 ? NULL : &ts, NULL, 0);
+}
+
+static inline shm_ring_slot_t* slot_ (shm_ring_t* ring, uint64_t seq)
+{
+    shm_ring_header_t* header = ring->header;
+    return (shm_ring_slot_t*)(ring->base + header->header_size + (seq % header->slot_count) * header->slot_stride);
+}
+
+static shm_ring_t* map_ (const char* name, int fd, size_t size)
+{
+    shm_ring_t* ring = (shm_ring_t*)calloc(1, sizeof(shm_ring_t));
+    verify(ring != NULL, "allocate ring");
+    ring->base = (uint8_t*)mmap(NULL, size, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+    if (ring->base == MAP_FAILED) {
+        free(ring);
+        close(fd);
+        verify(0, "map shared memory");
+    }
+    ring->fd = fd;
+    ring->size = size;
+    ring->header = (shm_ring_header_t*)ring->base;
+    ring->reader = -1;
+    strncpy(ring->name, name, sizeof(ring->name) - 1);
+    return ring;
+}
+
+shm_ring_t* shm_ring_server (const char* name, unsigned int slot_size, unsigned int slot_count)
+{
+    verify(slot_count > 0 && slot_size > 0, "ring dimensions");
+    size_t header_size = (sizeof(shm_ring_header_t) + 63) & ~(size_t)63;
+    size_t stride = (sizeof(shm_ring_slot_t) + slot_size + 63) & ~(size_t)63;
+    size_t size = header_size + stride * slot_count;
+
+    /* A ring left behind by an earlier run has stale readers and sequence numbers */
+    shm_unlink(name);
+    int fd = shm_open(name, O_CREAT | O_EXCL | O_RDWR, 0600);
+    verify(fd >= 0, "create shared memory");
+    if (ftruncate(fd, size) < 0) {
+        close(fd);
+        shm_unlink(name);
+        verify(0, "size shared memory");
+    }
+    shm_ring_t* ring = map_(name, fd, size);
+    ring->writer = 1;
+
+    shm_ring_header_t* header = ring->header;
+    header->slot_size = slot_size;
+    header->slot_count = slot_count;
+    header->slot_stride = stride;
+    header->header_size = header_size;
+    header->version = SHM_RING_VERSION;
+    __sync_synchronize();
+    /* Readers check the magic last */
+    header->magic = SHM_RING_MAGIC;
+    return ring;
+}
+
+uint8_t* shm_ring_claim (shm_ring_t* ring)
+{
+    shm_ring_slot_t* slot = slot_(ring, ring->seq);
+    slot->seq = 0;
+    __sync_synchronize();
+    return (uint8_t*)(slot + 1);
+}
+
+void shm_ring_publish (shm_ring_t* ring, size_t bytes)
+{
+    shm_ring_header_t* header = ring->header;
+    shm_ring_slot_t* slot = slot_(ring, ring->seq);
+    slot->length = bytes;
+    __sync_synchronize();
+    slot->seq = ++ring->seq;
+    header->write_seq = ring->seq;
+    __sync_fetch_and_add(&header->futex, 1);
+    /* Only pay for the system call when someone sleeps */
+    if (header->waiters)
+        futex_wake_(&header->futex);
+}
+
+int shm_ring_write (shm_ring_t* ring, const void* buffer, size_t bytes)
+{
+    if (bytes > ring->header->slot_size)
+        return -1;
+    memcpy(shm_ring_claim(ring), buffer, bytes);
+    shm_ring_publish(ring, bytes);
+    return 0;
+}
+
+uint64_t shm_ring_lag (shm_ring_t* ring)
+{
+    shm_ring_header_t* header = ring->header;
+    uint64_t lag = 0;
+    for (int ii = 0; ii < SHM_RING_MAX_READERS; ii++) {
+        if (header->readers[ii].pid != 0 && header->write_seq - header->readers[ii].read_seq > lag)
+            lag = header->write_seq - header->readers[ii].read_seq;
+    }
+    return lag;
+}
+
+uint64_t shm_ring_drops (shm_ring_t* ring)
+{
+    uint64_t drops = 0;
+    for (int ii = 0; ii < SHM_RING_MAX_READERS; ii++)
+        drops += ring->header->readers[ii].drops;
+    return drops;
+}
+
+shm_ring_t* shm_ring_client (const char* name)
+{
+    int fd = shm_open(name, O_RDWR, 0);
+    verify(fd >= 0, "open shared memory");
+    struct stat st;
+    if (fstat(fd, &st) < 0 || st.st_size < (off_t)sizeof(shm_ring_header_t)) {
+        close(fd);
+        verify(0, "shared memory is not a ring");
+    }
+    shm_ring_t* ring = map_(name, fd, st.st_size);
+    shm_ring_header_t* header = ring->header;
+    if (header->magic != SHM_RING_MAGIC || header->version != SHM_RING_VERSION) {
+        shm_ring_close(ring);
+        verify(0, "shared memory is not a ring");
+    }
+
+    /* Take a free entry, or one whose process has gone away */
+    for (int ii = 0; ii < SHM_RING_MAX_READERS && ring->reader < 0; ii++) {
+        int32_t pid = header->readers[ii].pid;
+        if (pid != 0 && !(kill(pid, 0) < 0 && errno == ESRCH))
+            continue;
+        if (__sync_bool_compare_and_swap(&header->readers[ii].pid, pid, getpid()))
+            ring->reader = ii;
+    }
+    if (ring->reader < 0) {
+        shm_ring_close(ring);
+        verify(0, "too many readers");
+    }
+    ring->seq = header->write_seq;
+    header->readers[ring->reader].read_seq = ring->seq;
+    header->readers[ring->reader].drops = 0;
+    return ring;
+}
+
+const uint8_t* shm_ring_next (shm_ring_t* ring, size_t* bytes, int timeout)
+{
+    shm_ring_header_t* header = ring->header;
+    shm_ring_reader_t* reader = &header->readers[ring->reader];
+    for (;;) {
+        uint32_t futex = header->futex;
+        __sync_synchronize();
+        uint64_t written = header->write_seq;
+        if (ring->seq < written) {
+            /* Lapped: everything older than a full ring is gone */
+            if (written - ring->seq > header->slot_count) {
+                reader->drops += written - ring->seq - header->slot_count;
+                ring->seq = written - header->slot_count;
+            }
+            shm_ring_slot_t* slot = slot_(ring, ring->seq);
+            uint64_t seq = slot->seq;
+            __sync_synchronize();
+            if (seq != ring->seq + 1) {
+                /* Being rewritten for a later frame */
+                reader->drops += 1;
+                reader->read_seq = ++ring->seq;
+                continue;
+            }
+            *bytes = slot->length;
+            return (const uint8_t*)(slot + 1);
+        }
+        if (timeout == 0)
+            return NULL;
+        __sync_fetch_and_add(&header->waiters, 1);
+        if (header->write_seq == written)
+            futex_wait_(&header->futex, futex, timeout);
+        __sync_fetch_and_sub(&header->waiters, 1);
+        if (header->write_seq == written && timeout > 0)
+            return NULL;
+    }
+}
+
+int shm_ring_done (shm_ring_t* ring)
+{
+    shm_ring_reader_t* reader = &ring->header->readers[ring->reader];
+    __sync_synchronize();
+    int intact = slot_(ring, ring->seq)->seq == ring->seq + 1;
+    if (!intact)
+        reader->drops += 1;
+    reader->read_seq = ++ring->seq;
+    return intact ? 0 : -1;
+}
+
+void shm_ring_close (shm_ring_t* ring)
+{
+    if (ring->reader >= 0)
+        ring->header->readers[ring->reader].pid = 0;
+    munmap(ring->base, ring->size);
+    close(ring->fd);
+    if (ring->writer)
+        shm_unlink(ring->name);
+    free(ring);
+}
@@ -0,0 +1,121 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#ifndef SHM_RING_H_
+#define SHM_RING_H_
+
+#include <stddef.h>
+#include <stdint.h>
+#include <stdexcept>
+
+class BadParameterError6 : public std::runtime_error {
+public:
+    BadParameterError6(const std::string& what_arg) : std::runtime_error(what_arg) {
+    }
+};
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*
+ * A single-writer, many-reader ring of frames in a named POSIX shared-memory
+ * object, for consumers on the same host. The writer never waits: a reader
+ * that falls a full ring behind loses the oldest frames and counts them as
+ * drops. Readers see frames in place and wait on a futex in the header.
+ *
+ * Layout: shm_ring_header_t, then slot_count slots of slot_stride bytes, each
+ * a shm_ring_slot_t followed by up to slot_size bytes of frame. A slot's seq
+ * is the frame's sequence number plus one once the frame is complete, and
+ * zero while it is being written.
+ */
+#define SHM_RING_MAGIC 0x4D485356 /* "VSHM" */
+#define SHM_RING_VERSION 1
+#define SHM_RING_MAX_READERS 16
+
+typedef struct {
+    volatile uint64_t read_seq;   /* sequence of the next frame this reader takes */
+    volatile uint64_t drops;      /* frames overwritten before this reader took them */
+    volatile int32_t pid;         /* 0 while the entry is free */
+    uint32_t pad[11];
+} shm_ring_reader_t;
+
+typedef struct {
+    uint32_t magic;
+    uint32_t version;
+    uint32_t slot_size;
+    uint32_t slot_count;
+    uint32_t slot_stride;
+    uint32_t header_size;
+    uint32_t pad0[10];
+    volatile uint64_t write_seq;  /* sequence of the next frame to be written */
+    volatile uint32_t futex;      /* bumped with every frame */
+    volatile uint32_t waiters;    /* readers sleeping on futex */
+    uint32_t pad1[12];
+    shm_ring_reader_t readers[SHM_RING_MAX_READERS];
+} shm_ring_header_t;
+
+typedef struct {
+    volatile uint64_t seq;
+    uint32_t length;
+    uint32_t pad;
+} shm_ring_slot_t;
+
+typedef struct {
+    int fd;
+    uint8_t* base;
+    size_t size;
+    shm_ring_header_t* header;
+    uint64_t seq;                 /* writer: next frame; reader: frame being read */
+    int reader;                   /* this reader's entry, or -1 for the writer */
+    int writer;                   /* set when this process created the ring */
+    char name[256];
+} shm_ring_t;
+
+/* Creates (replacing any previous one) and maps the named ring */
+shm_ring_t* shm_ring_server (const char* name, unsigned int slot_size, unsigned int slot_count);
+/* The next slot's frame buffer, slot_size bytes long; fill it, then publish */
+uint8_t* shm_ring_claim (shm_ring_t* ring);
+/* Makes the claimed frame visible to readers and wakes any that wait */
+void shm_ring_publish (shm_ring_t* ring, size_t bytes);
+/* Copies a frame into the ring. Returns -1 if it is larger than a slot. */
+int shm_ring_write (shm_ring_t* ring, const void* buffer, size_t bytes);
+/* Frames published but not yet taken by the slowest reader */
+uint64_t shm_ring_lag (shm_ring_t* ring);
+/* Frames lost by all readers */
+uint64_t shm_ring_drops (shm_ring_t* ring);
+
+/* Maps an existing ring and registers as a reader, starting at the newest frame */
+shm_ring_t* shm_ring_client (const char* name);
+/* Waits up to timeout milliseconds (negative waits forever) for the next
+ * frame and returns it in place, or NULL on timeout */
+const uint8_t* shm_ring_next (shm_ring_t* ring, size_t* bytes, int timeout);
+/* Releases the frame from shm_ring_next. Returns -1 if the writer overwrote
+ * it while it was being read, in which case it counts as a drop. */
+int shm_ring_done (shm_ring_t* ring);
+
+/* Unmaps the ring; the writer that created it also removes its name */
+void shm_ring_close (shm_ring_t* ring);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif /* SHM_RING_H_ */
@@ -122,6 +122,7 @@ struct VITA49Encapsulation_struct {
     {
         enable_crc = false;
         enable_vrl_frames = true;
+        max_frame_size = 0;
     };
 
     static std::string getId() {
@@ -130,6 +131,7 @@ struct VITA49Encapsulation_struct {
 
     bool enable_crc;
     bool enable_vrl_frames;
+    CORBA::Long max_frame_size;
 };
 
 inline bool operator>>= (const CORBA::Any& a, VITA49Encapsulation_struct& s) {
@@ -143,17 +145,22 @@ inline bool operator>>= (const CORBA::Any& a, VITA49Encapsulation_struct& s) {
         else if (!strcmp("VITA49Encapsulation::enable_vrl_frames", props[idx].id)) {
             if (!(props[idx].value >>= s.enable_vrl_frames)) return false;
         }
+        else if (!strcmp("VITA49Encapsulation::max_frame_size", props[idx].id)) {
+            if (!(props[idx].value >>= s.max_frame_size)) return false;
+        }
     }
     return true;
 };
 
 inline void operator<<= (CORBA::Any& a, const VITA49Encapsulation_struct& s) {
     CF::Properties props;
-    props.length(2);
+    props.length(3);
     props[0].id = CORBA::string_dup("VITA49Encapsulation::enable_crc");
     props[0].value <<= s.enable_crc;
     props[1].id = CORBA::string_dup("VITA49Encapsulation::enable_vrl_frames");
     props[1].value <<= s.enable_vrl_frames;
+    props[2].id = CORBA::string_dup("VITA49Encapsulation::max_frame_size");
+    props[2].value <<= s.max_frame_size;
     a <<= props;
 };
 
@@ -162,6 +169,8 @@ inline bool operator== (const VITA49Encapsulation_struct& s1, const VITA49Encaps
         return false;
     if (s1.enable_vrl_frames!=s2.enable_vrl_frames)
         return false;
+    if (s1.max_frame_size!=s2.max_frame_size)
+        return false;
     return true;
 };
 
@@ -374,6 +383,29 @@ struct advanced_configuration_struct {
         time_between_context_packets = 1;
         number_of_packets_in_burst = 150;
         throttle_time_between_packet_bursts = 100;
+        auto_payload_size = false;
+        udp_gso = false;
+        packet_mmap = false;
+        destination_mac = "";
+        max_packet_latency = 0;
+        target_packet_rate = 0;
+        max_transfers_per_service = 16;
+        precompute_crc = false;
+        shared_memory_name = "";
+        shared_memory_slots = 256;
+        transmit_threads = 1;
+        transmit_batch_size = 32;
+        strict_stream_order = true;
+        tx_timestamping = false;
+        transmit_backend = "socket";
+        transmit_queue_depth = 64;
+        prewarm = false;
+        transmit_pacing = "off";
+        pacing_offset = 0;
+        tracing = false;
+        trace_records = 65536;
+        capture_packets = 0;
+        capture_snap_length = 0;
     };
 
     static std::string getId() {
@@ -388,6 +420,31 @@ struct advanced_configuration_struct {
     CORBA::Long time_between_context_packets;
     CORBA::Long number_of_packets_in_burst;
     CORBA::Long throttle_time_between_packet_bursts;
+    bool auto_payload_size;
+    bool udp_gso;
+    bool packet_mmap;
+    std::string destination_mac;
+    CORBA::Long max_packet_latency;
+    double target_packet_rate;
+    CORBA::Long max_transfers_per_service;
+    bool precompute_crc;
+    std::string shared_memory_name;
+    CORBA::Long shared_memory_slots;
+    CORBA::Long transmit_threads;
+    CORBA::Long transmit_batch_size;
+    bool strict_stream_order;
+    bool tx_timestamping;
+    std::string transmit_backend;
+    CORBA::Long transmit_queue_depth;
+    bool prewarm;
+    std::string transmit_pacing;
+    double pacing_offset;
+    bool tracing;
+    CORBA::Long trace_records;
+    std::string trace_dump_file;
+    CORBA::Long capture_packets;
+    CORBA::Long capture_snap_length;
+    std::string capture_dump_file;
 };
 
 inline bool operator>>= (const CORBA::Any& a, advanced_configuration_struct& s) {
@@ -419,13 +476,88 @@ inline bool operator>>= (const CORBA::Any& a, advanced_configuration_struct& s)
         else if (!strcmp("advanced_configuration::throttle_time_between_packet_bursts", props[idx].id)) {
             if (!(props[idx].value >>= s.throttle_time_between_packet_bursts)) return false;
         }
+        else if (!strcmp("advanced_configuration::auto_payload_size", props[idx].id)) {
+            if (!(props[idx].value >>= s.auto_payload_size)) return false;
+        }
+        else if (!strcmp("advanced_configuration::udp_gso", props[idx].id)) {
+            if (!(props[idx].value >>= s.udp_gso)) return false;
+        }
+        else if (!strcmp("advanced_configuration::packet_mmap", props[idx].id)) {
+            if (!(props[idx].value >>= s.packet_mmap)) return false;
+        }
+        else if (!strcmp("advanced_configuration::destination_mac", props[idx].id)) {
+            if (!(props[idx].value >>= s.destination_mac)) return false;
+        }
+        else if (!strcmp("advanced_configuration::max_packet_latency", props[idx].id)) {
+            if (!(props[idx].value >>= s.max_packet_latency)) return false;
+        }
+        else if (!strcmp("advanced_configuration::target_packet_rate", props[idx].id)) {
+            if (!(props[idx].value >>= s.target_packet_rate)) return false;
+        }
+        else if (!strcmp("advanced_configuration::max_transfers_per_service", props[idx].id)) {
+            if (!(props[idx].value >>= s.max_transfers_per_service)) return false;
+        }
+        else if (!strcmp("advanced_configuration::precompute_crc", props[idx].id)) {
+            if (!(props[idx].value >>= s.precompute_crc)) return false;
+        }
+        else if (!strcmp("advanced_configuration::shared_memory_name", props[idx].id)) {
+            if (!(props[idx].value >>= s.shared_memory_name)) return false;
+        }
+        else if (!strcmp("advanced_configuration::shared_memory_slots", props[idx].id)) {
+            if (!(props[idx].value >>= s.shared_memory_slots)) return false;
+        }
+        else if (!strcmp("advanced_configuration::transmit_threads", props[idx].id)) {
+            if (!(props[idx].value >>= s.transmit_threads)) return false;
+        }
+        else if (!strcmp("advanced_configuration::transmit_batch_size", props[idx].id)) {
+            if (!(props[idx].value >>= s.transmit_batch_size)) return false;
+        }
+        else if (!strcmp("advanced_configuration::strict_stream_order", props[idx].id)) {
+            if (!(props[idx].value >>= s.strict_stream_order)) return false;
+        }
+        else if (!strcmp("advanced_configuration::tx_timestamping", props[idx].id)) {
+            if (!(props[idx].value >>= s.tx_timestamping)) return false;
+        }
+        else if (!strcmp("advanced_configuration::transmit_backend", props[idx].id)) {
+            if (!(props[idx].value >>= s.transmit_backend)) return false;
+        }
+        else if (!strcmp("advanced_configuration::transmit_queue_depth", props[idx].id)) {
+            if (!(props[idx].value >>= s.transmit_queue_depth)) return false;
+        }
+        else if (!strcmp("advanced_configuration::prewarm", props[idx].id)) {
+            if (!(props[idx].value >>= s.prewarm)) return false;
+        }
+        else if (!strcmp("advanced_configuration::transmit_pacing", props[idx].id)) {
+            if (!(props[idx].value >>= s.transmit_pacing)) return false;
+        }
+        else if (!strcmp("advanced_configuration::pacing_offset", props[idx].id)) {
+            if (!(props[idx].value >>= s.pacing_offset)) return false;
+        }
+        else if (!strcmp("advanced_configuration::tracing", props[idx].id)) {
+            if (!(props[idx].value >>= s.tracing)) return false;
+        }
+        else if (!strcmp("advanced_configuration::trace_records", props[idx].id)) {
+            if (!(props[idx].value >>= s.trace_records)) return false;
+        }
+        else if (!strcmp("advanced_configuration::trace_dump_file", props[idx].id)) {
+            if (!(props[idx].value >>= s.trace_dump_file)) return false;
+        }
+        else if (!strcmp("advanced_configuration::capture_packets", props[idx].id)) {
+            if (!(props[idx].value >>= s.capture_packets)) return false;
+        }
+        else if (!strcmp("advanced_configuration::capture_snap_length", props[idx].id)) {
+            if (!(props[idx].value >>= s.capture_snap_length)) return false;
+        }
+        else if (!strcmp("advanced_configuration::capture_dump_file", props[idx].id)) {
+            if (!(props[idx].value >>= s.capture_dump_file)) return false;
+        }
     }
     return true;
 };
 
 inline void operator<<= (CORBA::Any& a, const advanced_configuration_struct& s) {
     CF::Properties props;
-    props.length(8);
+    props.length(33);
     props[0].id = CORBA::string_dup("advanced_configuration::force_transmit");
     props[0].value <<= s.force_transmit;
     props[1].id = CORBA::string_dup("advanced_configuration::max_payload_size");
@@ -442,6 +574,56 @@ inline void operator<<= (CORBA::Any& a, const advanced_configuration_struct& s)
     props[6].value <<= s.number_of_packets_in_burst;
     props[7].id = CORBA::string_dup("advanced_configuration::throttle_time_between_packet_bursts");
     props[7].value <<= s.throttle_time_between_packet_bursts;
+    props[8].id = CORBA::string_dup("advanced_configuration::auto_payload_size");
+    props[8].value <<= s.auto_payload_size;
+    props[9].id = CORBA::string_dup("advanced_configuration::udp_gso");
+    props[9].value <<= s.udp_gso;
+    props[10].id = CORBA::string_dup("advanced_configuration::packet_mmap");
+    props[10].value <<= s.packet_mmap;
+    props[11].id = CORBA::string_dup("advanced_configuration::destination_mac");
+    props[11].value <<= s.destination_mac;
+    props[12].id = CORBA::string_dup("advanced_configuration::max_packet_latency");
+    props[12].value <<= s.max_packet_latency;
+    props[13].id = CORBA::string_dup("advanced_configuration::target_packet_rate");
+    props[13].value <<= s.target_packet_rate;
+    props[14].id = CORBA::string_dup("advanced_configuration::max_transfers_per_service");
+    props[14].value <<= s.max_transfers_per_service;
+    props[15].id = CORBA::string_dup("advanced_configuration::precompute_crc");
+    props[15].value <<= s.precompute_crc;
+    props[16].id = CORBA::string_dup("advanced_configuration::shared_memory_name");
+    props[16].value <<= s.shared_memory_name;
+    props[17].id = CORBA::string_dup("advanced_configuration::shared_memory_slots");
+    props[17].value <<= s.shared_memory_slots;
+    props[18].id = CORBA::string_dup("advanced_configuration::transmit_threads");
+    props[18].value <<= s.transmit_threads;
+    props[19].id = CORBA::string_dup("advanced_configuration::transmit_batch_size");
+    props[19].value <<= s.transmit_batch_size;
+    props[20].id = CORBA::string_dup("advanced_configuration::strict_stream_order");
+    props[20].value <<= s.strict_stream_order;
+    props[21].id = CORBA::string_dup("advanced_configuration::tx_timestamping");
+    props[21].value <<= s.tx_timestamping;
+    props[22].id = CORBA::string_dup("advanced_configuration::transmit_backend");
+    props[22].value <<= s.transmit_backend;
+    props[23].id = CORBA::string_dup("advanced_configuration::transmit_queue_depth");
+    props[23].value <<= s.transmit_queue_depth;
+    props[24].id = CORBA::string_dup("advanced_configuration::prewarm");
+    props[24].value <<= s.prewarm;
+    props[25].id = CORBA::string_dup("advanced_configuration::transmit_pacing");
+    props[25].value <<= s.transmit_pacing;
+    props[26].id = CORBA::string_dup("advanced_configuration::pacing_offset");
+    props[26].value <<= s.pacing_offset;
+    props[27].id = CORBA::string_dup("advanced_configuration::tracing");
+    props[27].value <<= s.tracing;
+    props[28].id = CORBA::string_dup("advanced_configuration::trace_records");
+    props[28].value <<= s.trace_records;
+    props[29].id = CORBA::string_dup("advanced_configuration::trace_dump_file");
+    props[29].value <<= s.trace_dump_file;
+    props[30].id = CORBA::string_dup("advanced_configuration::capture_packets");
+    props[30].value <<= s.capture_packets;
+    props[31].id = CORBA::string_dup("advanced_configuration::capture_snap_length");
+    props[31].value <<= s.capture_snap_length;
+    props[32].id = CORBA::string_dup("advanced_configuration::capture_dump_file");
+    props[32].value <<= s.capture_dump_file;
     a <<= props;
 };
 
@@ -462,6 +644,56 @@ inline bool operator== (const advanced_configuration_struct& s1, const advanced_
         return false;
     if (s1.throttle_time_between_packet_bursts!=s2.throttle_time_between_packet_bursts)
         return false;
+    if (s1.auto_payload_size!=s2.auto_payload_size)
+        return false;
+    if (s1.udp_gso!=s2.udp_gso)
+        return false;
+    if (s1.packet_mmap!=s2.packet_mmap)
+        return false;
+    if (s1.destination_mac!=s2.destination_mac)
+        return false;
+    if (s1.max_packet_latency!=s2.max_packet_latency)
+        return false;
+    if (s1.target_packet_rate!=s2.target_packet_rate)
+        return false;
+    if (s1.max_transfers_per_service!=s2.max_transfers_per_service)
+        return false;
+    if (s1.precompute_crc!=s2.precompute_crc)
+        return false;
+    if (s1.shared_memory_name!=s2.shared_memory_name)
+        return false;
+    if (s1.shared_memory_slots!=s2.shared_memory_slots)
+        return false;
+    if (s1.transmit_threads!=s2.transmit_threads)
+        return false;
+    if (s1.transmit_batch_size!=s2.transmit_batch_size)
+        return false;
+    if (s1.strict_stream_order!=s2.strict_stream_order)
+        return false;
+    if (s1.tx_timestamping!=s2.tx_timestamping)
+        return false;
+    if (s1.transmit_backend!=s2.transmit_backend)
+        return false;
+    if (s1.transmit_queue_depth!=s2.transmit_queue_depth)
+        return false;
+    if (s1.prewarm!=s2.prewarm)
+        return false;
+    if (s1.transmit_pacing!=s2.transmit_pacing)
+        return false;
+    if (s1.pacing_offset!=s2.pacing_offset)
+        return false;
+    if (s1.tracing!=s2.tracing)
+        return false;
+    if (s1.trace_records!=s2.trace_records)
+        return false;
+    if (s1.trace_dump_file!=s2.trace_dump_file)
+        return false;
+    if (s1.capture_packets!=s2.capture_packets)
+        return false;
+    if (s1.capture_snap_length!=s2.capture_snap_length)
+        return false;
+    if (s1.capture_dump_file!=s2.capture_dump_file)
+        return false;
     return true;
 };
 
@@ -479,6 +711,14 @@ struct connection_status_struct {
     };
 
     CORBA::Long packet_size;
+    CORBA::Long payload_size;
+    CORBA::Long mtu;
+    CORBA::ULongLong shared_memory_lag;
+    CORBA::ULongLong shared_memory_drops;
+    std::string transmit_backend;
+    CORBA::ULongLong transmit_system_calls;
+    CORBA::ULongLong transmit_errors;
+    bool ready;
 };
 
 inline bool operator>>= (const CORBA::Any& a, connection_status_struct& s) {
@@ -489,21 +729,77 @@ inline bool operator>>= (const CORBA::Any& a, connection_status_struct& s) {
         if (!strcmp("connection_status::packet_size", props[idx].id)) {
             if (!(props[idx].value >>= s.packet_size)) return false;
         }
+        else if (!strcmp("connection_status::payload_size", props[idx].id)) {
+            if (!(props[idx].value >>= s.payload_size)) return false;
+        }
+        else if (!strcmp("connection_status::mtu", props[idx].id)) {
+            if (!(props[idx].value >>= s.mtu)) return false;
+        }
+        else if (!strcmp("connection_status::shared_memory_lag", props[idx].id)) {
+            if (!(props[idx].value >>= s.shared_memory_lag)) return false;
+        }
+        else if (!strcmp("connection_status::shared_memory_drops", props[idx].id)) {
+            if (!(props[idx].value >>= s.shared_memory_drops)) return false;
+        }
+        else if (!strcmp("connection_status::transmit_backend", props[idx].id)) {
+            if (!(props[idx].value >>= s.transmit_backend)) return false;
+        }
+        else if (!strcmp("connection_status::transmit_system_calls", props[idx].id)) {
+            if (!(props[idx].value >>= s.transmit_system_calls)) return false;
+        }
+        else if (!strcmp("connection_status::transmit_errors", props[idx].id)) {
+            if (!(props[idx].value >>= s.transmit_errors)) return false;
+        }
+        else if (!strcmp("connection_status::ready", props[idx].id)) {
+            if (!(props[idx].value >>= s.ready)) return false;
+        }
     }
     return true;
 };
 
 inline void operator<<= (CORBA::Any& a, const connection_status_struct& s) {
     CF::Properties props;
-    props.length(1);
+    props.length(9);
     props[0].id = CORBA::string_dup("connection_status::packet_size");
     props[0].value <<= s.packet_size;
+    props[1].id = CORBA::string_dup("connection_status::payload_size");
+    props[1].value <<= s.payload_size;
+    props[2].id = CORBA::string_dup("connection_status::mtu");
+    props[2].value <<= s.mtu;
+    props[3].id = CORBA::string_dup("connection_status::shared_memory_lag");
+    props[3].value <<= s.shared_memory_lag;
+    props[4].id = CORBA::string_dup("connection_status::shared_memory_drops");
+    props[4].value <<= s.shared_memory_drops;
+    props[5].id = CORBA::string_dup("connection_status::transmit_backend");
+    props[5].value <<= s.transmit_backend;
+    props[6].id = CORBA::string_dup("connection_status::transmit_system_calls");
+    props[6].value <<= s.transmit_system_calls;
+    props[7].id = CORBA::string_dup("connection_status::transmit_errors");
+    props[7].value <<= s.transmit_errors;
+    props[8].id = CORBA::string_dup("connection_status::ready");
+    props[8].value <<= s.ready;
     a <<= props;
 };
 
 inline bool operator== (const connection_status_struct& s1, const connection_status_struct& s2) {
     if (s1.packet_size!=s2.packet_size)
         return false;
+    if (s1.payload_size!=s2.payload_size)
+        return false;
+    if (s1.mtu!=s2.mtu)
+        return false;
+    if (s1.shared_memory_lag!=s2.shared_memory_lag)
+        return false;
+    if (s1.shared_memory_drops!=s2.shared_memory_drops)
+        return false;
+    if (s1.transmit_backend!=s2.transmit_backend)
+        return false;
+    if (s1.transmit_system_calls!=s2.transmit_system_calls)
+        return false;
+    if (s1.transmit_errors!=s2.transmit_errors)
+        return false;
+    if (s1.ready!=s2.ready)
+        return false;
     return true;
 };
 
@@ -511,4 +807,376 @@ inline bool operator!= (const connection_status_struct& s1, const connection_sta
     return !(s1==s2);
 };
 
+struct stripe_link_struct {
+    stripe_link_struct ()
+    {
+        interface = "eth0";
+        ip_address = "";
+        port = 0;
+        vlan = 0;
+    };
+
+    static std::string getId() {
+        return std::string("stripe_link");
+    };
+
+    std::string interface;
+    std::string ip_address;
+    CORBA::Long port;
+    unsigned short vlan;
+};
+
+inline bool operator>>= (const CORBA::Any& a, stripe_link_struct& s) {
+    CF::Properties* temp;
+    if (!(a >>= temp)) return false;
+    CF::Properties& props = *temp;
+    for (unsigned int idx = 0; idx < props.length(); idx++) {
+        if (!strcmp("stripe_link::interface", props[idx].id)) {
+            if (!(props[idx].value >>= s.interface)) return false;
+        }
+        else if (!strcmp("stripe_link::ip_address", props[idx].id)) {
+            if (!(props[idx].value >>= s.ip_address)) return false;
+        }
+        else if (!strcmp("stripe_link::port", props[idx].id)) {
+            if (!(props[idx].value >>= s.port)) return false;
+        }
+        else if (!strcmp("stripe_link::vlan", props[idx].id)) {
+            if (!(props[idx].value >>= s.vlan)) return false;
+        }
+    }
+    return true;
+};
+
+inline void operator<<= (CORBA::Any& a, const stripe_link_struct& s) {
+    CF::Properties props;
+    props.length(4);
+    props[0].id = CORBA::string_dup("stripe_link::interface");
+    props[0].value <<= s.interface;
+    props[1].id = CORBA::string_dup("stripe_link::ip_address");
+    props[1].value <<= s.ip_address;
+    props[2].id = CORBA::string_dup("stripe_link::port");
+    props[2].value <<= s.port;
+    props[3].id = CORBA::string_dup("stripe_link::vlan");
+    props[3].value <<= s.vlan;
+    a <<= props;
+};
+
+inline bool operator== (const stripe_link_struct& s1, const stripe_link_struct& s2) {
+    if (s1.interface!=s2.interface)
+        return false;
+    if (s1.ip_address!=s2.ip_address)
+        return false;
+    if (s1.port!=s2.port)
+        return false;
+    if (s1.vlan!=s2.vlan)
+        return false;
+    return true;
+};
+
+inline bool operator!= (const stripe_link_struct& s1, const stripe_link_struct& s2) {
+    return !(s1==s2);
+};
+
+struct stripe_link_state_struct {
+    stripe_link_state_struct ()
+    {
+    };
+
+    static std::string getId() {
+        return std::string("stripe_link_state");
+    };
+
+    std::string interface;
+    std::string ip_address;
+    CORBA::Long port;
+    bool active;
+    CORBA::ULongLong packets;
+    CORBA::ULongLong bytes;
+    double bit_rate;
+    CORBA::ULongLong send_errors;
+};
+
+inline bool operator>>= (const CORBA::Any& a, stripe_link_state_struct& s) {
+    CF::Properties* temp;
+    if (!(a >>= temp)) return false;
+    CF::Properties& props = *temp;
+    for (unsigned int idx = 0; idx < props.length(); idx++) {
+        if (!strcmp("stripe_link_state::interface", props[idx].id)) {
+            if (!(props[idx].value >>= s.interface)) return false;
+        }
+        else if (!strcmp("stripe_link_state::ip_address", props[idx].id)) {
+            if (!(props[idx].value >>= s.ip_address)) return false;
+        }
+        else if (!strcmp("stripe_link_state::port", props[idx].id)) {
+            if (!(props[idx].value >>= s.port)) return false;
+        }
+        else if (!strcmp("stripe_link_state::active", props[idx].id)) {
+            if (!(props[idx].value >>= s.active)) return false;
+        }
+        else if (!strcmp("stripe_link_state::packets", props[idx].id)) {
+            if (!(props[idx].value >>= s.packets)) return false;
+        }
+        else if (!strcmp("stripe_link_state::bytes", props[idx].id)) {
+            if (!(props[idx].value >>= s.bytes)) return false;
+        }
+        else if (!strcmp("stripe_link_state::bit_rate", props[idx].id)) {
+            if (!(props[idx].value >>= s.bit_rate)) return false;
+        }
+        else if (!strcmp("stripe_link_state::send_errors", props[idx].id)) {
+            if (!(props[idx].value >>= s.send_errors)) return false;
+        }
+    }
+    return true;
+};
+
+inline void operator<<= (CORBA::Any& a, const stripe_link_state_struct& s) {
+    CF::Properties props;
+    props.length(8);
+    props[0].id = CORBA::string_dup("stripe_link_state::interface");
+    props[0].value <<= s.interface;
+    props[1].id = CORBA::string_dup("stripe_link_state::ip_address");
+    props[1].value <<= s.ip_address;
+    props[2].id = CORBA::string_dup("stripe_link_state::port");
+    props[2].value <<= s.port;
+    props[3].id = CORBA::string_dup("stripe_link_state::active");
+    props[3].value <<= s.active;
+    props[4].id = CORBA::string_dup("stripe_link_state::packets");
+    props[4].value <<= s.packets;
+    props[5].id = CORBA::string_dup("stripe_link_state::bytes");
+    props[5].value <<= s.bytes;
+    props[6].id = CORBA::string_dup("stripe_link_state::bit_rate");
+    props[6].value <<= s.bit_rate;
+    props[7].id = CORBA::string_dup("stripe_link_state::send_errors");
+    props[7].value <<= s.send_errors;
+    a <<= props;
+};
+
+inline bool operator== (const stripe_link_state_struct& s1, const stripe_link_state_struct& s2) {
+    if (s1.interface!=s2.interface)
+        return false;
+    if (s1.ip_address!=s2.ip_address)
+        return false;
+    if (s1.port!=s2.port)
+        return false;
+    if (s1.active!=s2.active)
+        return false;
+    if (s1.packets!=s2.packets)
+        return false;
+    if (s1.bytes!=s2.bytes)
+        return false;
+    if (s1.bit_rate!=s2.bit_rate)
+        return false;
+    if (s1.send_errors!=s2.send_errors)
+        return false;
+    return true;
+};
+
+inline bool operator!= (const stripe_link_state_struct& s1, const stripe_link_state_struct& s2) {
+    return !(s1==s2);
+};
+
+struct transmit_timing_struct {
+    transmit_timing_struct ()
+    {
+    };
+
+    static std::string getId() {
+        return std::string("transmit_timing");
+    };
+
+    CORBA::ULongLong timestamps;
+    CORBA::ULongLong missed;
+    bool hardware;
+    double latency_mean;
+    double latency_p50;
+    double latency_p99;
+    double latency_max;
+    double spacing_mean;
+    double spacing_p50;
+    double spacing_p99;
+    double spacing_max;
+};
+
+inline bool operator>>= (const CORBA::Any& a, transmit_timing_struct& s) {
+    CF::Properties* temp;
+    if (!(a >>= temp)) return false;
+    CF::Properties& props = *temp;
+    for (unsigned int idx = 0; idx < props.length(); idx++) {
+        if (!strcmp("transmit_timing::timestamps", props[idx].id)) {
+            if (!(props[idx].value >>= s.timestamps)) return false;
+        }
+        else if (!strcmp("transmit_timing::missed", props[idx].id)) {
+            if (!(props[idx].value >>= s.missed)) return false;
+        }
+        else if (!strcmp("transmit_timing::hardware", props[idx].id)) {
+            if (!(props[idx].value >>= s.hardware)) return false;
+        }
+        else if (!strcmp("transmit_timing::latency_mean", props[idx].id)) {
+            if (!(props[idx].value >>= s.latency_mean)) return false;
+        }
+        else if (!strcmp("transmit_timing::latency_p50", props[idx].id)) {
+            if (!(props[idx].value >>= s.latency_p50)) return false;
+        }
+        else if (!strcmp("transmit_timing::latency_p99", props[idx].id)) {
+            if (!(props[idx].value >>= s.latency_p99)) return false;
+        }
+        else if (!strcmp("transmit_timing::latency_max", props[idx].id)) {
+            if (!(props[idx].value >>= s.latency_max)) return false;
+        }
+        else if (!strcmp("transmit_timing::spacing_mean", props[idx].id)) {
+            if (!(props[idx].value >>= s.spacing_mean)) return false;
+        }
+        else if (!strcmp("transmit_timing::spacing_p50", props[idx].id)) {
+            if (!(props[idx].value >>= s.spacing_p50)) return false;
+        }
+        else if (!strcmp("transmit_timing::spacing_p99", props[idx].id)) {
+            if (!(props[idx].value >>= s.spacing_p99)) return false;
+        }
+        else if (!strcmp("transmit_timing::spacing_max", props[idx].id)) {
+            if (!(props[idx].value >>= s.spacing_max)) return false;
+        }
+    }
+    return true;
+};
+
+inline void operator<<= (CORBA::Any& a, const transmit_timing_struct& s) {
+    CF::Properties props;
+    props.length(11);
+    props[0].id = CORBA::string_dup("transmit_timing::timestamps");
+    props[0].value <<= s.timestamps;
+    props[1].id = CORBA::string_dup("transmit_timing::missed");
+    props[1].value <<= s.missed;
+    props[2].id = CORBA::string_dup("transmit_timing::hardware");
+    props[2].value <<= s.hardware;
+    props[3].id = CORBA::string_dup("transmit_timing::latency_mean");
+    props[3].value <<= s.latency_mean;
+    props[4].id = CORBA::string_dup("transmit_timing::latency_p50");
+    props[4].value <<= s.latency_p50;
+    props[5].id = CORBA::string_dup("transmit_timing::latency_p99");
+    props[5].value <<= s.latency_p99;
+    props[6].id = CORBA::string_dup("transmit_timing::latency_max");
+    props[6].value <<= s.latency_max;
+    props[7].id = CORBA::string_dup("transmit_timing::spacing_mean");
+    props[7].value <<= s.spacing_mean;
+    props[8].id = CORBA::string_dup("transmit_timing::spacing_p50");
+    props[8].value <<= s.spacing_p50;
+    props[9].id = CORBA::string_dup("transmit_timing::spacing_p99");
+    props[9].value <<= s.spacing_p99;
+    props[10].id = CORBA::string_dup("transmit_timing::spacing_max");
+    props[10].value <<= s.spacing_max;
+    a <<= props;
+};
+
+inline bool operator== (const transmit_timing_struct& s1, const transmit_timing_struct& s2) {
+    if (s1.timestamps!=s2.timestamps)
+        return false;
+    if (s1.missed!=s2.missed)
+        return false;
+    if (s1.hardware!=s2.hardware)
+        return false;
+    if (s1.latency_mean!=s2.latency_mean)
+        return false;
+    if (s1.latency_p50!=s2.latency_p50)
+        return false;
+    if (s1.latency_p99!=s2.latency_p99)
+        return false;
+    if (s1.latency_max!=s2.latency_max)
+        return false;
+    if (s1.spacing_mean!=s2.spacing_mean)
+        return false;
+    if (s1.spacing_p50!=s2.spacing_p50)
+        return false;
+    if (s1.spacing_p99!=s2.spacing_p99)
+        return false;
+    if (s1.spacing_max!=s2.spacing_max)
+        return false;
+    return true;
+};
+
+inline bool operator!= (const transmit_timing_struct& s1, const transmit_timing_struct& s2) {
+    return !(s1==s2);
+};
+
+struct pacing_status_struct {
+    pacing_status_struct ()
+    {
+    };
+
+    static std::string getId() {
+        return std::string("pacing_status");
+    };
+
+    CORBA::ULongLong packets;
+    CORBA::ULongLong late;
+    double lateness_mean;
+    double lateness_p50;
+    double lateness_p99;
+    double lateness_max;
+};
+
+inline bool operator>>= (const CORBA::Any& a, pacing_status_struct& s) {
+    CF::Properties* temp;
+    if (!(a >>= temp)) return false;
+    CF::Properties& props = *temp;
+    for (unsigned int idx = 0; idx < props.length(); idx++) {
+        if (!strcmp("pacing_status::packets", props[idx].id)) {
+            if (!(props[idx].value >>= s.packets)) return false;
+        }
+        else if (!strcmp("pacing_status::late", props[idx].id)) {
+            if (!(props[idx].value >>= s.late)) return false;
+        }
+        else if (!strcmp("pacing_status::lateness_mean", props[idx].id)) {
+            if (!(props[idx].value >>= s.lateness_mean)) return false;
+        }
+        else if (!strcmp("pacing_status::lateness_p50", props[idx].id)) {
+            if (!(props[idx].value >>= s.lateness_p50)) return false;
+        }
+        else if (!strcmp("pacing_status::lateness_p99", props[idx].id)) {
+            if (!(props[idx].value >>= s.lateness_p99)) return false;
+        }
+        else if (!strcmp("pacing_status::lateness_max", props[idx].id)) {
+            if (!(props[idx].value >>= s.lateness_max)) return false;
+        }
+    }
+    return true;
+};
+
+inline void operator<<= (CORBA::Any& a, const pacing_status_struct& s) {
+    CF::Properties props;
+    props.length(6);
+    props[0].id = CORBA::string_dup("pacing_status::packets");
+    props[0].value <<= s.packets;
+    props[1].id = CORBA::string_dup("pacing_status::late");
+    props[1].value <<= s.late;
+    props[2].id = CORBA::string_dup("pacing_status::lateness_mean");
+    props[2].value <<= s.lateness_mean;
+    props[3].id = CORBA::string_dup("pacing_status::lateness_p50");
+    props[3].value <<= s.lateness_p50;
+    props[4].id = CORBA::string_dup("pacing_status::lateness_p99");
+    props[4].value <<= s.lateness_p99;
+    props[5].id = CORBA::string_dup("pacing_status::lateness_max");
+    props[5].value <<= s.lateness_max;
+    a <<= props;
+};
+
+inline bool operator== (const pacing_status_struct& s1, const pacing_status_struct& s2) {
+    if (s1.packets!=s2.packets)
+        return false;
+    if (s1.late!=s2.late)
+        return false;
+    if (s1.lateness_mean!=s2.lateness_mean)
+        return false;
+    if (s1.lateness_p50!=s2.lateness_p50)
+        return false;
+    if (s1.lateness_p99!=s2.lateness_p99)
+        return false;
+    if (s1.lateness_max!=s2.lateness_max)
+        return false;
+    return true;
+};
+
+inline bool operator!= (const pacing_status_struct& s1, const pacing_status_struct& s2) {
+    return !(s1==s2);
+};
+
 #endif // STRUCTPROPS_H
@@ -0,0 +1,165 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#include <sys/syscall.h>
+#include <pthread.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include <unistd.h>
+#include <algorithm>
+#include <vector>
+#include "trace_ring.h"
+
+typedef struct trace_ring {
+    struct trace_ring* next;
+    volatile int owned;        /* a running thread records into the ring */
+    uint32_t tid;              /* that thread */
+    uint32_t mask;
+    volatile uint64_t head;    /* records written */
+    trace_record_t records[1];
+} trace_ring_t;
+
+volatile int trace_enabled = 0;
+
+static unsigned int ring_records_ = 65536;
+static trace_ring_t* volatile rings_ = NULL;
+static __thread trace_ring_t* ring_ = NULL;
+static pthread_key_t ring_key_;
+static pthread_once_t ring_key_once_ = PTHREAD_ONCE_INIT;
+
+static const char* event_names_[TRACE_EVENTS] = {
+    "none", "receive", "drop", "sri_merge", "context", "queue_push", "queue_pop", "send"
+};
+
+/* A thread's ring outlives it and is reused by the next new thread; its
+ * records keep their own thread ids, so a dump still attributes them */
+static void release_ring_ (void* ring)
+{
+    ((trace_ring_t*) ring)->owned = 0;
+}
+
+static void make_ring_key_ ()
+{
+    pthread_key_create(&ring_key_, release_ring_);
+}
+
+/* Takes a ring of the current size left by a thread that has gone, or
+ * allocates one; NULL if memory runs out */
+static trace_ring_t* claim_ring_ ()
+{
+    pthread_once(&ring_key_once_, make_ring_key_);
+    unsigned int size = 1;
+    while (size < ring_records_)
+        size <<= 1;
+    trace_ring_t* ring;
+    for (ring = rings_; ring != NULL; ring = ring->next) {
+        if (ring->mask + 1 == size && !ring->owned && __sync_bool_compare_and_swap(&ring->owned, 0, 1))
+            break;
+    }
+    if (ring == NULL) {
+        ring = (trace_ring_t*) calloc(1, sizeof(trace_ring_t) + (size - 1) * sizeof(trace_record_t));
+        if (ring == NULL)
+            return NULL;
+        ring->owned = 1;
+        ring->mask = size - 1;
+        do {
+            ring->next = rings_;
+        } while (!__sync_bool_compare_and_swap(&rings_, ring->next, ring));
+    }
+    ring->tid = syscall(SYS_gettid);
+    pthread_setspecific(ring_key_, ring);
+    ring_ = ring;
+    return ring;
+}
+
+void trace_record_ (uint32_t event, int64_t a, int64_t b)
+{
+    trace_ring_t* ring = ring_;
+    if (ring == NULL && (ring = claim_ring_()) == NULL)
+        return;
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    uint64_t head = ring->head;
+    trace_record_t* record = &ring->records[head & ring->mask];
+    record->seq = 0;
+    __sync_synchronize();
+    record->ns = now.tv_sec * 1000000000ULL + now.tv_nsec;
+    record->event = event;
+    record->tid = ring->tid;
+    record->a = a;
+    record->b = b;
+    __sync_synchronize();
+    record->seq = (uint32_t)(head + 1);
+    ring->head = head + 1;
+}
+
+void trace_enable (int on, unsigned int records)
+{
+    if (records > 0)
+        ring_records_ = records;
+    trace_enabled = on;
+}
+
+const char* trace_event_name (uint32_t event)
+{
+    return event < TRACE_EVENTS ? event_names_[event] : "unknown";
+}
+
+struct dumped_record_ {
+    trace_record_t record;
+    bool operator< (const dumped_record_& other) const { return record.ns < other.record.ns; }
+};
+
+long trace_dump (const char* path)
+{
+    /* Records being written while the rings are read are left out */
+    std::vector<dumped_record_> dumped;
+    for (trace_ring_t* ring = rings_; ring != NULL; ring = ring->next) {
+        uint64_t head = ring->head;
+        uint64_t first = head > ring->mask + 1 ? head - ring->mask - 1 : 0;
+        for (uint64_t ii = first; ii < head; ii++) {
+            const trace_record_t* record = &ring->records[ii & ring->mask];
+            dumped_record_ copy;
+            uint32_t seq = record->seq;
+            __sync_synchronize();
+            copy.record = *record;
+            __sync_synchronize();
+            if (seq != (uint32_t)(ii + 1) || record->seq != seq)
+                continue;
+            dumped.push_back(copy);
+        }
+    }
+    std::sort(dumped.begin(), dumped.end());
+
+    FILE* file = fopen(path, "w");
+    if (file == NULL)
+        return -1;
+    fprintf(file, "# ns thread event a b\n");
+    for (size_t ii = 0; ii < dumped.size(); ii++) {
+        const trace_record_t& record = dumped[ii].record;
+        fprintf(file, "%llu %u %s %lld %lld\n", (unsigned long long) record.ns, record.tid,
+                trace_event_name(record.event), (long long) record.a, (long long) record.b);
+    }
+    if (fclose(file) != 0)
+        return -1;
+    return dumped.size();
+}
@@ -0,0 +1,75 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#ifndef TRACE_RING_H_
+#define TRACE_RING_H_
+
+#include <stdint.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*
+ * Hot-path tracepoints. Each thread records fixed-size binary records into a
+ * ring of its own, overwriting its oldest, with no locks or formatting; the
+ * rings are merged and written out as text only when dumped. While tracing
+ * is off a tracepoint costs one load and a predicted branch, and its
+ * arguments are not evaluated.
+ */
+typedef enum {
+    TRACE_RECEIVE = 1,   /* a: bytes of samples in a BulkIO transfer, b: transfers still queued on the port */
+    TRACE_DROP,          /* a: bytes dropped, b: 0 without a listener or for another stream, 1 before packet sizing */
+    TRACE_SRI_MERGE,     /* a: the SRI changed, b: keywords */
+    TRACE_CONTEXT,       /* a: context packet count, b: change packet */
+    TRACE_QUEUE_PUSH,    /* a: packet bytes, b: packets queued after the push */
+    TRACE_QUEUE_POP,     /* a: packet bytes, b: packets queued after the pop */
+    TRACE_SEND,          /* a: datagrams or frames sent, negative on error, b: bytes (0 for the packet ring) */
+    TRACE_EVENTS
+} trace_event_t;
+
+typedef struct {
+    uint64_t ns;           /* CLOCK_MONOTONIC */
+    volatile uint32_t seq; /* position in the ring plus one; 0 while being written */
+    uint32_t event;
+    uint32_t tid;          /* the recording thread; rings pass to new threads */
+    int64_t a;
+    int64_t b;
+} trace_record_t;
+
+extern volatile int trace_enabled;
+
+void trace_record_ (uint32_t event, int64_t a, int64_t b);
+
+#define TRACE(EVENT, A, B) do { if (__builtin_expect(trace_enabled, 0)) trace_record_((EVENT), (A), (B)); } while (0)
+
+/* Turns recording on or off. Threads that start recording from here on
+ * keep the last records records (rounded up to a power of two). */
+void trace_enable (int on, unsigned int records);
+/* Writes every thread's records to path, oldest first, one per line:
+ * "ns thread event a b". Returns the number written, or -1. */
+long trace_dump (const char* path);
+const char* trace_event_name (uint32_t event);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif /* TRACE_RING_H_ */
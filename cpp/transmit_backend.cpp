@@ -0,0 +1,536 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#include <sys/types.h>
+#include <sys/socket.h>
+#include <sys/mman.h>
+#include <sys/syscall.h>
+#include <netinet/in.h>
+#include <limits.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+#include <errno.h>
+#include <vector>
+#include "transmit_backend.h"
+#include "udp_shard.h"
+
+#ifndef IOV_MAX
+#define IOV_MAX 1024
+#endif
+
+/* ---- socket: the calls the transmit threads always made */
+
+static int socket_open_ (transmit_backend_t* backend, unsigned int depth)
+{
+    return 0;
+}
+
+static ssize_t socket_send_ (transmit_backend_t* backend, const struct iovec* iov, size_t count)
+{
+    transmit_backend_stats_t* stats = &backend->stats;
+    size_t sent = 0;
+    if (!backend->tcp) {
+        ssize_t result = udp_transmit_batch(backend->sock, &backend->addr, iov, count);
+        stats->syscalls++;
+        sent = result < 0 ? 0 : result;
+        for (size_t ii = 0; ii < sent; ii++)
+            stats->bytes += iov[ii].iov_len;
+    } else {
+        /* Gather the frames into as few writes as the stream takes */
+        std::vector<struct iovec> pending(iov, iov + count);
+        while (sent < count) {
+            struct msghdr msg;
+            memset(&msg, 0, sizeof(msg));
+            msg.msg_iov = &pending[sent];
+            msg.msg_iovlen = count - sent < IOV_MAX ? count - sent : IOV_MAX;
+            ssize_t result = sendmsg(backend->sock, &msg, MSG_NOSIGNAL);
+            stats->syscalls++;
+            if (result < 0 && errno == EINTR)
+                continue;
+            if (result <= 0)
+                break;
+            stats->bytes += result;
+            while (result > 0) {
+                if ((size_t)result >= pending[sent].iov_len) {
+                    result -= pending[sent].iov_len;
+                    sent++;
+                } else {
+                    pending[sent].iov_base = (char*)pending[sent].iov_base + result;
+                    pending[sent].iov_len -= result;
+                    result = 0;
+                }
+            }
+        }
+    }
+    stats->frames += sent;
+    stats->completions += sent;
+    stats->errors += count - sent;
+    if (sent < count)
+        backend->error = errno;
+    if (sent == 0 && count > 0)
+        return -1;
+    return sent;
+}
+
+static int socket_poll_ (transmit_backend_t* backend, int wait)
+{
+    return 0;
+}
+
+static void socket_close_ (transmit_backend_t* backend)
+{
+}
+
+static const transmit_backend_ops_t socket_ops_ = {
+    "socket", socket_open_, socket_send_, socket_poll_, socket_close_
+};
+
+/* ---- io_uring, through the raw system calls */
+
+#ifdef HAVE_LINUX_IO_URING_H
+#include <linux/io_uring.h>
+
+#ifndef __NR_io_uring_setup
+#define __NR_io_uring_setup 425
+#endif
+#ifndef __NR_io_uring_enter
+#define __NR_io_uring_enter 426
+#endif
+#ifndef __NR_io_uring_register
+#define __NR_io_uring_register 427
+#endif
+
+/* Largest frame a buffer holds; a TCP frame is split across several */
+#define URING_SLOT_SIZE 65536
+
+typedef struct {
+    int fd;
+    void* sq_ring;
+    size_t sq_ring_size;
+    void* cq_ring;
+    size_t cq_ring_size;
+    struct io_uring_sqe* sqes;
+    size_t sqes_size;
+    volatile unsigned* sq_head;
+    volatile unsigned* sq_tail;
+    unsigned sq_mask;
+    unsigned* sq_array;
+    volatile unsigned* cq_head;
+    volatile unsigned* cq_tail;
+    unsigned cq_mask;
+    struct io_uring_cqe* cqes;
+
+    /* One registered buffer per send in flight */
+    uint8_t* pool;
+    unsigned slots;
+    unsigned* free_slots;
+    unsigned free_count;
+    uint32_t* lengths;
+    struct iovec* iovs;        /* SENDMSG fallback */
+    struct msghdr* msgs;
+    unsigned queued;           /* prepared but not yet submitted */
+    unsigned sending;          /* submitted without a result yet */
+    int zerocopy;              /* SEND_ZC from the registered buffers */
+} uring_t;
+
+static int uring_enter_ (transmit_backend_t* backend, unsigned submit, unsigned complete)
+{
+    uring_t* ring = (uring_t*)backend->state;
+    backend->stats.syscalls++;
+    int result = syscall(__NR_io_uring_enter, ring->fd, submit, complete, complete ? IORING_ENTER_GETEVENTS : 0, NULL, 0);
+    if (result >= 0)
+        ring->queued -= result;
+    return result;
+}
+
+static void uring_release_ (uring_t* ring, unsigned slot)
+{
+    ring->free_slots[ring->free_count++] = slot;
+}
+
+static int uring_reap_ (transmit_backend_t* backend)
+{
+    uring_t* ring = (uring_t*)backend->state;
+    transmit_backend_stats_t* stats = &backend->stats;
+    unsigned head = *ring->cq_head;
+    int reaped = 0;
+    __sync_synchronize();
+    while (head != *ring->cq_tail) {
+        struct io_uring_cqe* cqe = &ring->cqes[head & ring->cq_mask];
+        unsigned slot = (unsigned)cqe->user_data;
+        head++;
+#ifdef IORING_CQE_F_NOTIF
+        /* The kernel is done with a zero-copy buffer */
+        if (cqe->flags & IORING_CQE_F_NOTIF) {
+            uring_release_(ring, slot);
+            continue;
+        }
+#endif
+        ring->sending--;
+        reaped++;
+        if (cqe->res < 0 || (ring->lengths[slot] != (uint32_t)cqe->res && backend->tcp)) {
+            stats->errors++;
+            backend->error = cqe->res < 0 ? -cqe->res : EPIPE;
+            /* Older kernels cannot send zero-copy on every socket */
+            if (cqe->res == -EOPNOTSUPP || cqe->res == -EINVAL)
+                ring->zerocopy = 0;
+        } else {
+            stats->bytes += cqe->res;
+            stats->completions++;
+        }
+#ifdef IORING_CQE_F_MORE
+        if (cqe->flags & IORING_CQE_F_MORE)
+            continue;
+#endif
+        uring_release_(ring, slot);
+    }
+    __sync_synchronize();
+    *ring->cq_head = head;
+    return reaped;
+}
+
+static int uring_poll_ (transmit_backend_t* backend, int wait)
+{
+    uring_t* ring = (uring_t*)backend->state;
+    if (ring->queued > 0)
+        uring_enter_(backend, ring->queued, 0);
+    int reaped = uring_reap_(backend);
+    if (wait && reaped == 0 && ring->sending > 0) {
+        uring_enter_(backend, ring->queued, 1);
+        reaped = uring_reap_(backend);
+    }
+    return reaped;
+}
+
+static void uring_prepare_ (transmit_backend_t* backend, unsigned slot, size_t length, int link)
+{
+    uring_t* ring = (uring_t*)backend->state;
+    unsigned tail = *ring->sq_tail;
+    unsigned index = tail & ring->sq_mask;
+    struct io_uring_sqe* sqe = &ring->sqes[index];
+    uint8_t* buffer = ring->pool + (size_t)slot * URING_SLOT_SIZE;
+    int flags = backend->tcp ? MSG_NOSIGNAL | MSG_WAITALL : 0;
+    memset(sqe, 0, sizeof(*sqe));
+    sqe->fd = backend->sock;
+    sqe->user_data = slot;
+    sqe->msg_flags = flags;
+    if (link)
+        sqe->flags = IOSQE_IO_LINK;
+#ifdef IORING_RECVSEND_FIXED_BUF
+    if (ring->zerocopy) {
+        sqe->opcode = IORING_OP_SEND_ZC;
+        sqe->addr = (uintptr_t)buffer;
+        sqe->len = length;
+        sqe->ioprio = IORING_RECVSEND_FIXED_BUF;
+        sqe->buf_index = slot;
+        if (!backend->tcp) {
+            sqe->addr2 = (uintptr_t)&backend->addr;
+            sqe->addr_len = sizeof(backend->addr);
+        }
+    } else
+#endif
+    {
+        ring->iovs[slot].iov_base = buffer;
+        ring->iovs[slot].iov_len = length;
+        struct msghdr* msg = &ring->msgs[slot];
+        memset(msg, 0, sizeof(*msg));
+        if (!backend->tcp) {
+            msg->msg_name = &backend->addr;
+            msg->msg_namelen = sizeof(backend->addr);
+        }
+        msg->msg_iov = &ring->iovs[slot];
+        msg->msg_iovlen = 1;
+        sqe->opcode = IORING_OP_SENDMSG;
+        sqe->addr = (uintptr_t)msg;
+        sqe->len = 1;
+    }
+    ring->lengths[slot] = length;
+    ring->sq_array[index] = index;
+    __sync_synchronize();
+    *ring->sq_tail = tail + 1;
+    ring->queued++;
+    ring->sending++;
+}
+
+/* Takes a free buffer, submitting what is queued and waiting for sends to
+ * finish when there is none. A stream then waits for its whole chain, so
+ * the next chain cannot overtake it. */
+static int uring_slot_ (transmit_backend_t* backend)
+{
+    uring_t* ring = (uring_t*)backend->state;
+    int drain = backend->tcp && ring->free_count == 0;
+    while (ring->free_count == 0 || (drain && ring->sending > 0)) {
+        if (uring_enter_(backend, ring->queued, 1) < 0 && errno != EINTR)
+            return -1;
+        uring_reap_(backend);
+    }
+    return ring->free_slots[--ring->free_count];
+}
+
+static ssize_t uring_send_ (transmit_backend_t* backend, const struct iovec* iov, size_t count)
+{
+    uring_t* ring = (uring_t*)backend->state;
+    size_t sent = 0;
+    /* A stream's sends are linked so they complete in order, and a batch
+     * starts only after the previous one has finished */
+    if (backend->tcp) {
+        while (ring->sending > 0) {
+            if (uring_enter_(backend, ring->queued, 1) < 0 && errno != EINTR) {
+                backend->error = errno;
+                backend->stats.errors += count;
+                return -1;
+            }
+            uring_reap_(backend);
+        }
+    }
+    int failed = 0;
+    for (; sent < count && !failed; sent++) {
+        const uint8_t* data = (const uint8_t*)iov[sent].iov_base;
+        size_t remaining = iov[sent].iov_len;
+        if (!backend->tcp && remaining > URING_SLOT_SIZE) {
+            errno = EMSGSIZE;
+            break;
+        }
+        while (remaining > 0) {
+            int slot = uring_slot_(backend);
+            if (slot < 0) {
+                failed = 1;
+                break;
+            }
+            size_t length = remaining < URING_SLOT_SIZE ? remaining : URING_SLOT_SIZE;
+            memcpy(ring->pool + (size_t)slot * URING_SLOT_SIZE, data, length);
+            data += length;
+            remaining -= length;
+            /* The chain breaks where the buffers run out; uring_slot_ then
+             * lets it finish before the rest goes */
+            int link = backend->tcp && (remaining > 0 || sent + 1 < count) && ring->free_count > 0;
+            uring_prepare_(backend, slot, length, link);
+        }
+    }
+    if (failed)
+        sent--;
+    if (sent < count) {
+        backend->error = errno;
+        backend->stats.errors += count - sent;
+    }
+    while (ring->queued > 0) {
+        if (uring_enter_(backend, ring->queued, 0) < 0 && errno != EINTR && errno != EAGAIN)
+            break;
+    }
+    backend->stats.frames += sent;
+    uring_reap_(backend);
+    if (sent == 0 && count > 0)
+        return -1;
+    return sent;
+}
+
+static void uring_close_ (transmit_backend_t* backend)
+{
+    uring_t* ring = (uring_t*)backend->state;
+    if (ring == NULL)
+        return;
+    if (ring->fd >= 0) {
+        while (ring->sending > 0) {
+            if (uring_enter_(backend, ring->queued, 1) < 0 && errno != EINTR)
+                break;
+            uring_reap_(backend);
+        }
+        /* Zero-copy buffers return once the packets are gone, which a slow
+         * receiver can hold up; give them a second */
+        for (int ii = 0; ii < 1000 && ring->free_count < ring->slots; ii++) {
+            usleep(1000);
+            uring_reap_(backend);
+        }
+        close(ring->fd);
+        /* The kernel may still read what it holds, so the pool must not be reused */
+        if (ring->free_count < ring->slots)
+            ring->pool = NULL;
+    }
+    if (ring->sq_ring != NULL && ring->sq_ring != MAP_FAILED)
+        munmap(ring->sq_ring, ring->sq_ring_size);
+    if (ring->cq_ring != NULL && ring->cq_ring != MAP_FAILED && ring->cq_ring != ring->sq_ring)
+        munmap(ring->cq_ring, ring->cq_ring_size);
+    if (ring->sqes != NULL && (void*)ring->sqes != MAP_FAILED)
+        munmap(ring->sqes, ring->sqes_size);
+    free(ring->pool);
+    free(ring->free_slots);
+    free(ring->lengths);
+    free(ring->iovs);
+    free(ring->msgs);
+    free(ring);
+    backend->state = NULL;
+}
+
+/* Zero-copy sends from registered buffers need Linux 6.0 */
+static int uring_zerocopy_ (uring_t* ring)
+{
+#ifdef IORING_RECVSEND_FIXED_BUF
+    size_t size = sizeof(struct io_uring_probe) + 256 * sizeof(struct io_uring_probe_op);
+    struct io_uring_probe* probe = (struct io_uring_probe*)calloc(1, size);
+    if (probe == NULL)
+        return 0;
+    int supported = syscall(__NR_io_uring_register, ring->fd, IORING_REGISTER_PROBE, probe, 256) == 0 &&
+                    probe->last_op >= IORING_OP_SEND_ZC &&
+                    (probe->ops[IORING_OP_SEND_ZC].flags & IO_URING_OP_SUPPORTED);
+    free(probe);
+    if (!supported)
+        return 0;
+    std::vector<struct iovec> buffers(ring->slots);
+    for (unsigned ii = 0; ii < ring->slots; ii++) {
+        buffers[ii].iov_base = ring->pool + (size_t)ii * URING_SLOT_SIZE;
+        buffers[ii].iov_len = URING_SLOT_SIZE;
+    }
+    /* Fails when the pool exceeds RLIMIT_MEMLOCK on older kernels */
+    return syscall(__NR_io_uring_register, ring->fd, IORING_REGISTER_BUFFERS, &buffers[0], ring->slots) == 0;
+#else
+    return 0;
+#endif
+}
+
+static int uring_open_ (transmit_backend_t* backend, unsigned int depth)
+{
+    uring_t* ring = (uring_t*)calloc(1, sizeof(uring_t));
+    if (ring == NULL)
+        return -1;
+    ring->fd = -1;
+    backend->state = ring;
+
+    struct io_uring_params params;
+    memset(&params, 0, sizeof(params));
+    /* Zero-copy sends complete twice, so leave room for both */
+    params.flags = IORING_SETUP_CQSIZE;
+    params.cq_entries = 2 * depth;
+    ring->fd = syscall(__NR_io_uring_setup, depth, &params);
+    if (ring->fd < 0) {
+        int error = errno;
+        uring_close_(backend);
+        errno = error;
+        return -1;
+    }
+    ring->slots = params.sq_entries;
+
+    ring->sq_ring_size = params.sq_off.array + params.sq_entries * sizeof(unsigned);
+    ring->cq_ring_size = params.cq_off.cqes + params.cq_entries * sizeof(struct io_uring_cqe);
+    if (params.features & IORING_FEAT_SINGLE_MMAP) {
+        if (ring->cq_ring_size > ring->sq_ring_size)
+            ring->sq_ring_size = ring->cq_ring_size;
+        ring->cq_ring_size = ring->sq_ring_size;
+    }
+    ring->sq_ring = mmap(NULL, ring->sq_ring_size, PROT_READ | PROT_WRITE, MAP_SHARED | MAP_POPULATE, ring->fd, IORING_OFF_SQ_RING);
+    if (params.features & IORING_FEAT_SINGLE_MMAP)
+        ring->cq_ring = ring->sq_ring;
+    else
+        ring->cq_ring = mmap(NULL, ring->cq_ring_size, PROT_READ | PROT_WRITE, MAP_SHARED | MAP_POPULATE, ring->fd, IORING_OFF_CQ_RING);
+    ring->sqes_size = params.sq_entries * sizeof(struct io_uring_sqe);
+    ring->sqes = (struct io_uring_sqe*)mmap(NULL, ring->sqes_size, PROT_READ | PROT_WRITE, MAP_SHARED | MAP_POPULATE, ring->fd, IORING_OFF_SQES);
+    if (ring->sq_ring == MAP_FAILED || ring->cq_ring == MAP_FAILED || (void*)ring->sqes == MAP_FAILED) {
+        int error = errno;
+        uring_close_(backend);
+        errno = error;
+        return -1;
+    }
+    uint8_t* sq = (uint8_t*)ring->sq_ring;
+    uint8_t* cq = (uint8_t*)ring->cq_ring;
+    ring->sq_head = (unsigned*)(sq + params.sq_off.head);
+    ring->sq_tail = (unsigned*)(sq + params.sq_off.tail);
+    ring->sq_mask = *(unsigned*)(sq + params.sq_off.ring_mask);
+    ring->sq_array = (unsigned*)(sq + params.sq_off.array);
+    ring->cq_head = (unsigned*)(cq + params.cq_off.head);
+    ring->cq_tail = (unsigned*)(cq + params.cq_off.tail);
+    ring->cq_mask = *(unsigned*)(cq + params.cq_off.ring_mask);
+    ring->cqes = (struct io_uring_cqe*)(cq + params.cq_off.cqes);
+
+    if (posix_memalign((void**)&ring->pool, 4096, (size_t)ring->slots * URING_SLOT_SIZE) != 0)
+        ring->pool = NULL;
+    ring->free_slots = (unsigned*)malloc(ring->slots * sizeof(unsigned));
+    ring->lengths = (uint32_t*)calloc(ring->slots, sizeof(uint32_t));
+    ring->iovs = (struct iovec*)calloc(ring->slots, sizeof(struct iovec));
+    ring->msgs = (struct msghdr*)calloc(ring->slots, sizeof(struct msghdr));
+    if (ring->pool == NULL || ring->free_slots == NULL || ring->lengths == NULL || ring->iovs == NULL || ring->msgs == NULL) {
+        uring_close_(backend);
+        errno = ENOMEM;
+        return -1;
+    }
+    /* Touch the pool now rather than on the first sends */
+    memset(ring->pool, 0, (size_t)ring->slots * URING_SLOT_SIZE);
+    for (unsigned ii = 0; ii < ring->slots; ii++)
+        ring->free_slots[ii] = ring->slots - 1 - ii;
+    ring->free_count = ring->slots;
+    ring->zerocopy = uring_zerocopy_(ring);
+    return 0;
+}
+
+static const transmit_backend_ops_t uring_ops_ = {
+    "io_uring", uring_open_, uring_send_, uring_poll_, uring_close_
+};
+#endif /* HAVE_LINUX_IO_URING_H */
+
+static const transmit_backend_ops_t* backends_[] = {
+    &socket_ops_,
+#ifdef HAVE_LINUX_IO_URING_H
+    &uring_ops_,
+#endif
+    NULL
+};
+
+transmit_backend_t* transmit_backend_open (const char* name, int sock, int tcp, const struct sockaddr_in* addr, unsigned int depth)
+{
+    const transmit_backend_ops_t* ops = NULL;
+    for (int ii = 0; backends_[ii] != NULL && ops == NULL; ii++) {
+        if (strcmp(backends_[ii]->name, name) == 0)
+            ops = backends_[ii];
+    }
+    if (ops == NULL) {
+        errno = EINVAL;
+        return NULL;
+    }
+    transmit_backend_t* backend = (transmit_backend_t*)calloc(1, sizeof(transmit_backend_t));
+    if (backend == NULL)
+        return NULL;
+    backend->ops = ops;
+    backend->sock = sock;
+    backend->tcp = tcp;
+    if (addr != NULL)
+        backend->addr = *addr;
+    if (ops->open(backend, depth > 0 ? depth : 1) < 0) {
+        int error = errno;
+        free(backend);
+        errno = error;
+        return NULL;
+    }
+    return backend;
+}
+
+ssize_t transmit_backend_send (transmit_backend_t* backend, const struct iovec* iov, size_t count)
+{
+    return backend->ops->send(backend, iov, count);
+}
+
+int transmit_backend_poll (transmit_backend_t* backend, int wait)
+{
+    return backend->ops->poll(backend, wait);
+}
+
+void transmit_backend_close (transmit_backend_t* backend)
+{
+    backend->ops->close(backend);
+    free(backend);
+}
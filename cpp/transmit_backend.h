@@ -0,0 +1,92 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#ifndef TRANSMIT_BACKEND_H_
+#define TRANSMIT_BACKEND_H_
+
+#include <sys/types.h>
+#include <sys/uio.h>
+#include <netinet/in.h>
+#include <stdint.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*
+ * A transmit backend sends frames on a socket the component has already
+ * opened (UDP, unicast or multicast, or a connected TCP socket). Each iovec
+ * handed to send is one frame: a datagram for UDP, or the next bytes of the
+ * stream for TCP. Backends copy what they keep, so the caller may reuse its
+ * buffers as soon as send returns, and frames leave in the order they were
+ * sent. Sends may complete later; poll reaps completions, and close waits
+ * for all of them before it returns.
+ *
+ *   socket    sendmmsg (UDP) or sendmsg (TCP), completing immediately
+ *   io_uring  copies frames into registered buffers and submits each batch
+ *             with a single io_uring_enter, zero-copy where the kernel can
+ */
+
+typedef struct {
+    uint64_t frames;       /* frames accepted by send */
+    uint64_t bytes;        /* bytes the kernel has finished sending */
+    uint64_t completions;  /* frames the kernel has finished with */
+    uint64_t errors;       /* frames that could not be sent */
+    uint64_t syscalls;     /* calls into the kernel to send or reap */
+} transmit_backend_stats_t;
+
+typedef struct transmit_backend transmit_backend_t;
+
+typedef struct {
+    const char* name;
+    int (*open) (transmit_backend_t* backend, unsigned int depth);
+    ssize_t (*send) (transmit_backend_t* backend, const struct iovec* iov, size_t count);
+    int (*poll) (transmit_backend_t* backend, int wait);
+    void (*close) (transmit_backend_t* backend);
+} transmit_backend_ops_t;
+
+struct transmit_backend {
+    const transmit_backend_ops_t* ops;
+    int sock;
+    int tcp;
+    struct sockaddr_in addr;   /* UDP destination */
+    transmit_backend_stats_t stats;
+    int error;                 /* errno of the latest failure */
+    void* state;
+};
+
+/* Opens the named backend ("socket" or "io_uring") on sock, keeping up to
+ * depth frames in flight. Returns NULL with errno set if the backend is
+ * unknown (EINVAL) or not available on this system. */
+transmit_backend_t* transmit_backend_open (const char* name, int sock, int tcp, const struct sockaddr_in* addr, unsigned int depth);
+/* Sends count frames, waiting for room if too many are in flight. Returns
+ * the number of frames accepted, or -1 if none were. */
+ssize_t transmit_backend_send (transmit_backend_t* backend, const struct iovec* iov, size_t count);
+/* Reaps finished sends, waiting for one when wait is set and any are in
+ * flight. Returns the number reaped. */
+int transmit_backend_poll (transmit_backend_t* backend, int wait);
+/* Waits for sends in flight and frees the backend; the socket stays open */
+void transmit_backend_close (transmit_backend_t* backend);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif /* TRANSMIT_BACKEND_H_ */
@@ -0,0 +1,244 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#include <sys/types.h>
+#include <sys/socket.h>
+#include <sys/ioctl.h>
+#include <net/if.h>
+#include <netinet/in.h>
+#include <linux/errqueue.h>
+#include <linux/net_tstamp.h>
+#include <linux/sockios.h>
+#include <errno.h>
+#include <math.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include <unistd.h>
+#include "tx_timestamp.h"
+
+/* Older userspace headers predate some of the timestamping interface */
+#ifndef SO_TIMESTAMPING
+#define SO_TIMESTAMPING 37
+#endif
+#ifndef SCM_TIMESTAMPING
+#define SCM_TIMESTAMPING SO_TIMESTAMPING
+#endif
+#ifndef SOF_TIMESTAMPING_OPT_ID
+#define SOF_TIMESTAMPING_OPT_ID (1 << 7)
+#endif
+#ifndef SOF_TIMESTAMPING_OPT_TSONLY
+#define SOF_TIMESTAMPING_OPT_TSONLY (1 << 11)
+#endif
+#ifndef SCM_TSTAMP_SND
+#define SCM_TSTAMP_SND 0
+#endif
+#ifndef SIOCGHWTSTAMP
+#define SIOCGHWTSTAMP 0x89b1
+#endif
+
+/* The kernel stamps in CLOCK_REALTIME */
+static double realtime_ ()
+{
+    struct timespec ts;
+    clock_gettime(CLOCK_REALTIME, &ts);
+    return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+/* Sets the device's transmit stamping to tx_type, keeping whatever receive
+ * filter it has (PTP may depend on it), and returns the tx_type it had, or
+ * -1 if its configuration cannot be read or changed. Needs CAP_NET_ADMIN.
+ * Uses a socket of its own, as the stamped one may be closed by then. */
+static int set_hardware_ (const char* iface, int tx_type)
+{
+    int sock = socket(AF_INET, SOCK_DGRAM, 0);
+    if (sock < 0)
+        return -1;
+    struct hwtstamp_config config;
+    memset(&config, 0, sizeof(config));
+    struct ifreq req;
+    memset(&req, 0, sizeof(req));
+    strncpy(req.ifr_name, iface, sizeof(req.ifr_name) - 1);
+    req.ifr_data = (char*)&config;
+    int previous = -1;
+    if (ioctl(sock, SIOCGHWTSTAMP, &req) == 0) {
+        previous = config.tx_type;
+        config.tx_type = tx_type;
+        if (previous != tx_type && ioctl(sock, SIOCSHWTSTAMP, &req) < 0)
+            previous = -1;
+    }
+    close(sock);
+    return previous;
+}
+
+tx_timestamp_t* tx_timestamp_open (int sock, int tcp, const char* iface, int hardware)
+{
+    int flags = SOF_TIMESTAMPING_TX_SOFTWARE | SOF_TIMESTAMPING_SOFTWARE |
+                SOF_TIMESTAMPING_OPT_ID | SOF_TIMESTAMPING_OPT_TSONLY;
+    int previous = -1;
+    if (hardware && iface && *iface)
+        previous = set_hardware_(iface, HWTSTAMP_TX_ON);
+    if (previous >= 0)
+        flags |= SOF_TIMESTAMPING_TX_HARDWARE | SOF_TIMESTAMPING_RAW_HARDWARE;
+    tx_timestamp_t* ts = (tx_timestamp_t*)calloc(1, sizeof(tx_timestamp_t));
+    if (ts == NULL || setsockopt(sock, SOL_SOCKET, SO_TIMESTAMPING, &flags, sizeof(flags)) < 0) {
+        int error = errno;
+        if (previous >= 0 && previous != HWTSTAMP_TX_ON)
+            set_hardware_(iface, previous);
+        free(ts);
+        errno = error;
+        return NULL;
+    }
+    ts->sock = sock;
+    ts->tcp = tcp;
+    ts->hardware = previous >= 0;
+    ts->hw_tx_type = previous;
+    if (ts->hardware)
+        strncpy(ts->iface, iface, sizeof(ts->iface) - 1);
+    return ts;
+}
+
+void tx_timestamp_begin (tx_timestamp_t* ts)
+{
+    ts->send_start = realtime_();
+}
+
+void tx_timestamp_sent (tx_timestamp_t* ts, size_t count)
+{
+    if (count == 0)
+        return;
+    /* A TCP send is stamped by its last byte; each datagram by its own count */
+    size_t sends = ts->tcp ? 1 : count;
+    for (size_t ii = 0; ii < sends; ii++) {
+        uint32_t key = ts->tcp ? ts->next_key + count - 1 : ts->next_key + ii;
+        size_t next = (ts->head + 1) % TX_TIMESTAMP_PENDING;
+        if (next == ts->tail) {
+            /* Stamps are not coming back; forget the oldest */
+            ts->tail = (ts->tail + 1) % TX_TIMESTAMP_PENDING;
+            ts->missed++;
+        }
+        ts->keys[ts->head] = key;
+        ts->times[ts->head] = ts->send_start;
+        ts->head = next;
+    }
+    ts->next_key += count;
+}
+
+static void space_ (tx_timestamp_t* ts, const struct timespec* stamp)
+{
+    double wire = stamp->tv_sec + stamp->tv_nsec * 1e-9;
+    if (ts->last_wire > 0)
+        tx_timing_add(&ts->spacing, (wire - ts->last_wire) * 1e9);
+    ts->last_wire = wire;
+}
+
+/* With hardware stamping the kernel reports the software and the device
+ * stamp of a send as two messages with the same key, in either order, so
+ * each kind is tracked on its own: only software stamps (CLOCK_REALTIME,
+ * like the send times) complete pending sends, and spacing comes from one
+ * clock only, the device's when it stamps, rather than a mix of the two. */
+static void complete_ (tx_timestamp_t* ts, uint32_t key, const struct timespec* software, const struct timespec* hardware)
+{
+    if (software->tv_sec || software->tv_nsec) {
+        /* Keys only grow, so anything older than this one will never be stamped */
+        while (ts->tail != ts->head && (int32_t)(ts->keys[ts->tail] - key) < 0) {
+            ts->tail = (ts->tail + 1) % TX_TIMESTAMP_PENDING;
+            ts->missed++;
+        }
+        if (ts->tail != ts->head && ts->keys[ts->tail] == key) {
+            double wire = software->tv_sec + software->tv_nsec * 1e-9;
+            tx_timing_add(&ts->latency, (wire - ts->times[ts->tail]) * 1e9);
+            ts->tail = (ts->tail + 1) % TX_TIMESTAMP_PENDING;
+        }
+        if (!ts->hardware)
+            space_(ts, software);
+    }
+    if (ts->hardware && (hardware->tv_sec || hardware->tv_nsec))
+        space_(ts, hardware);
+}
+
+int tx_timestamp_poll (tx_timestamp_t* ts)
+{
+    int read = 0;
+    for (;;) {
+        char control[512];
+        struct msghdr msg;
+        memset(&msg, 0, sizeof(msg));
+        msg.msg_control = control;
+        msg.msg_controllen = sizeof(control);
+        if (recvmsg(ts->sock, &msg, MSG_ERRQUEUE | MSG_DONTWAIT) < 0)
+            break;
+
+        struct scm_timestamping* stamps = NULL;
+        struct sock_extended_err* err = NULL;
+        for (struct cmsghdr* cm = CMSG_FIRSTHDR(&msg); cm != NULL; cm = CMSG_NXTHDR(&msg, cm)) {
+            if (cm->cmsg_level == SOL_SOCKET && cm->cmsg_type == SCM_TIMESTAMPING)
+                stamps = (struct scm_timestamping*)CMSG_DATA(cm);
+            else if ((cm->cmsg_level == SOL_IP && cm->cmsg_type == IP_RECVERR) ||
+                     (cm->cmsg_level == SOL_IPV6 && cm->cmsg_type == IPV6_RECVERR))
+                err = (struct sock_extended_err*)CMSG_DATA(cm);
+        }
+        if (stamps == NULL || err == NULL || err->ee_origin != SO_EE_ORIGIN_TIMESTAMPING || err->ee_info != SCM_TSTAMP_SND)
+            continue;
+        complete_(ts, err->ee_data, &stamps->ts[0], &stamps->ts[2]);
+        read++;
+    }
+    return read;
+}
+
+void tx_timestamp_close (tx_timestamp_t* ts)
+{
+    int flags = 0;
+    setsockopt(ts->sock, SOL_SOCKET, SO_TIMESTAMPING, &flags, sizeof(flags));
+    /* Hand the device back the transmit stamping it had before */
+    if (ts->hardware && ts->hw_tx_type != HWTSTAMP_TX_ON)
+        set_hardware_(ts->iface, ts->hw_tx_type);
+    free(ts);
+}
+
+void tx_timing_add (tx_timing_stats_t* stats, double ns)
+{
+    if (ns < 0)
+        ns = 0;
+    int bucket = ns < 1 ? 0 : (int)(4 * log2(ns)) + 1;
+    if (bucket >= TX_TIMING_BUCKETS)
+        bucket = TX_TIMING_BUCKETS - 1;
+    stats->buckets[bucket]++;
+    stats->count++;
+    stats->sum += ns;
+    if (ns > stats->max)
+        stats->max = ns;
+}
+
+double tx_timing_percentile (const tx_timing_stats_t* stats, double p)
+{
+    if (stats->count == 0)
+        return 0;
+    uint64_t rank = (uint64_t)ceil(p * stats->count);
+    uint64_t seen = 0;
+    for (int bucket = 0; bucket < TX_TIMING_BUCKETS; bucket++) {
+        seen += stats->buckets[bucket];
+        if (seen >= rank && seen > 0) {
+            double edge = bucket == 0 ? 1 : pow(2.0, bucket / 4.0);
+            return edge < stats->max ? edge : stats->max;
+        }
+    }
+    return stats->max;
+}
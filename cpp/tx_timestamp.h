@@ -0,0 +1,90 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#ifndef TX_TIMESTAMP_H_
+#define TX_TIMESTAMP_H_
+
+#include <stddef.h>
+#include <stdint.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*
+ * Kernel transmit timestamps (SO_TIMESTAMPING) for one socket. Each send is
+ * noted with the time it was made; the kernel later reports, on the socket's
+ * error queue, when the datagram (or, for TCP, the send's last byte) left
+ * the host. Matching the two gives send-to-wire latency, and successive wire
+ * times give the spacing of packets on the wire.
+ */
+
+/* Quarter-octave histogram of nanoseconds */
+#define TX_TIMING_BUCKETS 160
+
+typedef struct {
+    uint64_t count;
+    double sum;            /* ns */
+    double max;            /* ns */
+    uint64_t buckets[TX_TIMING_BUCKETS];
+} tx_timing_stats_t;
+
+#define TX_TIMESTAMP_PENDING 4096
+
+typedef struct {
+    int sock;
+    int tcp;
+    int hardware;          /* the device stamps transmissions too */
+    int hw_tx_type;        /* the device's transmit stamping before open */
+    char iface[16];        /* the device, when hardware is set */
+    uint32_t next_key;     /* UDP: datagrams sent; TCP: bytes sent */
+    uint32_t keys[TX_TIMESTAMP_PENDING];
+    double times[TX_TIMESTAMP_PENDING];
+    size_t head, tail;     /* sends awaiting their timestamp */
+    double send_start;     /* s, when the current send began */
+    double last_wire;      /* s, 0 before the first spacing timestamp */
+    uint64_t missed;       /* sends the kernel never stamped */
+    tx_timing_stats_t latency;
+    tx_timing_stats_t spacing;
+} tx_timestamp_t;
+
+/* Turns on transmit timestamps for sock, asking the device named iface for
+ * hardware stamps when hardware is set and it supports them. Returns NULL
+ * if the kernel does not support software transmit timestamps. */
+tx_timestamp_t* tx_timestamp_open (int sock, int tcp, const char* iface, int hardware);
+/* Call just before each send ... */
+void tx_timestamp_begin (tx_timestamp_t* ts);
+/* ... and after it, with the datagrams (UDP) or bytes (TCP) it sent */
+void tx_timestamp_sent (tx_timestamp_t* ts, size_t count);
+/* Reads the timestamps waiting on the error queue without blocking and
+ * returns how many were read */
+int tx_timestamp_poll (tx_timestamp_t* ts);
+/* Turns timestamping off, restores the device's transmit stamping, and frees ts */
+void tx_timestamp_close (tx_timestamp_t* ts);
+
+void tx_timing_add (tx_timing_stats_t* stats, double ns);
+/* Upper edge, in ns, of the bucket holding the p'th (0 to 1) sample */
+double tx_timing_percentile (const tx_timing_stats_t* stats, double p);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif /* TX_TIMESTAMP_H_ */
@@ -0,0 +1,65 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#include <sys/types.h>
+#include <sys/socket.h>
+#include <netinet/in.h>
+#include <string.h>
+#include <stdint.h>
+#include "udp_gso.h"
+
+/* Older userspace headers predate UDP GSO (Linux 4.18) */
+#ifndef SOL_UDP
+#define SOL_UDP 17
+#endif
+#ifndef UDP_SEGMENT
+#define UDP_SEGMENT 103
+#endif
+
+int udp_gso_supported (int sock)
+{
+    int gso_size = 0;
+    socklen_t len = sizeof(gso_size);
+    return getsockopt(sock, SOL_UDP, UDP_SEGMENT, &gso_size, &len) == 0;
+}
+
+ssize_t udp_gso_transmit (int sock, const struct sockaddr_in* addr, const struct iovec* iov, size_t iovcnt, unsigned short segment_size)
+{
+    char control[CMSG_SPACE(sizeof(uint16_t))];
+    memset(control, 0, sizeof(control));
+
+    struct msghdr msg;
+    memset(&msg, 0, sizeof(msg));
+    msg.msg_name = (void*)addr;
+    msg.msg_namelen = sizeof(*addr);
+    msg.msg_iov = (struct iovec*)iov;
+    msg.msg_iovlen = iovcnt;
+    msg.msg_control = control;
+    msg.msg_controllen = sizeof(control);
+
+    struct cmsghdr* cm = CMSG_FIRSTHDR(&msg);
+    cm->cmsg_level = SOL_UDP;
+    cm->cmsg_type = UDP_SEGMENT;
+    cm->cmsg_len = CMSG_LEN(sizeof(uint16_t));
+    uint16_t gso_size = segment_size;
+    memcpy(CMSG_DATA(cm), &gso_size, sizeof(gso_size));
+
+    return sendmsg(sock, &msg, 0);
+}
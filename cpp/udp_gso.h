@@ -0,0 +1,47 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#ifndef UDP_GSO_H_
+#define UDP_GSO_H_
+
+#include <sys/types.h>
+#include <sys/uio.h>
+#include <netinet/in.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/* Most datagrams the kernel will build from a single segmented send */
+#define UDP_GSO_MAX_SEGMENTS 64
+/* Most bytes of UDP payload a single segmented send may carry */
+#define UDP_GSO_MAX_BYTES (65535 - 20 - 8)
+
+/* Returns 1 if the kernel accepts UDP_SEGMENT on this socket, 0 otherwise */
+int udp_gso_supported (int sock);
+/* Sends the concatenation of iov as datagrams of segment_size bytes each;
+ * only the last datagram may be shorter. Returns the bytes sent or -1. */
+ssize_t udp_gso_transmit (int sock, const struct sockaddr_in* addr, const struct iovec* iov, size_t iovcnt, unsigned short segment_size);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif /* UDP_GSO_H_ */
@@ -0,0 +1,81 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#include <sys/types.h>
+#include <sys/socket.h>
+#include <netinet/in.h>
+#include <string.h>
+#include <vector>
+#include "udp_shard.h"
+
+/* Older userspace headers predate SO_REUSEPORT (Linux 3.9) */
+#ifndef SO_REUSEPORT
+#define SO_REUSEPORT 15
+#endif
+
+int udp_shard_bind (const int* socks, int count)
+{
+    struct sockaddr_in local;
+    memset(&local, 0, sizeof(local));
+    local.sin_family = AF_INET;
+    local.sin_addr.s_addr = htonl(INADDR_ANY);
+    int one = 1;
+    for (int ii = 0; ii < count; ii++) {
+        struct sockaddr_in bound;
+        socklen_t len = sizeof(bound);
+        if (getsockname(socks[ii], (struct sockaddr*)&bound, &len) < 0)
+            return -1;
+        if (bound.sin_port != 0)
+            continue;
+        if (setsockopt(socks[ii], SOL_SOCKET, SO_REUSEPORT, &one, sizeof(one)) < 0)
+            return -1;
+        if (bind(socks[ii], (struct sockaddr*)&local, sizeof(local)) < 0)
+            return -1;
+        /* The first bind picks the port the others share */
+        if (local.sin_port == 0) {
+            len = sizeof(local);
+            if (getsockname(socks[ii], (struct sockaddr*)&local, &len) < 0)
+                return -1;
+        }
+    }
+    return 0;
+}
+
+ssize_t udp_transmit_batch (int sock, const struct sockaddr_in* addr, const struct iovec* iov, size_t count)
+{
+    std::vector<struct mmsghdr> msgs(count);
+    for (size_t ii = 0; ii < count; ii++) {
+        memset(&msgs[ii], 0, sizeof(msgs[ii]));
+        msgs[ii].msg_hdr.msg_name = (void*)addr;
+        msgs[ii].msg_hdr.msg_namelen = sizeof(*addr);
+        msgs[ii].msg_hdr.msg_iov = (struct iovec*)&iov[ii];
+        msgs[ii].msg_hdr.msg_iovlen = 1;
+    }
+    size_t sent = 0;
+    while (sent < count) {
+        int result = sendmmsg(sock, &msgs[sent], count - sent, 0);
+        if (result <= 0)
+            break;
+        sent += result;
+    }
+    if (sent == 0 && count > 0)
+        return -1;
+    return sent;
+}
@@ -0,0 +1,45 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#ifndef UDP_SHARD_H_
+#define UDP_SHARD_H_
+
+#include <sys/types.h>
+#include <sys/uio.h>
+#include <netinet/in.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/* Gives UDP sockets opened for one destination a common source port with
+ * SO_REUSEPORT, so several threads can send one flow on sockets of their own.
+ * Sockets already bound (multicast sockets bind to their group) are left as
+ * they are. Returns 0, or -1 with errno set. */
+int udp_shard_bind (const int* socks, int count);
+/* Sends each iov entry as its own datagram with as few system calls as the
+ * kernel allows. Returns the number of datagrams sent, or -1 if none were. */
+ssize_t udp_transmit_batch (int sock, const struct sockaddr_in* addr, const struct iovec* iov, size_t count);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif /* UDP_SHARD_H_ */
@@ -0,0 +1,231 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#include <arpa/inet.h>
+#include <string.h>
+#include "vrl_crc.h"
+
+#if defined(__x86_64__) || defined(__i386__)
+#include <emmintrin.h>
+#include <tmmintrin.h>
+#include <wmmintrin.h>
+#define VRL_CRC_HAVE_CLMUL 1
+#endif
+
+/* Clocking a word in LSB first through a left-shifting register and
+ * bit-reversing the result is the reflected CRC, so everything below works
+ * on the reflected polynomial and its register needs no final reversal. A
+ * word's bits enter in the order of its little-endian bytes. */
+#define VRL_CRC_POLY 0xEDB88320
+
+static uint32_t crc_table[8][256];
+static uint32_t x2n_table[32];
+
+/* a * b modulo the polynomial, both reflected */
+static uint32_t multmodp (uint32_t a, uint32_t b)
+{
+    uint32_t m = (uint32_t)1 << 31;
+    uint32_t p = 0;
+    for (;;) {
+        if (a & m) {
+            p ^= b;
+            if ((a & (m - 1)) == 0)
+                break;
+        }
+        m >>= 1;
+        b = (b & 1) ? (b >> 1) ^ VRL_CRC_POLY : b >> 1;
+    }
+    return p;
+}
+
+static int init_tables ()
+{
+    for (uint32_t b = 0; b < 256; b++) {
+        uint32_t c = b;
+        for (int k = 0; k < 8; k++)
+            c = (c & 1) ? (c >> 1) ^ VRL_CRC_POLY : c >> 1;
+        crc_table[0][b] = c;
+    }
+    for (uint32_t b = 0; b < 256; b++) {
+        for (int k = 1; k < 8; k++)
+            crc_table[k][b] = (crc_table[k - 1][b] >> 8) ^ crc_table[0][crc_table[k - 1][b] & 0xFF];
+    }
+    /* x^(2^k) */
+    x2n_table[0] = (uint32_t)1 << 30;
+    for (int k = 1; k < 32; k++)
+        x2n_table[k] = multmodp(x2n_table[k - 1], x2n_table[k - 1]);
+    return 1;
+}
+
+static int tables_ready __attribute__((unused)) = init_tables();
+
+/* Words hold their bits in clocking order: least significant first */
+static inline uint32_t crc_word (uint32_t crc, uint32_t word)
+{
+    crc ^= word;
+    return crc_table[3][crc & 0xFF] ^ crc_table[2][(crc >> 8) & 0xFF] ^
+           crc_table[1][(crc >> 16) & 0xFF] ^ crc_table[0][crc >> 24];
+}
+
+static inline uint32_t load_word (const uint8_t* p)
+{
+    uint32_t word;
+    memcpy(&word, p, sizeof(word));
+    return ntohl(word);
+}
+
+uint32_t vrl_crc_slice (uint32_t crc, const void* buf, size_t length)
+{
+    const uint8_t* p = (const uint8_t*)buf;
+    while (length >= 8) {
+        uint32_t one = load_word(p) ^ crc;
+        uint32_t two = load_word(p + 4);
+        crc = crc_table[7][one & 0xFF] ^ crc_table[6][(one >> 8) & 0xFF] ^
+              crc_table[5][(one >> 16) & 0xFF] ^ crc_table[4][one >> 24] ^
+              crc_table[3][two & 0xFF] ^ crc_table[2][(two >> 8) & 0xFF] ^
+              crc_table[1][(two >> 16) & 0xFF] ^ crc_table[0][two >> 24];
+        p += 8;
+        length -= 8;
+    }
+    if (length >= 4)
+        crc = crc_word(crc, load_word(p));
+    return crc;
+}
+
+#ifdef VRL_CRC_HAVE_CLMUL
+
+/* Folds 128 bits forward over the next 16 (or 64) bytes */
+__attribute__((target("pclmul,sse2")))
+static inline __m128i fold (__m128i x, __m128i k, __m128i next)
+{
+    return _mm_xor_si128(_mm_xor_si128(_mm_clmulepi64_si128(x, k, 0x00), _mm_clmulepi64_si128(x, k, 0x11)), next);
+}
+
+__attribute__((target("pclmul,ssse3")))
+uint32_t vrl_crc_clmul (uint32_t crc, const void* buf, size_t length)
+{
+    const uint8_t* p = (const uint8_t*)buf;
+    if (length < 64)
+        return vrl_crc_slice(crc, buf, length);
+
+    /* Put each big-endian word's bytes in clocking order */
+    const __m128i swap = _mm_setr_epi8(3, 2, 1, 0, 7, 6, 5, 4, 11, 10, 9, 8, 15, 14, 13, 12);
+    __m128i x0 = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i*)(p +  0)), swap);
+    __m128i x1 = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i*)(p + 16)), swap);
+    __m128i x2 = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i*)(p + 32)), swap);
+    __m128i x3 = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i*)(p + 48)), swap);
+    x0 = _mm_xor_si128(x0, _mm_cvtsi32_si128(crc));
+    p += 64;
+    length -= 64;
+
+    /* x^(512+32) and x^(512-32) mod P, then the same for 128 bits */
+    __m128i k = _mm_set_epi64x(0x1c6e41596LL, 0x154442bd4LL);
+    while (length >= 64) {
+        x0 = fold(x0, k, _mm_shuffle_epi8(_mm_loadu_si128((const __m128i*)(p +  0)), swap));
+        x1 = fold(x1, k, _mm_shuffle_epi8(_mm_loadu_si128((const __m128i*)(p + 16)), swap));
+        x2 = fold(x2, k, _mm_shuffle_epi8(_mm_loadu_si128((const __m128i*)(p + 32)), swap));
+        x3 = fold(x3, k, _mm_shuffle_epi8(_mm_loadu_si128((const __m128i*)(p + 48)), swap));
+        p += 64;
+        length -= 64;
+    }
+    k = _mm_set_epi64x(0x0ccaa009eLL, 0x1751997d0LL);
+    x0 = fold(x0, k, x1);
+    x0 = fold(x0, k, x2);
+    x0 = fold(x0, k, x3);
+    while (length >= 16) {
+        x0 = fold(x0, k, _mm_shuffle_epi8(_mm_loadu_si128((const __m128i*)p), swap));
+        p += 16;
+        length -= 16;
+    }
+
+    /* The remaining 128 bits have the same CRC as everything folded into them */
+    uint32_t words[4];
+    _mm_storeu_si128((__m128i*)words, x0);
+    crc = 0;
+    for (int i = 0; i < 4; i++)
+        crc = crc_word(crc, words[i]);
+    return vrl_crc_slice(crc, p, length);
+}
+
+int vrl_crc_clmul_supported (void)
+{
+    __builtin_cpu_init();
+    return __builtin_cpu_supports("pclmul") && __builtin_cpu_supports("ssse3");
+}
+
+#else
+
+uint32_t vrl_crc_clmul (uint32_t crc, const void* buf, size_t length)
+{
+    return vrl_crc_slice(crc, buf, length);
+}
+
+int vrl_crc_clmul_supported (void)
+{
+    return 0;
+}
+
+#endif
+
+static int use_clmul = vrl_crc_clmul_supported();
+
+uint32_t vrl_crc (uint32_t crc, const void* buf, size_t length)
+{
+    if (use_clmul)
+        return vrl_crc_clmul(crc, buf, length);
+    return vrl_crc_slice(crc, buf, length);
+}
+
+uint32_t vrl_crc_combine (uint32_t crcA, uint32_t crcB, size_t lengthB)
+{
+    /* Shift A's register past B's bits: multiply by x^(8 * lengthB) */
+    uint32_t p = (uint32_t)1 << 31;
+    for (unsigned k = 3; lengthB; lengthB >>= 1, k++) {
+        if (lengthB & 1)
+            p = multmodp(x2n_table[k & 31], p);
+    }
+    return multmodp(p, crcA) ^ crcB;
+}
+
+void vrl_crc_update (void* frame, size_t length)
+{
+    uint8_t* p = (uint8_t*)frame;
+    uint32_t crc = htonl(vrl_crc(0, p, length - 4));
+    memcpy(p + length - 4, &crc, sizeof(crc));
+}
+
+uint32_t vrl_crc_count (vrl_crc_count_t* cache, unsigned count, size_t length)
+{
+    /* The CRC is linear, so each count bit (bits 20-31 of the second header
+     * word) contributes a fixed term for a given length */
+    if (cache->length != length) {
+        for (int bit = 0; bit < 12; bit++) {
+            uint32_t header[2] = { 0, htonl((uint32_t)1 << (20 + bit)) };
+            cache->terms[bit] = vrl_crc_combine(vrl_crc_slice(0, header, sizeof(header)), 0, length - sizeof(header) - 4);
+        }
+        cache->length = length;
+    }
+    uint32_t crc = 0;
+    for (int bit = 0; bit < 12; bit++) {
+        if (count & (1 << bit))
+            crc ^= cache->terms[bit];
+    }
+    return crc;
+}
@@ -0,0 +1,67 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+#ifndef VRL_CRC_H_
+#define VRL_CRC_H_
+
+#include <stddef.h>
+#include <stdint.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/* The VRL frame CRC (VITA 49.1): polynomial 0x04C11DB7 clocked over each
+ * 32-bit word least significant bit first, zero initial value, no final XOR,
+ * and the register bit-reversed into the trailer. Buffers hold the frame as
+ * sent, i.e. big-endian words; lengths are in bytes and a multiple of 4.
+ *
+ * Every function continues from crc, so a frame may be checked in pieces
+ * starting from 0. */
+
+/* Fastest available implementation */
+uint32_t vrl_crc (uint32_t crc, const void* buf, size_t length);
+/* Table-driven slicing-by-8 */
+uint32_t vrl_crc_slice (uint32_t crc, const void* buf, size_t length);
+/* Carry-less multiply folding; only call when vrl_crc_clmul_supported() */
+uint32_t vrl_crc_clmul (uint32_t crc, const void* buf, size_t length);
+/* Nonzero when the CPU has PCLMULQDQ and SSSE3 */
+int vrl_crc_clmul_supported (void);
+
+/* CRC of A followed by B, given the CRCs of each and the length of B */
+uint32_t vrl_crc_combine (uint32_t crcA, uint32_t crcB, size_t lengthB);
+
+/* Computes the CRC of a complete frame and stores it in its trailer word */
+void vrl_crc_update (void* frame, size_t length);
+
+/* The frame count's share of the CRC for frames of one length; the CRC of a
+ * frame is that of the same frame with a zero count XOR vrl_crc_count() */
+typedef struct {
+    size_t length;
+    uint32_t terms[12];
+} vrl_crc_count_t;
+
+uint32_t vrl_crc_count (vrl_crc_count_t* cache, unsigned count, size_t length);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif /* VRL_CRC_H_ */
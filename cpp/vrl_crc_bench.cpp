@@ -0,0 +1,192 @@
+/*
+ * This file is protected by Copyright. Please refer to the COPYRIGHT file
+ * distributed with this source distribution.
+ *
+ * This file is part of REDHAWK core.
+ *
+ * REDHAWK core is free software: you can redistribute it and/or modify it
+ * under the terms of the GNU Lesser General Public License as published by the
+ * Free Software Foundation, either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * REDHAWK core is distributed in the hope that it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+ * for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public License
+ * along with this program.  If not, see http://www.gnu.org/licenses/.
+ */
+
+/* Checks the VRL CRC implementations against the bit-serial algorithm from
+ * VITA 49.1 and against frames stamped by vrtlib, exiting nonzero on any
+ * mismatch; run by `make check`. With --bench it then reports the throughput
+ * of each implementation. */
+
+#include <arpa/inet.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include <vector>
+#include <BasicVRLFrame.h>
+#include <BasicDataPacket.h>
+#include "vrl_crc.h"
+
+using namespace vrt;
+
+/* VITA 49.1: each 32-bit word clocked in LSB first, result bit-reversed */
+static uint32_t reference_crc (const uint8_t* frame, size_t length)
+{
+    const uint32_t poly = 0x04C11DB7;
+    uint32_t crc = 0;
+    for (size_t i = 0; i + 4 <= length; i += 4) {
+        uint32_t val;
+        memcpy(&val, frame + i, sizeof(val));
+        val = ntohl(val);
+        for (int bit = 0; bit < 32; bit++) {
+            uint32_t inbit = ((val >> bit) ^ (crc >> 31)) & 0x1;
+            crc = (crc << 1) ^ (inbit ? poly : 0);
+        }
+    }
+    uint32_t calc = 0;
+    for (int bit = 0; bit < 32; bit++)
+        calc |= ((crc >> bit) & 0x1) << (31 - bit);
+    return calc;
+}
+
+/* vrtlib stamps frames of one packet each; vrl_crc must agree on the same
+ * bytes, so the two cannot share a misreading of the spec */
+static int check_vrtlib (const std::vector<uint8_t>& data)
+{
+    int failures = 0;
+    PayloadFormat format(true, RealComplexType_Real, DataItemFormat_SignedInt, false, 0, 0, 8, 8, 1, 1);
+    for (size_t bytes = 4; bytes <= 1024; bytes += 68) {
+        std::vector<char> payload(data.begin(), data.begin() + bytes);
+        BasicDataPacket packet;
+        packet.setStreamIdentifier(bytes);
+        packet.setPayloadFormat(format.getBits());
+        packet.setPayloadLength(bytes);
+        packet.setData(format.getBits(), &payload[0], bytes, false);
+        BasicVRLFrame frame;
+        frame.setVRTPacket(&packet);
+        frame.setFrameCount(bytes & 0xFFF);
+        frame.updateCRC();
+
+        const uint8_t* buf = (const uint8_t*)frame.getFramePointer();
+        size_t length = frame.getFrameLength();
+        uint32_t trailer;
+        memcpy(&trailer, buf + length - 4, sizeof(trailer));
+        uint32_t actual = vrl_crc(0, buf, length - 4);
+        if (actual != ntohl(trailer)) {
+            if (failures++ < 5)
+                printf("FAIL vrtlib: %zu byte frame: 0x%08x, vrtlib 0x%08x\n", length, actual, ntohl(trailer));
+        }
+    }
+    return failures;
+}
+
+static double now ()
+{
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+typedef uint32_t (*crc_function)(uint32_t, const void*, size_t);
+
+static int check (const char* name, crc_function crc, const std::vector<uint8_t>& data)
+{
+    int failures = 0;
+    for (size_t length = 0; length <= data.size(); length += 4) {
+        uint32_t expected = reference_crc(&data[0], length);
+        uint32_t actual = crc(0, &data[0], length);
+        if (actual != expected) {
+            if (failures++ < 5)
+                printf("FAIL %s: %zu bytes: 0x%08x, expected 0x%08x\n", name, length, actual, expected);
+        }
+        /* Any split point must give the same answer, continued or combined */
+        size_t split = (length / 3) & ~(size_t)3;
+        uint32_t head = crc(0, &data[0], split);
+        if (crc(head, &data[split], length - split) != expected ||
+            vrl_crc_combine(head, crc(0, &data[split], length - split), length - split) != expected) {
+            if (failures++ < 5)
+                printf("FAIL %s: %zu bytes split at %zu\n", name, length, split);
+        }
+    }
+    return failures;
+}
+
+static void bench (const char* name, crc_function crc, size_t length, long budget)
+{
+    std::vector<uint8_t> frame(length);
+    for (size_t i = 0; i < length; i++)
+        frame[i] = rand();
+    long iterations = 1 + budget / length;
+    volatile uint32_t sink = 0;
+    double start = now();
+    for (long i = 0; i < iterations; i++)
+        sink ^= crc(0, &frame[0], length);
+    double elapsed = now() - start;
+    printf("%-10s %6zu bytes: %9.1f ns/frame %8.1f MB/s\n", name, length,
+           elapsed * 1e9 / iterations, length * iterations / elapsed / 1e6);
+}
+
+static uint32_t reference (uint32_t, const void* buf, size_t length)
+{
+    return reference_crc((const uint8_t*)buf, length);
+}
+
+int main (int argc, char* argv[])
+{
+    std::vector<uint8_t> data(4096 + 4);
+    srand(49);
+    for (size_t i = 0; i < data.size(); i++)
+        data[i] = rand();
+
+    int failures = check("slice", vrl_crc_slice, data);
+    if (vrl_crc_clmul_supported())
+        failures += check("clmul", vrl_crc_clmul, data);
+    failures += check("vrl_crc", vrl_crc, data);
+    failures += check_vrtlib(data);
+
+    /* A stored trailer makes the frame check out */
+    vrl_crc_update(&data[0], 1024);
+    uint32_t trailer;
+    memcpy(&trailer, &data[1020], sizeof(trailer));
+    if (ntohl(trailer) != reference_crc(&data[0], 1020)) {
+        printf("FAIL vrl_crc_update\n");
+        failures++;
+    }
+
+    /* A frame count's contribution matches recomputing the whole frame */
+    vrl_crc_count_t terms;
+    terms.length = 0;
+    for (unsigned count = 0; count < 4096; count += 273) {
+        uint32_t header = htonl((count << 20) | 256);
+        memcpy(&data[4], &header, sizeof(header));
+        uint32_t expected = reference_crc(&data[0], 1020);
+        header = htonl(256);
+        memcpy(&data[4], &header, sizeof(header));
+        if ((reference_crc(&data[0], 1020) ^ vrl_crc_count(&terms, count, 1024)) != expected) {
+            printf("FAIL vrl_crc_count: count %u\n", count);
+            failures++;
+        }
+    }
+    if (failures) {
+        printf("%d failures\n", failures);
+        return 1;
+    }
+    printf("VRL CRC conformance: ok (clmul %s)\n", vrl_crc_clmul_supported() ? "available" : "unavailable");
+
+    if (argc < 2 || strcmp(argv[1], "--bench") != 0)
+        return 0;
+    const size_t sizes[] = { 64, 1464, 8972, 65504 };
+    for (size_t i = 0; i < sizeof(sizes) / sizeof(sizes[0]); i++) {
+        bench("bitwise", reference, sizes[i], 16L << 20);
+        bench("slice", vrl_crc_slice, sizes[i], 256L << 20);
+        if (vrl_crc_clmul_supported())
+            bench("clmul", vrl_crc_clmul, sizes[i], 256L << 20);
+    }
+    return 0;
+}
@@ -156,7 +156,13 @@ class ResourceTests(ossie.utils.testing.ScaComponentTestCase):
         
     def configureAdvanced(self, max_payload_size=1452, number_of_buffers=10, force_transmit=False,
                           endian_representation=0, use_bulkio_sri=False, time_between_context_packets=1,
-                          number_of_packets_in_burst=150, throttle_time_between_packet_bursts=100):
+                          number_of_packets_in_burst=150, throttle_time_between_packet_bursts=100,
+                          auto_payload_size=False, udp_gso=False, max_packet_latency=0, target_packet_rate=0,
+                          max_transfers_per_service=16, precompute_crc=False, transmit_threads=1,
+                          transmit_batch_size=32, strict_stream_order=True, tx_timestamping=False,
+                          transmit_backend='socket', transmit_queue_depth=64, prewarm=False,
+                          transmit_pacing='off', pacing_offset=0, tracing=False, capture_packets=0,
+                          capture_snap_length=0):
         """ Configure rh.SinkVITA49 advanced properties
         """
         self.comp.advanced_configuration.max_payload_size = max_payload_size #1452 for MTU of 1500
@@ -167,6 +173,24 @@ class ResourceTests(ossie.utils.testing.ScaComponentTestCase):
         self.comp.advanced_configuration.time_between_context_packets = time_between_context_packets
         self.comp.advanced_configuration.number_of_packets_in_burst = number_of_packets_in_burst
         self.comp.advanced_configuration.throttle_time_between_packet_bursts = throttle_time_between_packet_bursts
+        self.comp.advanced_configuration.auto_payload_size = auto_payload_size
+        self.comp.advanced_configuration.udp_gso = udp_gso
+        self.comp.advanced_configuration.max_packet_latency = max_packet_latency
+        self.comp.advanced_configuration.target_packet_rate = target_packet_rate
+        self.comp.advanced_configuration.max_transfers_per_service = max_transfers_per_service
+        self.comp.advanced_configuration.precompute_crc = precompute_crc
+        self.comp.advanced_configuration.transmit_threads = transmit_threads
+        self.comp.advanced_configuration.transmit_batch_size = transmit_batch_size
+        self.comp.advanced_configuration.strict_stream_order = strict_stream_order
+        self.comp.advanced_configuration.tx_timestamping = tx_timestamping
+        self.comp.advanced_configuration.transmit_backend = transmit_backend
+        self.comp.advanced_configuration.transmit_queue_depth = transmit_queue_depth
+        self.comp.advanced_configuration.prewarm = prewarm
+        self.comp.advanced_configuration.transmit_pacing = transmit_pacing
+        self.comp.advanced_configuration.pacing_offset = pacing_offset
+        self.comp.advanced_configuration.tracing = tracing
+        self.comp.advanced_configuration.capture_packets = capture_packets
+        self.comp.advanced_configuration.capture_snap_length = capture_snap_length
         
     def createKeywords(self, colBW=20000000, colRF=155500000):
         """ Return list of all VITA49 expected keywords.
@@ -259,10 +283,54 @@ class ResourceTests(ossie.utils.testing.ScaComponentTestCase):
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.sock.bind(("", port))
         
+    def packetCapture(self):
+        """ Returns packet_capture as a string of bytes
+        """
+        pcap = self.comp.packet_capture
+        if isinstance(pcap, str):
+            return pcap
+        return ''.join(chr(b) for b in pcap)
+
     def closeSocket(self):
         self.sock.close()
         self.sock = None
         
+    def vrtTimestamps(self, frame):
+        """ Returns (packet type, integer seconds, fractional seconds) for each
+            VRT packet in a VRL frame.
+        """
+        packets = []
+        offset = 8
+        while offset + 4 <= len(frame) and frame[offset:offset+4] != 'VEND':
+            header = struct.unpack('!I', frame[offset:offset+4])[0]
+            ptype = header >> 28
+            field = offset + 4
+            if ptype in (1, 3, 4, 5):
+                field += 4
+            if header & (1 << 27):
+                field += 8
+            seconds = fraction = None
+            if (header >> 22) & 0x3:
+                seconds = struct.unpack('!I', frame[field:field+4])[0]
+                field += 4
+            if (header >> 20) & 0x3:
+                fraction = struct.unpack('!Q', frame[field:field+8])[0]
+            packets.append((ptype, seconds, fraction))
+            offset += (header & 0xFFFF) * 4
+        return packets
+
+    def vrlCrc(self, frame):
+        """ VITA 49.1 frame CRC: every word but the trailer clocked in LSB first,
+            with the register bit-reversed at the end.
+        """
+        crc = 0
+        for i in range(0, len(frame) - 4, 4):
+            val = struct.unpack('!I', frame[i:i+4])[0]
+            for bit in range(32):
+                inbit = ((val >> bit) ^ (crc >> 31)) & 0x1
+                crc = ((crc << 1) & 0xFFFFFFFF) ^ (0x04C11DB7 if inbit else 0)
+        return int('{0:032b}'.format(crc)[::-1], 2)
+
     def validateSocketData(self, dataIn):
         try:
             msg = ''
@@ -423,6 +491,54 @@ class ResourceTests(ossie.utils.testing.ScaComponentTestCase):
         time.sleep(0.1) # This is necessary b/c it can take the port some time to update
         self.assertEqual(len(self.inVitaPort._get_attachmentIds()),0)
 
+    def testPartialDisconnect(self):
+        """testPartialDisconnect
+        """
+        # Configure network info
+        self.configureNetwork()
+        
+        # Set up receiver
+        self.setupSocket()
+        self.sock.settimeout(2)
+        
+        # Start components
+        self.callStart()
+        
+        # Two connections, one of them made twice under the same id
+        streamId = "testPartialDisconnect"
+        attaches=self.attaches
+        self.connectVitaPorts('first')
+        self.connectVitaPorts('second')
+        self.connectVitaPorts('second')
+        self.dataSource.push(range(1000), streamID=streamId)
+        self.waitForAttach(previousAttaches=attaches)
+        
+        # One listener remains, so packets must keep flowing
+        self.disconnectVitaPorts('second')
+        time.sleep(0.1)
+        while True:
+            try:
+                self.sock.recvfrom(65536)
+            except socket.timeout:
+                break
+        self.sock.settimeout(2)
+        self.dataSource.push(range(1000), streamID=streamId)
+        data, addr = self.sock.recvfrom(65536)
+        self.assertTrue(len(data) > 0)
+        
+        # The last listener leaving stops packetization
+        self.disconnectVitaPorts('first')
+        time.sleep(0.1)
+        self.sock.settimeout(0.5)
+        while True:
+            try:
+                self.sock.recvfrom(65536)
+            except socket.timeout:
+                break
+        self.dataSource.push(range(1000), streamID=streamId)
+        self.assertRaises(socket.timeout, self.sock.recvfrom, 65536)
+        self.closeSocket()
+
     def testReconnect(self):
         """testReconnect
         """
@@ -515,6 +631,850 @@ class ResourceTests(ossie.utils.testing.ScaComponentTestCase):
         
         # TODO - more validation
 
+    def testStreamRestart(self):
+        """testStreamRestart
+        """
+        # Configure network info
+        self.configureNetwork()
+        
+        # Set up receiver
+        self.setupSocket()
+        
+        # Start components
+        self.callStart()
+        self.connectVitaPorts()
+        
+        # Back to back streams share one transmit session; each must be delivered completely
+        dataIn = range(1000)
+        for streamId in ("testStreamRestart1", "testStreamRestart2"):
+            attaches=self.attaches
+            detaches=self.detaches
+            self.dataSource.push(dataIn, EOS=True, streamID=streamId, sampleRate=10000.0)
+            self.waitForAttach(previousAttaches=attaches)
+            self.waitForDetach(previousDetaches=detaches)
+            self.validateSocketData(dataIn)
+        
+        self.closeSocket()
+
+
+    def testRetargetWhileStreaming(self):
+        """testRetargetWhileStreaming
+        """
+        # Configure network info
+        self.configureNetwork()
+        
+        # Set up receivers on the original and the new port
+        self.setupSocket()
+        newSock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        newSock.bind(("", 24968))
+        
+        # Start components
+        self.callStart()
+        
+        streamId = "testRetargetWhileStreaming"
+        dataIn = range(1000)
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(dataIn, streamID=streamId, sampleRate=10000.0)
+        self.waitForAttach(previousAttaches=attaches)
+        self.validateSocketData(dataIn)
+        
+        # Move the live stream to a new port; the stream is updated, not re-attached
+        self.configureNetwork(port=24968)
+        time.sleep(0.5)
+        self.assertEqual(self.attaches, attaches+1)
+        attachId = self.inVitaPort._get_attachmentIds()[0]
+        recvStreamDef = self.inVitaPort.getStreamDefinition(attachId)
+        self.validateStreamDef(recvStreamDef, streamId, port=24968)
+        
+        # The rest of the stream arrives on the new port
+        self.dataSource.push(dataIn, EOS=True, streamID=streamId, sampleRate=10000.0)
+        self.closeSocket()
+        self.sock = newSock
+        self.validateSocketData(dataIn)
+        self.closeSocket()
+
+    def testSmallPushes(self):
+        """testSmallPushes
+        """
+        # Configure network info
+        self.configureNetwork()
+        
+        # Set up receiver
+        self.setupSocket()
+        self.sock.settimeout(2)
+        
+        # Start components
+        self.callStart()
+        
+        # Many pushes smaller than one packet must be coalesced, not overwritten
+        streamId = "testSmallPushes"
+        dataIn = range(2000)
+        attaches=self.attaches
+        self.connectVitaPorts()
+        for start in range(0, len(dataIn), 150):
+            self.dataSource.push(dataIn[start:start+150], streamID=streamId, sampleRate=10000.0)
+        self.waitForAttach(previousAttaches=attaches)
+        self.dataSource.push([], EOS=True, streamID=streamId, sampleRate=10000.0)
+        
+        # Reassemble every data frame's payload; the samples must come back in order
+        HDRLEN=32
+        received = []
+        try:
+            while len(received) < len(dataIn):
+                data, addr = self.sock.recvfrom(65536)
+                for m in data.split('VRLP'):
+                    if len(m) < 200:
+                        continue
+                    m = m[HDRLEN:].split('VEND')[0]
+                    received.extend(struct.unpack('h'*int(len(m)/2), m))
+        except socket.timeout:
+            pass
+        self.assertEqual(received, dataIn)
+        self.closeSocket()
+
+    def testMaxPacketLatency(self):
+        """testMaxPacketLatency
+        """
+        # Configure network info
+        self.configureNetwork()
+        self.configureAdvanced(max_packet_latency=50)
+        
+        # Set up receiver
+        self.setupSocket()
+        self.sock.settimeout(2)
+        
+        # Start components
+        self.callStart()
+        
+        # Far less than a packet's worth of samples, and no EOS
+        streamId = "testMaxPacketLatency"
+        dataIn = range(100)
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(dataIn, streamID=streamId, sampleRate=1000.0)
+        self.waitForAttach(previousAttaches=attaches)
+        
+        # The held samples still go out as a short packet once the deadline passes
+        HDRLEN=32
+        received = []
+        try:
+            while len(received) < len(dataIn):
+                data, addr = self.sock.recvfrom(65536)
+                for m in data.split('VRLP'):
+                    if len(m) < 100:
+                        continue
+                    m = m[HDRLEN:].split('VEND')[0]
+                    received.extend(struct.unpack('h'*int(len(m)/2), m))
+        except socket.timeout:
+            pass
+        self.assertEqual(received, dataIn)
+        self.closeSocket()
+
+    def testTargetPacketRate(self):
+        """testTargetPacketRate
+        """
+        # Configure network info
+        self.configureNetwork()
+        self.configureAdvanced(target_packet_rate=100)
+        
+        # Start components
+        self.callStart()
+        
+        # 10 ksps at 100 packets per second is 100 real shorts (200 bytes) per packet
+        streamId = "testTargetPacketRate"
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(range(1000), streamID=streamId, sampleRate=10000.0)
+        self.waitForAttach(previousAttaches=attaches)
+        time.sleep(0.1)
+        self.assertEqual(self.comp.connection_status.payload_size, 200)
+
+    def testTransfersPerService(self):
+        """testTransfersPerService
+        """
+        for budget in (1, 64):
+            # Configure network info
+            self.configureNetwork()
+            self.configureAdvanced(max_transfers_per_service=budget)
+            
+            # Set up receiver
+            self.setupSocket()
+            self.sock.settimeout(2)
+            
+            # Start components
+            self.callStart()
+            
+            # A burst of queued transfers is drained in order whatever the budget
+            streamId = "testTransfersPerService%d" % budget
+            dataIn = range(4000)
+            attaches=self.attaches
+            self.connectVitaPorts()
+            for start in range(0, len(dataIn), 400):
+                self.dataSource.push(dataIn[start:start+400], streamID=streamId, sampleRate=10000.0)
+            self.waitForAttach(previousAttaches=attaches)
+            self.dataSource.push([], EOS=True, streamID=streamId, sampleRate=10000.0)
+            
+            HDRLEN=32
+            received = []
+            try:
+                while len(received) < len(dataIn):
+                    data, addr = self.sock.recvfrom(65536)
+                    for m in data.split('VRLP'):
+                        if len(m) < 200:
+                            continue
+                        m = m[HDRLEN:].split('VEND')[0]
+                        received.extend(struct.unpack('h'*int(len(m)/2), m))
+            except socket.timeout:
+                pass
+            self.assertEqual(received, dataIn)
+            self.closeSocket()
+            self.callStop()
+            self.disconnectVitaPorts()
+
+    def testTransmitThreads(self):
+        """testTransmitThreads
+        """
+        for strict in (False, True):
+            # Configure network info
+            self.configureNetwork()
+            self.configureAdvanced(transmit_threads=4, transmit_batch_size=4, strict_stream_order=strict)
+            
+            # Set up receiver
+            self.setupSocket()
+            self.sock.settimeout(2)
+            
+            # Start components
+            self.callStart()
+            
+            streamId = "testTransmitThreads%s" % strict
+            dataIn = range(20000)
+            attaches=self.attaches
+            self.connectVitaPorts()
+            self.dataSource.push(dataIn, streamID=streamId, sampleRate=10000.0)
+            self.waitForAttach(previousAttaches=attaches)
+            self.dataSource.push([], EOS=True, streamID=streamId, sampleRate=10000.0)
+            
+            frames = []
+            sources = set()
+            try:
+                while True:
+                    data, addr = self.sock.recvfrom(65536)
+                    frames.append(data)
+                    sources.add(addr)
+            except socket.timeout:
+                pass
+            
+            # Every thread sends from the same source port
+            self.assertEqual(len(sources), 1)
+            counts = [struct.unpack('!I', frame[4:8])[0] >> 20 for frame in frames]
+            if strict:
+                # One stream never has two threads sending it, so it arrives in order
+                self.assertEqual(counts, range(len(frames)))
+            else:
+                # Frame counts follow queue order, so the stream can be put back together
+                frames = [frame for count, frame in sorted(zip(counts, frames))]
+            HDRLEN=32
+            received = []
+            for frame in frames:
+                if len(frame) < 200:
+                    continue
+                m = frame[HDRLEN:].split('VEND')[0]
+                received.extend(struct.unpack('h'*int(len(m)/2), m))
+            self.assertEqual(received, dataIn)
+            self.closeSocket()
+            self.callStop()
+            self.disconnectVitaPorts()
+
+    def testTransmitBackend(self):
+        """testTransmitBackend
+        """
+        for backend in ('socket', 'io_uring'):
+            # Configure network info
+            self.configureNetwork()
+            self.configureAdvanced(transmit_backend=backend, transmit_batch_size=8, transmit_queue_depth=16)
+            
+            # Set up receiver
+            self.setupSocket()
+            self.sock.settimeout(1)
+            
+            # Start components
+            self.callStart()
+            
+            streamId = "testTransmitBackend_" + backend
+            dataIn = range(20000)
+            attaches=self.attaches
+            self.connectVitaPorts()
+            self.dataSource.push(dataIn, streamID=streamId, sampleRate=10000.0)
+            self.waitForAttach(previousAttaches=attaches)
+            self.dataSource.push([], EOS=True, streamID=streamId, sampleRate=10000.0)
+            
+            frames = []
+            try:
+                while True:
+                    data, addr = self.sock.recvfrom(65536)
+                    frames.append(data)
+            except socket.timeout:
+                pass
+            
+            # Frames arrive in order whichever backend sends them
+            counts = [struct.unpack('!I', frame[4:8])[0] >> 20 for frame in frames]
+            self.assertEqual(counts, range(len(frames)))
+            HDRLEN=32
+            received = []
+            for frame in frames:
+                if len(frame) < 200:
+                    continue
+                m = frame[HDRLEN:].split('VEND')[0]
+                received.extend(struct.unpack('h'*int(len(m)/2), m))
+            self.assertEqual(received, dataIn)
+            
+            # Kernels without io_uring fall back to socket calls
+            status = self.comp.connection_status
+            self.assertTrue(status.transmit_backend in (backend, 'socket'))
+            self.assertTrue(status.transmit_system_calls > 0)
+            self.assertEqual(status.transmit_errors, 0)
+            self.closeSocket()
+            self.callStop()
+            self.disconnectVitaPorts()
+
+    def testPrewarm(self):
+        """testPrewarm
+        """
+        # Configure network info
+        self.configureNetwork()
+        self.configureAdvanced(prewarm=True)
+        
+        # Set up receiver
+        self.setupSocket()
+        self.sock.settimeout(1)
+        
+        # Ready once started, before anything is connected
+        self.assertFalse(self.comp.connection_status.ready)
+        self.callStart()
+        self.assertTrue(self.comp.connection_status.ready)
+        
+        streamId = "testPrewarm"
+        dataIn = range(5000)
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(dataIn, streamID=streamId, sampleRate=10000.0)
+        self.waitForAttach(previousAttaches=attaches)
+        
+        # The first frame out is the first one made
+        data, addr = self.sock.recvfrom(65536)
+        self.assertEqual(struct.unpack('!I', data[4:8])[0] >> 20, 0)
+        
+        # The session stays open after the last connection goes
+        self.disconnectVitaPorts()
+        time.sleep(0.5)
+        self.assertTrue(self.comp.connection_status.ready)
+        
+        self.closeSocket()
+        self.callStop()
+        self.assertFalse(self.comp.connection_status.ready)
+
+    def testTransmitPacing(self):
+        """testTransmitPacing
+        """
+        # Configure network info
+        self.configureNetwork()
+        self.configureAdvanced(transmit_pacing='relative')
+        
+        # Set up receiver
+        self.setupSocket()
+        self.sock.settimeout(1)
+        
+        # Start components
+        self.callStart()
+        
+        # Two seconds of samples pushed at once go out over two seconds
+        streamId = "testTransmitPacing"
+        dataIn = range(20000)
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(dataIn, streamID=streamId, sampleRate=10000.0)
+        self.waitForAttach(previousAttaches=attaches)
+        
+        arrivals = []
+        try:
+            while True:
+                data, addr = self.sock.recvfrom(65536)
+                arrivals.append(time.time())
+        except socket.timeout:
+            pass
+        self.assertTrue(len(arrivals) > 10)
+        self.assertTrue(arrivals[-1] - arrivals[0] > 1.5)
+        
+        status = self.comp.pacing_status
+        self.assertTrue(status.packets > 0)
+        self.assertTrue(status.lateness_max >= status.lateness_p50)
+        self.closeSocket()
+
+    def testTracing(self):
+        """testTracing
+        """
+        # Configure network info
+        self.configureNetwork()
+        self.configureAdvanced(tracing=True)
+        
+        # Set up receiver
+        self.setupSocket()
+        self.sock.settimeout(1)
+        
+        # Start components
+        self.callStart()
+        
+        streamId = "testTracing"
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(range(5000), streamID=streamId, sampleRate=10000.0, SRIKeywords=self.createKeywords())
+        self.waitForAttach(previousAttaches=attaches)
+        try:
+            while True:
+                self.sock.recvfrom(65536)
+        except socket.timeout:
+            pass
+        
+        # Setting the dump file writes out what the tracepoints recorded
+        path = '/tmp/testTracing.trace'
+        if os.path.exists(path):
+            os.remove(path)
+        self.comp.advanced_configuration.trace_dump_file = path
+        records = [line.split() for line in open(path) if not line.startswith('#')]
+        events = set(record[2] for record in records)
+        for event in ('receive', 'sri_merge', 'context', 'queue_push', 'queue_pop', 'send'):
+            self.assertTrue(event in events)
+        self.assertEqual([int(r[0]) for r in records], sorted(int(r[0]) for r in records))
+        os.remove(path)
+        self.closeSocket()
+
+    def testPacketCapture(self):
+        """testPacketCapture
+        """
+        # Configure network info
+        self.configureNetwork()
+        self.configureAdvanced(capture_packets=8)
+        
+        # Set up receiver
+        self.setupSocket()
+        self.sock.settimeout(1)
+        
+        # Start components
+        self.callStart()
+        
+        streamId = "testPacketCapture"
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(range(20000), streamID=streamId, sampleRate=10000.0)
+        self.waitForAttach(previousAttaches=attaches)
+        frames = []
+        try:
+            while True:
+                data, addr = self.sock.recvfrom(65536)
+                frames.append(data)
+        except socket.timeout:
+            pass
+        self.assertTrue(len(frames) > 8)
+        
+        # The capture holds the last packets sent, each behind IPv4 and UDP headers
+        pcap = self.packetCapture()
+        magic, major, minor, zone, sigfigs, snaplen, linktype = struct.unpack('=IHHiIII', pcap[:24])
+        self.assertEqual(magic, 0xA1B23C4D)
+        self.assertEqual(linktype, 101)
+        captured = []
+        offset = 24
+        while offset < len(pcap):
+            sec, nsec, incl, orig = struct.unpack('=IIII', pcap[offset:offset+16])
+            record = pcap[offset+16:offset+16+incl]
+            self.assertEqual(struct.unpack('!H', record[22:24])[0], 24967)
+            captured.append(record[28:])
+            offset += 16 + incl
+        self.assertEqual(captured, frames[-8:])
+        
+        # Headers only
+        self.comp.advanced_configuration.capture_snap_length = 44
+        self.dataSource.push(range(5000), streamID=streamId, sampleRate=10000.0)
+        time.sleep(1)
+        pcap = self.packetCapture()
+        sec, nsec, incl, orig = struct.unpack('=IIII', pcap[24:40])
+        self.assertEqual(incl, 28 + 44)
+        self.assertTrue(orig > incl)
+        self.closeSocket()
+
+    def testStripeLinks(self):
+        """testStripeLinks
+        """
+        # Configure network info
+        self.configureNetwork()
+        self.configureAdvanced(transmit_batch_size=1)
+        self.comp.stripe_links = [{'interface': 'lo', 'ip_address': '127.0.0.1', 'port': 24968, 'vlan': 0}]
+        
+        # Set up receivers, one per link
+        self.setupSocket()
+        self.sock.settimeout(1)
+        sock2 = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock2.bind(("", 24968))
+        sock2.settimeout(1)
+        
+        # Start components
+        self.callStart()
+        
+        streamId = "testStripeLinks"
+        dataIn = range(20000)
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(dataIn, streamID=streamId, sampleRate=10000.0)
+        self.waitForAttach(previousAttaches=attaches)
+        self.dataSource.push([], EOS=True, streamID=streamId, sampleRate=10000.0)
+        
+        links = []
+        for sock in (self.sock, sock2):
+            frames = []
+            try:
+                while True:
+                    data, addr = sock.recvfrom(65536)
+                    frames.append(data)
+            except socket.timeout:
+                pass
+            links.append(frames)
+        sock2.close()
+        
+        # Both links carry part of the stream, and frame counts put it back together
+        self.assertTrue(len(links[0]) > 0)
+        self.assertTrue(len(links[1]) > 0)
+        frames = links[0] + links[1]
+        counts = [struct.unpack('!I', frame[4:8])[0] >> 20 for frame in frames]
+        self.assertEqual(sorted(counts), range(len(frames)))
+        HDRLEN=32
+        received = []
+        for count, frame in sorted(zip(counts, frames)):
+            if len(frame) < 200:
+                continue
+            m = frame[HDRLEN:].split('VEND')[0]
+            received.extend(struct.unpack('h'*int(len(m)/2), m))
+        self.assertEqual(received, dataIn)
+        
+        # Each link reports its own traffic
+        time.sleep(1.5)
+        status = self.comp.stripe_link_status
+        self.assertEqual(len(status), 2)
+        self.assertEqual([link.port for link in status], [24967, 24968])
+        self.assertEqual([link.packets for link in status], [len(links[0]), len(links[1])])
+        self.assertTrue(all(link.active for link in status))
+        self.closeSocket()
+
+    def testTxTimestamping(self):
+        """testTxTimestamping
+        """
+        # Configure network info
+        self.configureNetwork()
+        self.configureAdvanced(tx_timestamping=True)
+        
+        # Set up receiver
+        self.setupSocket()
+        self.sock.settimeout(1)
+        
+        # Start components
+        self.callStart()
+        
+        streamId = "testTxTimestamping"
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(range(20000), streamID=streamId, sampleRate=10000.0)
+        self.waitForAttach(previousAttaches=attaches)
+        
+        frames = 0
+        try:
+            while True:
+                self.sock.recvfrom(65536)
+                frames += 1
+        except socket.timeout:
+            pass
+        self.assertTrue(frames > 0)
+        
+        # Loopback gives software timestamps for every datagram
+        timing = self.comp.transmit_timing
+        self.assertTrue(timing.timestamps > 0)
+        self.assertTrue(timing.timestamps + timing.missed <= frames)
+        self.assertTrue(timing.latency_max >= timing.latency_p50)
+        self.assertTrue(timing.latency_p99 >= timing.latency_p50)
+        self.closeSocket()
+
+    def testVrlCrc(self):
+        """testVrlCrc
+        """
+        for precompute in (False, True):
+            # Configure network info
+            self.configureNetwork()
+            self.configureAdvanced(precompute_crc=precompute)
+            self.comp.VITA49Encapsulation.enable_vrl_frames = True
+            self.comp.VITA49Encapsulation.enable_crc = True
+            
+            # Set up receiver
+            self.setupSocket()
+            self.sock.settimeout(2)
+            
+            # Start components
+            self.callStart()
+            
+            streamId = "testVrlCrc%s" % precompute
+            attaches=self.attaches
+            self.connectVitaPorts()
+            self.dataSource.push(range(5000), streamID=streamId, sampleRate=10000.0)
+            self.waitForAttach(previousAttaches=attaches)
+            self.dataSource.push([], EOS=True, streamID=streamId, sampleRate=10000.0)
+            
+            # Every frame's trailer holds its CRC, frame count included
+            frames = []
+            try:
+                while True:
+                    data, addr = self.sock.recvfrom(65536)
+                    frames.append(data)
+            except socket.timeout:
+                pass
+            self.assertTrue(len(frames) > 1)
+            for count, frame in enumerate(frames):
+                self.assertEqual(frame[:4], 'VRLP')
+                self.assertEqual(struct.unpack('!I', frame[4:8])[0] >> 20, count & 0xFFF)
+                self.assertEqual(struct.unpack('!I', frame[-4:])[0], self.vrlCrc(frame))
+            self.closeSocket()
+            self.callStop()
+            self.disconnectVitaPorts()
+
+    def testFramePacking(self):
+        """testFramePacking
+        """
+        # Configure network info
+        self.configureNetwork()
+        self.configureAdvanced(max_payload_size=1000)
+        self.comp.VITA49Encapsulation.enable_vrl_frames = True
+        self.comp.VITA49Encapsulation.max_frame_size = 4000
+        
+        # Set up receiver
+        self.setupSocket()
+        self.sock.settimeout(2)
+        
+        # Start components
+        self.callStart()
+        
+        streamId = "testFramePacking"
+        dataIn = range(20000)
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(dataIn, streamID=streamId, sampleRate=10000.0)
+        self.waitForAttach(previousAttaches=attaches)
+        self.dataSource.push([], EOS=True, streamID=streamId, sampleRate=10000.0)
+        
+        frames = []
+        try:
+            while True:
+                data, addr = self.sock.recvfrom(65536)
+                frames.append(data)
+        except socket.timeout:
+            pass
+        
+        # Frames hold several packets, stay under the limit, and count frames
+        received = []
+        packets = 0
+        for count, frame in enumerate(frames):
+            self.assertTrue(len(frame) <= 4000)
+            self.assertEqual(frame[:4], 'VRLP')
+            self.assertEqual(frame[-4:], 'VEND')
+            header = struct.unpack('!I', frame[4:8])[0]
+            self.assertEqual(header >> 20, count & 0xFFF)
+            self.assertEqual((header & 0xFFFFF) * 4, len(frame))
+            offset = 8
+            while offset < len(frame) - 4:
+                words = struct.unpack('!I', frame[offset:offset+4])[0] & 0xFFFF
+                packets += 1
+                packet = frame[offset:offset + words * 4]
+                if ord(packet[0]) >> 4 == 1:
+                    # Data: stream id, class id and timestamps, then the samples and a trailer
+                    samples = packet[28:len(packet) - (4 if ord(packet[0]) & 0x4 else 0)]
+                    received.extend(struct.unpack('h' * (len(samples) / 2), samples))
+                offset += words * 4
+        self.assertTrue(packets > len(frames))
+        self.assertEqual(received, dataIn)
+        self.closeSocket()
+
+    def testSharedMemoryRing(self):
+        """testSharedMemoryRing
+        """
+        # Configure network info
+        self.configureNetwork()
+        self.configureAdvanced()
+        self.comp.advanced_configuration.shared_memory_name = '/testSinkVITA49'
+        
+        # Start components
+        self.callStart()
+        
+        streamId = "testSharedMemoryRing"
+        dataIn = range(1000)
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(dataIn, streamID=streamId, sampleRate=10000.0)
+        self.waitForAttach(previousAttaches=attaches)
+
+        time.sleep(0.1) # This is necessary b/c it can take the port some time to update
+        attachId = self.inVitaPort._get_attachmentIds()[0]
+        recvStreamDef = self.inVitaPort.getStreamDefinition(attachId)
+        self.validateStreamDef(recvStreamDef, streamId, ip='shm:/testSinkVITA49')
+        
+        self.dataSource.push([], EOS=True, streamID=streamId, sampleRate=10000.0)
+        time.sleep(1)
+        
+        # Walk the ring: header, then slots of a sequence number plus one, a length and the frame
+        f = open('/dev/shm/testSinkVITA49', 'rb')
+        ring = f.read()
+        f.close()
+        magic, version, slotSize, slotCount, slotStride, headerSize = struct.unpack('<6I', ring[:24])
+        self.assertEqual(magic, 0x4D485356)
+        writeSeq = struct.unpack('<Q', ring[64:72])[0]
+        self.assertTrue(0 < writeSeq <= slotCount)
+        received = []
+        for seq in range(writeSeq):
+            offset = headerSize + seq * slotStride
+            slotSeq, length = struct.unpack('<QI', ring[offset:offset+12])
+            self.assertEqual(slotSeq, seq + 1)
+            packet = ring[offset+16:offset+16+length]
+            if ord(packet[0]) >> 4 == 1:
+                samples = packet[28:len(packet) - (4 if ord(packet[0]) & 0x4 else 0)]
+                received.extend(struct.unpack('h' * (len(samples) / 2), samples))
+        self.assertEqual(received, dataIn)
+        
+        # No readers, so nothing lags or drops
+        self.assertEqual(self.comp.connection_status.shared_memory_lag, 0)
+        self.assertEqual(self.comp.connection_status.shared_memory_drops, 0)
+
+    def testContextTimestamp(self):
+        """testContextTimestamp
+        """
+        # Configure network info
+        self.configureNetwork()
+        self.configureAdvanced(time_between_context_packets=1)
+        
+        # Set up receiver
+        self.setupSocket()
+        self.sock.settimeout(2)
+        
+        # Start components
+        self.callStart()
+        
+        # The keyword change must produce a context packet without waiting for the heartbeat
+        streamId = "testContextTimestamp"
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(range(2000), streamID=streamId, sampleRate=10000.0, SRIKeywords=self.createKeywords())
+        self.waitForAttach(previousAttaches=attaches)
+        self.dataSource.push(range(2000), streamID=streamId, sampleRate=10000.0, SRIKeywords=self.createKeywords(colRF=100000000))
+        
+        packets = []
+        try:
+            while True:
+                data, addr = self.sock.recvfrom(65536)
+                packets.extend(self.vrtTimestamps(data))
+        except socket.timeout:
+            pass
+        
+        # Every context packet carries the timestamp of a data packet that follows it;
+        # context jumps ahead of data already queued, so it need not be the next one
+        contexts = [i for i, p in enumerate(packets) if p[0] == 4]
+        self.assertTrue(len(contexts) >= 2)
+        for i in contexts:
+            following = [p[1:] for p in packets[i+1:] if p[0] == 1]
+            if following:
+                self.assertTrue(packets[i][1:] in following)
+        self.closeSocket()
+
+    def testContextChangeIndicator(self):
+        """testContextChangeIndicator
+        """
+        # Configure network info
+        self.configureNetwork()
+        self.configureAdvanced(time_between_context_packets=1)
+        
+        # Set up receiver
+        self.setupSocket()
+        self.sock.settimeout(2)
+        
+        # Start components
+        self.callStart()
+        
+        # The first SRI and the keyword change are changes; the push after the wait gets a heartbeat
+        streamId = "testContextChangeIndicator"
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(range(2000), streamID=streamId, sampleRate=10000.0, SRIKeywords=self.createKeywords())
+        self.waitForAttach(previousAttaches=attaches)
+        time.sleep(1.5)
+        self.dataSource.push(range(2000), streamID=streamId, sampleRate=10000.0, SRIKeywords=self.createKeywords())
+        time.sleep(0.5)
+        self.dataSource.push(range(2000), streamID=streamId, sampleRate=10000.0, SRIKeywords=self.createKeywords(colRF=100000000))
+        
+        changes = []
+        try:
+            while True:
+                data, addr = self.sock.recvfrom(65536)
+                offset = 8
+                while offset + 4 <= len(data) and data[offset:offset+4] != 'VEND':
+                    header = struct.unpack('!I', data[offset:offset+4])[0]
+                    if header >> 28 == 4:
+                        # The CIF follows the stream ID, class ID and timestamps
+                        field = offset + 8 + (8 if header & (1 << 27) else 0)
+                        field += (4 if (header >> 22) & 0x3 else 0) + (8 if (header >> 20) & 0x3 else 0)
+                        cif = struct.unpack('!I', data[field:field+4])[0]
+                        changes.append(bool(cif & (1 << 31)))
+                    offset += (header & 0xFFFF) * 4
+        except socket.timeout:
+            pass
+        
+        self.assertTrue(len(changes) >= 3)
+        self.assertTrue(changes[0])
+        self.assertTrue(False in changes[1:-1])
+        self.assertTrue(changes[-1])
+        self.closeSocket()
+
+    def testContextPriority(self):
+        """testContextPriority
+        """
+        # Configure network info; throttling keeps data queued behind the transmitter
+        self.configureNetwork()
+        self.configureAdvanced(time_between_context_packets=0, number_of_packets_in_burst=5,
+                               throttle_time_between_packet_bursts=100)
+        
+        # Set up receiver
+        self.setupSocket()
+        self.sock.settimeout(2)
+        
+        # Start components
+        self.callStart()
+        
+        streamId = "testContextPriority"
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(range(30000), streamID=streamId, sampleRate=10000.0, SRIKeywords=self.createKeywords())
+        self.waitForAttach(previousAttaches=attaches)
+        self.dataSource.push(range(2000), streamID=streamId, sampleRate=10000.0, SRIKeywords=self.createKeywords(colRF=100000000))
+        
+        packets = []
+        try:
+            while True:
+                data, addr = self.sock.recvfrom(65536)
+                packets.extend(self.vrtTimestamps(data))
+        except socket.timeout:
+            pass
+        
+        # The retune's context is sent before the data queued ahead of it,
+        # and still before the first data packet it describes
+        contexts = [i for i, p in enumerate(packets) if p[0] == 4]
+        self.assertTrue(len(contexts) >= 2)
+        retune = contexts[-1]
+        self.assertTrue(any(p[0] == 1 and p[1:] < packets[retune][1:] for p in packets[retune+1:]))
+        described = [i for i, p in enumerate(packets) if p[0] == 1 and p[1:] == packets[retune][1:]]
+        self.assertEqual(len(described), 1)
+        self.assertTrue(described[0] > retune)
+        self.closeSocket()
 
     def testDataComplex(self):
         """testDataComplex
@@ -572,5 +1532,65 @@ class ResourceTests(ossie.utils.testing.ScaComponentTestCase):
         
         # TODO - more validation
 
+    def testAutoPayloadSize(self):
+        """testAutoPayloadSize
+        """
+        # Configure network info
+        self.configureNetwork()
+        
+        # Configure advanced properties
+        self.configureAdvanced(auto_payload_size=True)
+        
+        # Start components
+        self.callStart()
+    
+        # Push SRI and data
+        streamId = "testAutoPayloadSize"
+        data = range(10000)
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(data, streamID=streamId, sampleRate=10000.0, complexData=True)
+        self.waitForAttach(previousAttaches=attaches)
+
+        time.sleep(0.1) # This is necessary b/c it can take the port some time to update
+        
+        # Loopback MTU is far larger than the 1452 byte default, but a packet must still fit one datagram
+        mtu = self.comp.connection_status.mtu
+        payloadSize = self.comp.connection_status.payload_size
+        self.assertTrue(mtu > 1500)
+        self.assertTrue(payloadSize > 1452)
+        self.assertTrue(payloadSize <= min(mtu, 65535) - 20 - 8)
+        self.assertEqual(payloadSize % 4, 0) # whole complex short samples
+        self.assertTrue(self.comp.connection_status.packet_size <= min(mtu, 65535) - 20)
+
+    def testSendDataUdpGso(self):
+        """testSendDataUdpGso
+        """
+        # Configure network info
+        self.configureNetwork()
+        
+        # Small payloads so several equal-size datagrams go out in one segmented send
+        self.configureAdvanced(max_payload_size=200, udp_gso=True)
+        
+        # Set up receiver
+        self.setupSocket()
+        
+        # Start components
+        self.callStart()
+        
+        streamId = "testSendDataUdpGso"
+        dataIn = range(1000)
+        attaches=self.attaches
+        self.connectVitaPorts()
+        self.dataSource.push(dataIn, streamID=streamId, sampleRate=10000.0)
+        self.waitForAttach(previousAttaches=attaches)
+        
+        # End the stream so the short remainder packet is pushed
+        self.dataSource.push([], EOS=True, streamID=streamId, sampleRate=10000.0)
+        
+        # Each datagram must still arrive as its own VRL frame, in order
+        self.validateSocketData(dataIn)
+        self.closeSocket()
+
 if __name__ == "__main__":
     ossie.utils.testing.main("../SinkVITA49.spd.xml") # By default tests all implementations
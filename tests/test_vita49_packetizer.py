@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK.
+#
+# REDHAWK is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# REDHAWK is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import unittest
+import os, sys, socket, struct, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+try:
+    import numpy
+    import vita49_packetizer
+except ImportError:
+    numpy = None
+import vita49_replay
+
+# Tests for the standalone packetizer; these need NumPy but not a REDHAWK install
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class PacketizerTests(unittest.TestCase):
+
+    ###################
+    #     HELPERS
+    ###################
+
+    def packetizer(self, **kwargs):
+        settings = dict(encapsulation=vita49_packetizer.VITA49Encapsulation,
+                        data_packet=vita49_packetizer.VITA49IFDataPacket,
+                        context_packet=vita49_packetizer.VITA49IFContextPacket,
+                        advanced=vita49_packetizer.AdvancedConfiguration)
+        args = {}
+        for name, cls in settings.items():
+            if name in kwargs:
+                args[name] = cls(**kwargs.pop(name))
+        args.update(kwargs)
+        args.setdefault('sample_rate', 1000.0)
+        args.setdefault('start_time', 100.0)
+        return vita49_packetizer.Packetizer('test_stream', **args)
+
+    def vrtPackets(self, frame):
+        """ Split a VRL frame into its VRT packets
+        """
+        packets = []
+        offset = 8
+        while offset < len(frame) - 4:
+            words = struct.unpack('!I', frame[offset:offset+4])[0] & 0xFFFF
+            packets.append(frame[offset:offset + words * 4])
+            offset += words * 4
+        return packets
+
+    def vrlCrc(self, frame):
+        """ VITA 49.1 frame CRC: every word but the trailer clocked in LSB first,
+            with the register bit-reversed at the end.
+        """
+        crc = 0
+        for i in range(0, len(frame) - 4, 4):
+            val = struct.unpack('!I', frame[i:i+4])[0]
+            for bit in range(32):
+                inbit = ((val >> bit) ^ (crc >> 31)) & 0x1
+                crc = ((crc << 1) & 0xFFFFFFFF) ^ (0x04C11DB7 if inbit else 0)
+        return int('{0:032b}'.format(crc)[::-1], 2)
+
+    ###################
+    #   BEGIN TESTS
+    ###################
+
+    def testDataPacketLayout(self):
+        """testDataPacketLayout
+        """
+        packetizer = self.packetizer(advanced=dict(max_payload_size=40))
+        samples = numpy.arange(50, dtype=numpy.int16)
+        frames = packetizer.packetize(samples)
+        data = frames.tobytes()
+        self.assertEqual(len(frames.records), 3)
+        context, = self.vrtPackets(data[:frames.records[0].length])
+        first, = self.vrtPackets(data[frames.records[1].offset:frames.records[2].offset])
+        self.assertEqual(struct.unpack('!I', context[:4])[0] >> 28, 4)
+
+        header, sid, oui, code, seconds, picoseconds = struct.unpack('!IIIIIQ', first[:28])
+        self.assertEqual(header >> 28, 1)
+        self.assertTrue(header & (1 << 27))
+        self.assertTrue(header & (1 << 26))
+        self.assertEqual((header >> 22) & 0x3, 1)
+        self.assertEqual((header >> 20) & 0x3, 2)
+        self.assertEqual((header & 0xFFFF) * 4, len(first))
+        self.assertEqual(sid, vita49_packetizer.stream_hash('test_stream'))
+        self.assertEqual(oui, 0xFFFFFA)
+        self.assertEqual((seconds, picoseconds), (100, 0))
+        self.assertEqual(first[28:68], samples[:20].tobytes())
+        self.assertEqual(struct.unpack('!I', first[68:])[0], 0x80 | 1)
+
+        # The rest waits for a full packet; the second packet carries on the clock and counts
+        second, = self.vrtPackets(data[frames.records[2].offset:])
+        header, _, _, _, seconds, picoseconds = struct.unpack('!IIIIIQ', second[:28])
+        self.assertEqual((header >> 16) & 0xF, 1)
+        self.assertEqual((seconds, picoseconds), (100, 20 * 10 ** 9))
+        self.assertEqual(frames.samples, 40)
+
+        frames = packetizer.packetize(samples[:0], final=True)
+        last, = self.vrtPackets(frames.tobytes())
+        self.assertEqual(len(last), 28 + 20 + 4)
+        self.assertEqual(last[28:48], samples[40:].tobytes())
+        self.assertEqual(struct.unpack('!IIIIIQ', last[:28])[4:], (100, 40 * 10 ** 9))
+
+    def testOptionalFields(self):
+        """testOptionalFields
+        """
+        packetizer = self.packetizer(
+            encapsulation=dict(enable_vrl_frames=False),
+            data_packet=dict(enable_stream_identifier=False, enable_class_identifier=False,
+                             embed_time_stamp=False, enable_trailer=False),
+            context_packet=dict(enable=False),
+            advanced=dict(max_payload_size=16, endian_representation=vita49_packetizer.ENDIAN_BIG))
+        frames = packetizer.packetize(numpy.arange(8, dtype=numpy.float32))
+        data = frames.tobytes()
+        self.assertEqual([r.length for r in frames.records], [20, 20])
+        self.assertEqual(struct.unpack('!I', data[:4])[0], 5)
+        self.assertEqual(data[4:20], numpy.arange(4, dtype='>f4').tobytes())
+
+    def testComplexPayloadFormat(self):
+        """testComplexPayloadFormat
+        """
+        packetizer = self.packetizer(advanced=dict(max_payload_size=1452))
+        packetizer.packetize(numpy.zeros(10, numpy.complex64))
+        self.assertEqual(packetizer.samples_per_packet, 181)
+        bits = packetizer.format_bits >> 32
+        self.assertEqual((bits >> 29) & 0x3, 1)
+        self.assertEqual((bits >> 24) & 0x1F, 0x0E)
+        self.assertEqual(bits & 0x3F, 31)
+
+    def testContextHeartbeat(self):
+        """testContextHeartbeat
+        """
+        packetizer = self.packetizer(advanced=dict(max_payload_size=400, time_between_context_packets=1),
+                                     keywords={'COL_RF': 1e9, 'DATA_VALID': True})
+        # 100 samples per packet at 1 kHz: ten packets a second
+        frames = packetizer.packetize(numpy.zeros(2500, numpy.float32))
+        data = frames.tobytes()
+        contexts = [r for r in frames.records if r.timestamp is None]
+        self.assertEqual(len(contexts), 3)
+        self.assertEqual([frames.records.index(r) for r in contexts], [0, 11, 22])
+        self.assertEqual(packetizer.context_count, 3)
+
+        context, = self.vrtPackets(data[:contexts[0].length])
+        cif = struct.unpack('!I', context[28:32])[0]
+        self.assertTrue(cif & vita49_packetizer.CIF_RF_FREQUENCY)
+        rf = struct.unpack('!q', context[52:60])[0]
+        self.assertEqual(rf, int(1e9 * (1 << 20)))
+        rate = struct.unpack('!q', context[88:96])[0]
+        self.assertEqual(rate, int(1000 * (1 << 20)))
+
+        packetizer.set_keywords({'COL_RF': 2e9})
+        frames = packetizer.packetize(numpy.zeros(100, numpy.float32))
+        self.assertEqual(frames.records[0].timestamp, None)
+
+    def testVrlCrc(self):
+        """testVrlCrc
+        """
+        packetizer = self.packetizer(encapsulation=dict(enable_crc=True), advanced=dict(max_payload_size=64))
+        frames = packetizer.packetize(numpy.arange(100, dtype=numpy.uint8), final=True)
+        data = frames.tobytes()
+        for count, record in enumerate(frames.records):
+            frame = data[record.offset:record.offset + record.length]
+            faw, word = struct.unpack('!II', frame[:8])
+            self.assertEqual(faw, 0x56524C50)
+            self.assertEqual(word >> 20, count)
+            self.assertEqual((word & 0xFFFFF) * 4, len(frame))
+            self.assertEqual(struct.unpack('!I', frame[-4:])[0], self.vrlCrc(frame))
+
+    def testPackedFrames(self):
+        """testPackedFrames
+        """
+        packetizer = self.packetizer(encapsulation=dict(max_frame_size=400),
+                                     advanced=dict(max_payload_size=80))
+        frames = packetizer.packetize(numpy.zeros(400, numpy.int16))
+        data = frames.tobytes()
+        packets = 0
+        for record in frames.records:
+            frame = data[record.offset:record.offset + record.length]
+            self.assertTrue(len(frame) <= 400)
+            self.assertEqual(frame[-4:], b'VEND')
+            packets += len(self.vrtPackets(frame))
+        self.assertEqual(packets, 11)
+        self.assertTrue(len(frames.records) < packets)
+
+    def testReplayReadsOutput(self):
+        """testReplayReadsOutput
+        """
+        packetizer = self.packetizer(sample_rate=1e6, advanced=dict(max_payload_size=1000))
+        frames = packetizer.packetize(numpy.zeros(10000, numpy.int16), final=True)
+        records = vita49_replay.index_stream(frames.tobytes())
+        self.assertEqual([(r.offset, r.length) for r in records],
+                         [(r.offset, r.length) for r in frames.records])
+        self.assertAlmostEqual(records[1].timestamp, 100.0)
+        self.assertAlmostEqual(records[-1].timestamp, 100.0 + 9500e-6)
+
+    def testSendUdp(self):
+        """testSendUdp
+        """
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(5)
+        self.addCleanup(receiver.close)
+        fd, path = tempfile.mkstemp(suffix='.s16')
+        os.write(fd, numpy.arange(2000, dtype=numpy.int16).tobytes())
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        argv = [path, '--format', 'int16', '--sample-rate', '1e6', '--speed', '0', '--max-payload-size', '1000',
+                '--ip', '127.0.0.1', '--port', str(receiver.getsockname()[1])]
+        with open(os.devnull, 'w') as out:
+            stdout, sys.stdout = sys.stdout, out
+            try:
+                self.assertEqual(vita49_packetizer.main(argv), 0)
+            finally:
+                sys.stdout = stdout
+        datagrams = [receiver.recv(65536) for _ in range(5)]
+        self.assertEqual(struct.unpack('!I', datagrams[0][8:12])[0] >> 28, 4)
+        self.assertEqual(sum(len(self.vrtPackets(d)) for d in datagrams[1:]), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK.
+#
+# REDHAWK is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# REDHAWK is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import unittest
+import os, sys, socket, struct, tempfile, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+import vita49_replay
+
+# Tests for the standalone capture replay tool; these do not need a REDHAWK install
+class ReplayTests(unittest.TestCase):
+
+    ###################
+    #     HELPERS
+    ###################
+
+    def dataPacket(self, count, seconds, picoseconds, payload=b'\x00' * 40):
+        """ Build an IF data packet laid out the way SinkVITA49 does: stream id,
+            class id, UTC integer seconds and real-time fractional seconds.
+        """
+        words = 1 + 1 + 2 + 1 + 2 + len(payload) // 4
+        header = (0x1 << 28) | (1 << 27) | (1 << 22) | (2 << 20) | ((count & 0xF) << 16) | words
+        return struct.pack('!IIQIQ', header, 0x1234, 0, seconds, picoseconds) + payload
+
+    def contextPacket(self, seconds):
+        header = (0x4 << 28) | (1 << 22) | (2 << 20) | 5
+        return struct.pack('!IIIQ', header, 0x1234, seconds, 0)
+
+    def vrlFrame(self, count, *packets):
+        body = b''.join(packets)
+        words = 2 + len(body) // 4 + 1
+        return struct.pack('!II', 0x56524C50, ((count & 0xFFF) << 20) | words) + body + b'VEND'
+
+    def writeCapture(self, data):
+        fd, path = tempfile.mkstemp(suffix='.vrl')
+        os.write(fd, data)
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def pcapRecord(self, payload, port=12344):
+        udp = struct.pack('!HHHH', 5000, port, 8 + len(payload), 0) + payload
+        ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(udp), 0, 0, 32, 17, 0,
+                         socket.inet_aton('127.0.0.1'), socket.inet_aton('127.0.0.1')) + udp
+        eth = b'\x00' * 12 + struct.pack('!H', 0x0800) + ip
+        return struct.pack('<IIII', 0, 0, len(eth), len(eth)) + eth
+
+    ###################
+    #   BEGIN TESTS
+    ###################
+
+    def testIndexVrlStream(self):
+        """testIndexVrlStream
+        """
+        frames = [self.vrlFrame(i, self.dataPacket(i, 100, i * 10 ** 11)) for i in range(5)]
+        frames.insert(0, self.vrlFrame(99, self.contextPacket(100)))
+        capture = vita49_replay.Capture(self.writeCapture(b''.join(frames)))
+        try:
+            self.assertEqual(len(capture.records), 6)
+            self.assertEqual(capture.records[0].timestamp, None)
+            self.assertAlmostEqual(capture.records[3].timestamp, 100.2)
+            self.assertEqual(sum(r.length for r in capture.records), sum(len(f) for f in frames))
+        finally:
+            capture.close()
+
+    def testIndexBareVrt(self):
+        """testIndexBareVrt
+        """
+        packets = [self.dataPacket(i, 7, i * 5 * 10 ** 11) for i in range(3)]
+        records = vita49_replay.index_stream(b''.join(packets))
+        self.assertEqual([r.length for r in records], [len(p) for p in packets])
+        self.assertAlmostEqual(records[2].timestamp, 8.0)
+
+    def testIndexPcap(self):
+        """testIndexPcap
+        """
+        frames = [self.vrlFrame(i, self.dataPacket(i, 100, i * 10 ** 11)) for i in range(3)]
+        header = struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1)
+        data = header + b''.join(self.pcapRecord(f) for f in frames)
+        records = vita49_replay.index_pcap(data)
+        self.assertEqual(len(records), 3)
+        for record, frame in zip(records, frames):
+            self.assertEqual(data[record.offset:record.offset + record.length], frame)
+
+    def testSchedule(self):
+        """testSchedule
+        """
+        records = [vita49_replay.Record(0, 0, t) for t in (10.0, None, 10.5, 11.0, 500.0, 500.25, 3.0)]
+        self.assertEqual(vita49_replay.schedule(records, 1.0), [0.0, 0.0, 0.5, 1.0, 1.0, 1.25, 1.25])
+        self.assertEqual(vita49_replay.schedule(records, 2.0)[3], 0.5)
+        self.assertEqual(vita49_replay.schedule(records, 0.0), [0.0] * len(records))
+
+    def testReplayUdp(self):
+        """testReplayUdp
+        """
+        frames = [self.vrlFrame(i, self.dataPacket(i, 100, i * 10 ** 9)) for i in range(50)]
+        capture = vita49_replay.Capture(self.writeCapture(b''.join(frames)))
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(2)
+        port = receiver.getsockname()[1]
+        for use_sendmmsg in (True, False):
+            sender = vita49_replay.UdpSender(capture, '127.0.0.1', port, batch=8, use_sendmmsg=use_sendmmsg)
+            try:
+                out = open(os.devnull, 'w')
+                stats = vita49_replay.replay(capture, sender, speed=1.0, batch=8, out=out)
+                out.close()
+            finally:
+                sender.close()
+            received = [receiver.recv(65536) for _ in frames]
+            self.assertEqual(received, frames)
+            self.assertEqual(stats.packets, len(frames))
+        receiver.close()
+        capture.close()
+
+    def testReplayLoops(self):
+        """testReplayLoops
+        """
+        class Capture(object):
+            records = [vita49_replay.Record(0, 0, t) for t in (10.0, 10.05, 10.1)]
+
+        class Sender(object):
+            syscalls = 0
+            def __init__(self):
+                self.times = []
+            def send(self, records):
+                self.times.extend([vita49_replay.monotonic()] * len(records))
+                return len(records)
+
+        sender = Sender()
+        out = open(os.devnull, 'w')
+        vita49_replay.replay(Capture(), sender, speed=1.0, batch=1, window=0, loops=2, out=out)
+        out.close()
+        # The second loop starts one record gap after the first loop's last record
+        self.assertEqual(len(sender.times), 6)
+        self.assertTrue(sender.times[3] - sender.times[2] >= 0.045)
+        self.assertTrue(sender.times[5] - sender.times[0] >= 0.245)
+
+if __name__ == "__main__":
+    unittest.main()
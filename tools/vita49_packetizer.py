@@ -0,0 +1,855 @@
+#!/usr/bin/env python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK.
+#
+# REDHAWK is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# REDHAWK is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+"""Packetize NumPy arrays or raw sample files the way rh.SinkVITA49 does.
+
+Samples become VRT IF data packets, preceded by IF context packets, and are
+optionally wrapped in VRL frames.  Stream ID, class ID, timestamps, packet
+counts, trailer, payload format, endianness, and frame and payload sizes all
+follow the same layout that SinkVITA49 produces.  The settings classes carry
+the field names and defaults of the component's network_settings,
+VITA49Encapsulation, VITA49IFDataPacket, VITA49IFContextPacket and
+advanced_configuration properties.
+
+Headers for a whole batch of packets are filled in at once through a NumPy
+structured array; no per-packet Python code runs for data packets.  The
+result can be streamed over UDP (unicast or multicast, with sendmmsg(2)) or
+to a TCP client at the sample rate or a multiple of it, or written to a file
+that vita49_replay.py can replay.
+
+Examples:
+    vita49_packetizer.py samples.cf --format complex64 --sample-rate 1e6 --ip 127.0.0.1 --port 12344
+    vita49_packetizer.py samples.s16 --format int16 --sample-rate 2.5e6 --speed 0 --crc --output capture.vrl
+    vita49_packetizer.py samples.s8 --format int8 --sample-rate 1e5 --protocol tcp --ip 0.0.0.0
+
+As a library:
+    packetizer = Packetizer('my_stream', sample_rate=1e6)
+    frames = packetizer.packetize(numpy.zeros(10000, numpy.complex64), final=True)
+    frames.tobytes()      # back-to-back VRL frames, one per frames.records entry
+"""
+
+from __future__ import print_function, division
+
+import argparse
+import os
+import sys
+import time
+
+import numpy
+
+import vita49_replay
+from vita49_replay import Record, Statistics, TcpSender, UdpSender, monotonic
+
+VRL_FAW = vita49_replay.VRL_FAW
+VRL_VEND = 0x56454E44           # 'VEND', the frame trailer without a CRC
+VRL_HEADER_SIZE = vita49_replay.VRL_HEADER_SIZE
+VRL_TRAILER_SIZE = 4
+
+MAX_PAYLOAD_SIZE = 65503         # largest vita49 payload SinkVITA49 accepts
+
+DEFAULT_BATCH = vita49_replay.DEFAULT_BATCH
+
+# advanced_configuration::endian_representation
+ENDIAN_NATIVE = 0
+ENDIAN_LITTLE = 1
+ENDIAN_BIG = 2
+
+# Context indicator field bits, in the order the fields follow them
+CIF_REFERENCE_POINT = 1 << 30
+CIF_BANDWIDTH = 1 << 29
+CIF_IF_FREQUENCY = 1 << 28
+CIF_RF_FREQUENCY = 1 << 27
+CIF_RF_OFFSET = 1 << 26
+CIF_IF_BAND_OFFSET = 1 << 25
+CIF_REFERENCE_LEVEL = 1 << 24
+CIF_GAIN = 1 << 23
+CIF_OVER_RANGE_COUNT = 1 << 22
+CIF_SAMPLE_RATE = 1 << 21
+CIF_TIMESTAMP_ADJUSTMENT = 1 << 20
+CIF_TIMESTAMP_CALIBRATION = 1 << 19
+CIF_TEMPERATURE = 1 << 18
+CIF_DEVICE_ID = 1 << 17
+CIF_STATE_EVENT = 1 << 16
+CIF_PAYLOAD_FORMAT = 1 << 15
+
+# SRI keywords that set a state/event indicator, with the indicator's bit
+STATE_EVENT_KEYWORDS = {
+    'CALIBRATED_TIME_STAMP': 19,
+    'DATA_VALID': 18,
+    'REFERENCE_LOCKED': 17,
+    'AUTO_GAIN_CONTROL': 16,
+    'SIGNAL_DETECTION': 15,
+    'DATA_INVERSION': 14,
+    'OVER_RANGE': 13,
+    'SAMPLE_LOSS': 12,
+}
+
+# Payload format data item formats, by NumPy kind
+_ITEM_FORMATS = {
+    ('i', 1): 0x00, ('i', 2): 0x00,
+    ('u', 1): 0x10, ('u', 2): 0x10,
+    ('f', 4): 0x0E, ('f', 8): 0x0F,
+}
+
+
+class PacketizerError(Exception):
+    pass
+
+
+###############################################################################
+# Settings
+###############################################################################
+
+class _Settings(object):
+    """Attribute bag with the fields and defaults of one component property."""
+    _defaults = ()
+
+    def __init__(self, **kwargs):
+        for name, value in self._defaults:
+            setattr(self, name, kwargs.pop(name, value))
+        if kwargs:
+            raise TypeError('%s has no field %s' % (type(self).__name__, ', '.join(sorted(kwargs))))
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__,
+                           ', '.join('%s=%r' % (name, getattr(self, name)) for name, _ in self._defaults))
+
+
+class NetworkSettings(_Settings):
+    _defaults = (('enable', False), ('ip_address', '127.0.0.1'), ('port', 12344), ('vlan', 0),
+                 ('use_udp_protocol', True), ('interface', 'eth0'))
+
+
+class VITA49Encapsulation(_Settings):
+    _defaults = (('enable_crc', False), ('enable_vrl_frames', True), ('max_frame_size', 0))
+
+
+class VITA49IFDataPacket(_Settings):
+    _defaults = (('enable', True), ('enable_stream_identifier', True), ('enable_class_identifier', True),
+                 ('embed_time_stamp', True), ('enable_trailer', True))
+
+
+class VITA49IFContextPacket(_Settings):
+    # VRT context packets have no trailer, so use_trailer has nothing to
+    # control; it is kept so settings copied from the component still apply
+    _defaults = (('enable', True), ('enable_stream_identifier', True), ('stream_identifier_offset', 0),
+                 ('enable_class_identifier', True), ('class_identifier', 'DEFAULT'),
+                 ('embed_time_stamp', True), ('enable_device_identifier', True),
+                 ('device_identifier', 'FF-FF-FA:1301'), ('use_trailer', True))
+
+
+class AdvancedConfiguration(_Settings):
+    """The advanced_configuration fields that shape the packets.
+
+    time_between_context_packets is measured on the stream's sample clock
+    here rather than the wall clock, so file packetizing is reproducible.
+    """
+    _defaults = (('max_payload_size', 1452), ('endian_representation', ENDIAN_NATIVE),
+                 ('time_between_context_packets', 1), ('transmit_batch_size', DEFAULT_BATCH))
+
+
+###############################################################################
+# Field encoding
+###############################################################################
+
+def stream_hash(stream_id):
+    """The stream identifier SinkVITA49 derives from a BulkIO stream ID.
+
+    This is boost::hash<std::string> (the hash_combine form used before Boost
+    1.81) truncated to 32 bits.
+    """
+    seed = 0
+    for c in bytearray(stream_id.encode('utf-8')):
+        if c > 127:
+            c -= 256
+        seed ^= (c + 0x9E3779B9 + (seed << 6) + (seed >> 2)) & 0xFFFFFFFFFFFFFFFF
+    return seed & 0xFFFFFFFF
+
+
+def parse_class_id(text):
+    """Parse 'OO-OO-OO:IIII.PPPP' into the two class identifier words."""
+    try:
+        oui, codes = text.split(':')
+        icc, pcc = codes.split('.')
+        return int(oui.replace('-', ''), 16), (int(icc, 16) << 16) | int(pcc, 16)
+    except ValueError:
+        raise PacketizerError('class identifier %r is not OO-OO-OO:IIII.PPPP' % text)
+
+
+def parse_device_id(text):
+    """Parse 'OO-OO-OO:DDDD' into the two device identifier words."""
+    try:
+        oui, code = text.split(':')
+        return int(oui.replace('-', ''), 16), int(code, 16)
+    except ValueError:
+        raise PacketizerError('device identifier %r is not OO-OO-OO:DDDD' % text)
+
+
+def payload_format(dtype, complex_samples):
+    """The 64-bit VRT data payload format for one sample element type."""
+    dtype = numpy.dtype(dtype)
+    try:
+        item_format = _ITEM_FORMATS[(dtype.kind, dtype.itemsize)]
+    except KeyError:
+        raise PacketizerError('SinkVITA49 does not send %s samples' % dtype)
+    bits = dtype.itemsize * 8
+    word = ((1 if complex_samples else 0) << 29) | (item_format << 24) | ((bits - 1) << 6) | (bits - 1)
+    return word << 32
+
+
+def standard_class_id(format_bits):
+    """Class ID words for data packets and DEFAULT context packets.
+
+    The OUI is FF-FF-FA, as for the VRT library's StandardDataPacket, and the
+    packet class code is the top half of the payload format word so that it
+    identifies the sample type.
+    """
+    return 0xFFFFFA, (format_bits >> 48) & 0xFFFF
+
+
+def _fixed(value, radix):
+    return int(round(value * (1 << radix)))
+
+
+def split_time(seconds):
+    """Split a POSIX time into (twsec, tfsec) like a BULKIO.PrecisionUTCTime."""
+    whole = numpy.floor(seconds)
+    return float(whole), float(seconds - whole)
+
+
+def timestamps(twsec, tfsec, offsets, xdelta):
+    """Integer seconds and picoseconds of the samples at offsets after T."""
+    fraction = tfsec + offsets * xdelta
+    whole = numpy.floor(fraction)
+    picoseconds = numpy.round((fraction - whole) * 1e12).astype(numpy.uint64)
+    carry = picoseconds >= 10 ** 12
+    picoseconds[carry] -= 10 ** 12
+    seconds = (twsec + whole + carry).astype(numpy.uint32)
+    return seconds, picoseconds
+
+
+###############################################################################
+# VRL frame CRC
+###############################################################################
+
+def _crc_tables():
+    table = numpy.zeros((4, 256), numpy.uint32)
+    for b in range(256):
+        c = b
+        for _ in range(8):
+            c = (c >> 1) ^ 0xEDB88320 if c & 1 else c >> 1
+        table[0, b] = c
+    for k in range(1, 4):
+        table[k] = (table[k - 1] >> 8) ^ table[0][table[k - 1] & 0xFF]
+    return table
+
+_CRC_TABLES = _crc_tables()
+
+
+def vrl_crc(words):
+    """VITA 49.1 frame CRCs of frames of equal length.
+
+    words holds one frame per row as 32-bit values, without the trailer word.
+    Each word is clocked in least significant bit first, which makes this the
+    reflected CRC-32 (no inversion) of every word in little-endian order; the
+    rows are advanced together, one word per step.
+    """
+    t0, t1, t2, t3 = _CRC_TABLES
+    crc = numpy.zeros(words.shape[0], numpy.uint32)
+    for column in range(words.shape[1]):
+        crc ^= words[:, column]
+        crc = t3[crc & 0xFF] ^ t2[(crc >> 8) & 0xFF] ^ t1[(crc >> 16) & 0xFF] ^ t0[crc >> 24]
+    return crc
+
+
+###############################################################################
+# Packetizer
+###############################################################################
+
+class Frames(object):
+    """Packetizer output: bytes back to back plus one record per datagram.
+
+    With VRL framing on, each record is one VRL frame; otherwise each record is
+    one bare VRT packet.  Records carry the time of their first sample, or None
+    for a record holding only context.
+    """
+
+    def __init__(self, data, records, samples):
+        self.data = data
+        self.records = records
+        self.samples = samples
+
+    @property
+    def nbytes(self):
+        return self.records[-1].offset + self.records[-1].length if self.records else 0
+
+    def tobytes(self):
+        return self.data[:self.nbytes].tobytes()
+
+
+class Packetizer(object):
+    """Turns a stream of samples into SinkVITA49's packets.
+
+    A packetizer holds the stream state that the component keeps between
+    pushes: packet, context and frame counters, the sample clock, the context
+    heartbeat and any samples short of a full packet.
+    """
+
+    def __init__(self, stream_id='vita49_packetizer', sample_rate=1.0, start_time=None, complex_samples=None,
+                 keywords=None, encapsulation=None, data_packet=None, context_packet=None, advanced=None):
+        self.stream_id = stream_id
+        self.xdelta = 1.0 / sample_rate
+        if start_time is None:
+            start_time = time.time()
+        self.twsec, self.tfsec = split_time(start_time)
+        self.complex_samples = complex_samples
+        self.keywords = dict(keywords or {})
+        self.encapsulation = encapsulation or VITA49Encapsulation()
+        self.data_packet = data_packet or VITA49IFDataPacket()
+        self.context_packet = context_packet or VITA49IFContextPacket()
+        self.advanced = advanced or AdvancedConfiguration()
+        self.stream_hash = stream_hash(stream_id)
+
+        self.item_dtype = None
+        self.packet_count = 0
+        self.context_count = 0
+        self.frame_count = 0
+        self.sample_offset = 0
+        self.context_pending = True
+        self.next_context = None
+        self._leftover = None
+
+    # Stream setup ------------------------------------------------------------
+
+    def set_keywords(self, keywords):
+        """Replace the SRI keywords; the next packet is preceded by context."""
+        self.keywords = dict(keywords)
+        self.context_pending = True
+
+    def _setup(self, samples):
+        samples = numpy.asarray(samples)
+        if samples.dtype.kind == 'c':
+            complex_samples = True
+            item = numpy.dtype('f%d' % (samples.dtype.itemsize // 2))
+        else:
+            complex_samples = bool(self.complex_samples)
+            item = samples.dtype
+        if self.item_dtype is None:
+            self.complex_samples = complex_samples
+            self.format_bits = payload_format(item, complex_samples)
+            endian = self.advanced.endian_representation
+            self.item_dtype = item.newbyteorder({ENDIAN_LITTLE: '<', ENDIAN_BIG: '>'}.get(endian, '='))
+            self.sample_size = item.itemsize * (2 if complex_samples else 1)
+            payload = min(self.advanced.max_payload_size, MAX_PAYLOAD_SIZE)
+            self.samples_per_packet = payload // self.sample_size
+            if self.samples_per_packet < 1:
+                raise PacketizerError('max_payload_size %d is smaller than one sample' % payload)
+        elif item.kind != self.item_dtype.kind or item.itemsize != self.item_dtype.itemsize or \
+                complex_samples != self.complex_samples:
+            raise PacketizerError('sample type changed from %s to %s mid-stream' % (self.item_dtype, item))
+        # One element per real sample, two (I then Q) per complex sample
+        return numpy.ascontiguousarray(samples.view(item) if samples.dtype.kind == 'c' else samples).reshape(-1)
+
+    # Packet building -------------------------------------------------------------
+
+    def data_dtype(self, payload_bytes):
+        """Structured dtype of one data packet with payload_bytes of samples."""
+        settings = self.data_packet
+        fields = [('header', '>u4')]
+        if settings.enable_stream_identifier:
+            fields.append(('stream_id', '>u4'))
+        if settings.enable_class_identifier:
+            fields.append(('class_id', '>u4', (2,)))
+        if settings.embed_time_stamp:
+            fields += [('seconds', '>u4'), ('picoseconds', '>u8')]
+        fields.append(('payload', 'u1', ((payload_bytes + 3) & ~3,)))
+        if settings.enable_trailer:
+            fields.append(('trailer', '>u4'))
+        return numpy.dtype(fields)
+
+    def data_packets(self, elements, offsets, context_counts):
+        """Build data packets for equal runs of sample elements.
+
+        elements has one row per packet; offsets and context_counts give each
+        packet's first sample offset and the context packets sent before it.
+        """
+        settings = self.data_packet
+        count = elements.shape[0]
+        payload_bytes = elements.shape[1] * self.item_dtype.itemsize
+        dtype = self.data_dtype(payload_bytes)
+        packets = numpy.zeros(count, dtype)
+        header = (0x1 << 28) if settings.enable_stream_identifier else 0
+        if settings.enable_class_identifier:
+            header |= 1 << 27
+        if settings.enable_trailer:
+            header |= 1 << 26
+        if settings.embed_time_stamp:
+            header |= (1 << 22) | (2 << 20)
+        counts = (self.packet_count + numpy.arange(count, dtype=numpy.uint32)) & 0xF
+        packets['header'] = header | (counts << 16) | (dtype.itemsize // 4)
+        if settings.enable_stream_identifier:
+            packets['stream_id'] = self.stream_hash
+        if settings.enable_class_identifier:
+            packets['class_id'] = standard_class_id(self.format_bits)
+        if settings.embed_time_stamp:
+            packets['seconds'], packets['picoseconds'] = timestamps(self.twsec, self.tfsec, offsets, self.xdelta)
+        packets['payload'][:, :payload_bytes] = elements.astype(self.item_dtype, copy=False).view(numpy.uint8) \
+            .reshape(count, payload_bytes)
+        if settings.enable_trailer:
+            packets['trailer'] = 0x80 | (context_counts & 0x7F)
+        self.packet_count += count
+        return packets.view(numpy.uint8).reshape(count, dtype.itemsize)
+
+    def context_packet_bytes(self, offset):
+        """One IF context packet for the sample at offset, as SinkVITA49 fills it."""
+        settings = self.context_packet
+        keywords = self.keywords
+        words = []
+
+        def add64(value):
+            value &= 0xFFFFFFFFFFFFFFFF
+            words.extend((value >> 32, value & 0xFFFFFFFF))
+
+        header = (0x4 << 28) | ((self.context_count & 0xF) << 16)
+        if settings.enable_stream_identifier:
+            words.append((self.stream_hash + settings.stream_identifier_offset) & 0xFFFFFFFF)
+        if settings.enable_class_identifier:
+            header |= 1 << 27
+            if settings.class_identifier == 'DEFAULT':
+                words.extend(standard_class_id(self.format_bits))
+            else:
+                words.extend(parse_class_id(settings.class_identifier))
+        if settings.embed_time_stamp:
+            header |= (1 << 22) | (2 << 20)
+            seconds, picoseconds = timestamps(self.twsec, self.tfsec, numpy.array([offset]), self.xdelta)
+            words.append(int(seconds[0]))
+            add64(int(picoseconds[0]))
+
+        cif = (CIF_REFERENCE_POINT | CIF_BANDWIDTH | CIF_IF_FREQUENCY | CIF_RF_FREQUENCY | CIF_RF_OFFSET |
+               CIF_IF_BAND_OFFSET | CIF_REFERENCE_LEVEL | CIF_GAIN | CIF_OVER_RANGE_COUNT | CIF_SAMPLE_RATE |
+               CIF_TIMESTAMP_ADJUSTMENT | CIF_TIMESTAMP_CALIBRATION | CIF_TEMPERATURE | CIF_STATE_EVENT |
+               CIF_PAYLOAD_FORMAT)
+        if settings.enable_device_identifier:
+            cif |= CIF_DEVICE_ID
+        words.append(cif)
+        words.append(int(keywords.get('REFERENCE_POINT_IDENTIFIER', 0)) & 0xFFFFFFFF)
+        for name in ('COL_BW', 'COL_IF_FREQUENCY', 'COL_RF', 'COL_RF_OFFSET', 'COL_IF_FREQUENCY_OFFSET'):
+            add64(_fixed(keywords.get(name, 0.0), 20))
+        words.append(_fixed(keywords.get('COL_REFERENCE_LEVEL', 0.0), 7) & 0xFFFF)
+        words.append(((_fixed(keywords.get('DATA_GAIN', 0.0), 7) & 0xFFFF) << 16) |
+                     (_fixed(keywords.get('COL_GAIN', 0.0), 7) & 0xFFFF))
+        words.append(int(keywords.get('OVER_RANGE_SUM', 0)) & 0xFFFFFFFF)
+        add64(_fixed(1.0 / self.xdelta, 20))
+        add64(int(keywords.get('TIMESTAMP_ADJUSTMENT_PICOSECONDS', 0)))
+        words.append(int(keywords.get('TIMESTAMP_CALIBRATION', 0)) & 0xFFFFFFFF)
+        words.append(_fixed(keywords.get('TEMPERATURE', 0.0), 6) & 0xFFFF)
+        if settings.enable_device_identifier:
+            words.extend(parse_device_id(settings.device_identifier))
+        # Every indicator is enabled, as the component sets each one false first
+        state = 0xFF000000 | (int(keywords.get('USER_DEFINED', 0)) & 0xFF)
+        for name, bit in STATE_EVENT_KEYWORDS.items():
+            if keywords.get(name):
+                state |= 1 << bit
+        words.append(state)
+        add64(self.format_bits)
+
+        words.insert(0, header | (len(words) + 1))
+        self.context_count += 1
+        return numpy.array(words, '>u4').view(numpy.uint8)
+
+    def _context_points(self, offsets):
+        """Indices of the packets that context goes out ahead of."""
+        points = []
+        if not self.context_packet.enable or len(offsets) == 0:
+            return points
+        heartbeat = self.advanced.time_between_context_packets
+        times = offsets * self.xdelta
+        if self.context_pending:
+            points.append(0)
+            self.next_context = times[0] + heartbeat
+            self.context_pending = False
+        if heartbeat <= 0:
+            return points
+        if self.next_context is None:
+            self.next_context = times[0]
+        while True:
+            index = int(numpy.searchsorted(times, self.next_context))
+            if index >= len(times):
+                break
+            if not points or index > points[-1]:
+                points.append(index)
+            # Heartbeats keep their cadence unless the stream jumped a period ahead
+            if times[index] < self.next_context + heartbeat:
+                self.next_context += heartbeat
+            else:
+                self.next_context = times[index] + heartbeat
+        return points
+
+    def vrt_packets(self, elements):
+        """Data packets for the whole packets in elements, with their context.
+
+        Returns the packet bytes back to back, each packet's length, the sample
+        offset of each data packet (None for context) and the elements left
+        over.
+        """
+        per_packet = self.samples_per_packet * (2 if self.complex_samples else 1)
+        count = len(elements) // per_packet
+        used = count * per_packet
+        packets, lengths, offsets = self._build(elements[:used].reshape(count, per_packet), self.samples_per_packet)
+        return packets, lengths, offsets, elements[used:]
+
+    def _build(self, rows, samples_per_row):
+        count = rows.shape[0]
+        if count == 0:
+            return numpy.zeros(0, numpy.uint8), [], []
+        offsets = self.sample_offset + numpy.arange(count, dtype=numpy.float64) * samples_per_row
+        points = self._context_points(offsets)
+        contexts = []
+        context_counts = numpy.zeros(count, numpy.uint32)
+        for index in points:
+            contexts.append(self.context_packet_bytes(offsets[index]))
+            context_counts[index:] += 1
+        context_counts += self.context_count - len(points)
+        data = self.data_packets(rows, offsets, context_counts) if self.data_packet.enable else None
+        self.sample_offset += count * samples_per_row
+
+        pieces, lengths, packet_offsets = [], [], []
+        bounds = points + [count]
+        if not points or points[0] != 0:
+            bounds.insert(0, 0)
+            contexts.insert(0, None)
+        for context, start, end in zip(contexts, bounds[:-1], bounds[1:]):
+            if context is not None:
+                pieces.append(context)
+                lengths.append(len(context))
+                packet_offsets.append(None)
+            if data is not None and end > start:
+                pieces.append(data[start:end].reshape(-1))
+                lengths.extend([data.shape[1]] * (end - start))
+                packet_offsets.extend(offsets[start:end].tolist())
+        packets = numpy.concatenate(pieces) if pieces else numpy.zeros(0, numpy.uint8)
+        return packets, lengths, packet_offsets
+
+    # Framing ---------------------------------------------------------------------
+
+    def _frame_groups(self, lengths):
+        """Split packets into VRL frames; returns the packet count per frame."""
+        limit = self.encapsulation.max_frame_size
+        if limit <= 0:
+            return [1] * len(lengths)
+        groups = []
+        size = 0
+        for length in lengths:
+            if groups and size + length + VRL_TRAILER_SIZE <= limit:
+                groups[-1] += 1
+                size += length
+            else:
+                groups.append(1)
+                size = VRL_HEADER_SIZE + length
+        return groups
+
+    def frame(self, packets, lengths, out=None):
+        """Wrap packets in VRL frames (or not) and return (bytes, lengths)."""
+        if not self.encapsulation.enable_vrl_frames:
+            if out is None:
+                return packets, lengths
+            out[:len(packets)] = packets
+            return out, lengths
+        if not lengths:
+            return (out if out is not None else packets), []
+        groups = self._frame_groups(lengths)
+        bounds = numpy.concatenate(([0], numpy.cumsum(groups)))
+        packet_ends = numpy.concatenate(([0], numpy.cumsum(lengths, dtype=numpy.int64)))
+        bodies = packet_ends[bounds[1:]] - packet_ends[bounds[:-1]]
+        frame_lengths = bodies + VRL_HEADER_SIZE + VRL_TRAILER_SIZE
+        starts = numpy.concatenate(([0], numpy.cumsum(frame_lengths)[:-1]))
+        total = int(frame_lengths.sum())
+        if out is None:
+            out = numpy.empty(total, numpy.uint8)
+        elif len(out) < total:
+            raise PacketizerError('output buffer of %d bytes is short of %d' % (len(out), total))
+
+        # Everything but the frame headers and trailers is packet data, in order
+        body = numpy.ones(total, bool)
+        header_index = (starts[:, None] + numpy.arange(VRL_HEADER_SIZE)).reshape(-1)
+        trailer_index = (starts[:, None] + frame_lengths[:, None] - VRL_TRAILER_SIZE +
+                         numpy.arange(VRL_TRAILER_SIZE)).reshape(-1)
+        body[header_index] = False
+        body[trailer_index] = False
+        out[:total][body] = packets
+
+        words = out[:total].view('>u4')
+        first = starts // 4
+        counts = (self.frame_count + numpy.arange(len(groups), dtype=numpy.uint32)) & 0xFFF
+        words[first] = VRL_FAW
+        words[first + 1] = (counts << 20) | (frame_lengths // 4).astype(numpy.uint32)
+        last = first + frame_lengths // 4 - 1
+        self.frame_count += len(groups)
+        if self.encapsulation.enable_crc:
+            values = words.astype(numpy.uint32)
+            for length in numpy.unique(frame_lengths):
+                same = numpy.nonzero(frame_lengths == length)[0]
+                index = first[same][:, None] + numpy.arange(length // 4 - 1)
+                words[last[same]] = vrl_crc(values[index])
+        else:
+            words[last] = VRL_VEND
+        return out, frame_lengths.tolist()
+
+    def max_output_size(self, samples):
+        """Upper bound on the bytes packetize() produces for this many samples."""
+        per_packet = self.data_dtype(self.samples_per_packet * self.sample_size).itemsize
+        packets = samples // self.samples_per_packet + 2
+        return packets * (2 * per_packet + 2 * (VRL_HEADER_SIZE + VRL_TRAILER_SIZE) + 256)
+
+    def packetize(self, samples, final=False, out=None):
+        """Packetize samples, continuing the stream from the previous call.
+
+        Samples short of a full packet are held for the next call; final sends
+        them as a short packet, as the component does at end of stream.  When
+        out is given (a uint8 array of at least max_output_size() bytes) the
+        frames are written into it instead of a new array.
+        """
+        elements = self._setup(samples)
+        if self._leftover is not None and len(self._leftover):
+            elements = numpy.concatenate((self._leftover, elements))
+        start = self.sample_offset
+        packets, lengths, offsets, self._leftover = self.vrt_packets(elements)
+        if final and len(self._leftover):
+            per_sample = 2 if self.complex_samples else 1
+            tail = self._leftover
+            more, more_lengths, more_offsets = self._build(tail.reshape(1, -1), len(tail) // per_sample)
+            packets = numpy.concatenate((packets, more))
+            lengths = lengths + more_lengths
+            offsets = offsets + more_offsets
+            self._leftover = None
+        data, frame_lengths = self.frame(packets, lengths, out)
+
+        records = []
+        position = 0
+        if self.encapsulation.enable_vrl_frames:
+            groups = self._frame_groups(lengths)
+            index = 0
+            for group, length in zip(groups, frame_lengths):
+                times = [o for o in offsets[index:index + group] if o is not None]
+                records.append(Record(position, length, self._time(times[0]) if times else None))
+                position += length
+                index += group
+        else:
+            for length, offset in zip(lengths, offsets):
+                records.append(Record(position, length, self._time(offset) if offset is not None else None))
+                position += length
+        return Frames(data, records, self.sample_offset - start)
+
+    def _time(self, offset):
+        return self.twsec + self.tfsec + offset * self.xdelta
+
+
+###############################################################################
+# Output
+###############################################################################
+
+class StagingBuffer(object):
+    """Fixed buffer that packetizer output is written into before sending.
+
+    It stands in for vita49_replay.Capture, so the replay senders can send
+    straight from it.
+    """
+
+    def __init__(self, size):
+        self.buf = bytearray(size)
+        self.array = numpy.frombuffer(self.buf, numpy.uint8)
+
+    def address(self):
+        return self.array.ctypes.data
+
+
+class FileSender(object):
+    """Writes frames to a file as a TCP receiver of the sink would."""
+
+    def __init__(self, staging, path):
+        self.capture = staging
+        self.file = open(path, 'wb')
+        self.syscalls = 0
+
+    def send(self, records):
+        if records:
+            start = records[0].offset
+            end = records[-1].offset + records[-1].length
+            self.file.write(memoryview(self.capture.buf)[start:end])
+            self.syscalls += 1
+        return len(records)
+
+    def close(self):
+        self.file.close()
+
+
+def read_samples(path, dtype, complex_samples=False):
+    """Memory map a raw sample file; complex data is interleaved I/Q."""
+    dtype = numpy.dtype(dtype)
+    size = os.path.getsize(path)
+    if size < dtype.itemsize:
+        raise PacketizerError('%s holds no %s samples' % (path, dtype))
+    samples = numpy.memmap(path, dtype, 'r', shape=(size // dtype.itemsize,))
+    if complex_samples and dtype.kind != 'c':
+        samples = samples[:len(samples) & ~1]
+    return samples
+
+
+def stream(packetizer, samples, sender, staging, speed=1.0, batch=DEFAULT_BATCH, report_interval=0.0,
+           out=sys.stdout):
+    """Packetize samples batch by batch and send them at speed times the sample rate."""
+    per_sample = 2 if packetizer.complex_samples and numpy.asarray(samples).dtype.kind != 'c' else 1
+    chunk = packetizer.samples_per_packet * batch * per_sample
+    stats = Statistics()
+    stats.start = monotonic()
+    next_report = stats.start + report_interval if report_interval > 0 else None
+    first = packetizer.sample_offset
+    for begin in range(0, len(samples), chunk):
+        final = begin + chunk >= len(samples)
+        frames = packetizer.packetize(samples[begin:begin + chunk], final=final, out=staging.array)
+        if not frames.records:
+            continue
+        if speed > 0:
+            due = stats.start + (packetizer.sample_offset - frames.samples - first) * packetizer.xdelta / speed
+            now = monotonic()
+            if due > now:
+                time.sleep(due - now)
+            else:
+                stats.max_late = max(stats.max_late, now - due)
+        stats.packets += sender.send(frames.records)
+        stats.bytes += frames.nbytes
+        if next_report is not None and monotonic() >= next_report:
+            stats.end = monotonic()
+            stats.report(syscalls=sender.syscalls, out=out)
+            next_report += report_interval
+    stats.end = monotonic()
+    target = (packetizer.sample_offset - first) * packetizer.xdelta / speed if speed > 0 else None
+    stats.report(target=target, syscalls=sender.syscalls, out=out)
+    return stats
+
+
+def parse_keyword(text):
+    name, _, value = text.partition('=')
+    if not value:
+        raise argparse.ArgumentTypeError('keyword %r is not NAME=VALUE' % text)
+    if value.lower() in ('true', 'false'):
+        return name, value.lower() == 'true'
+    return name, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('samples', help='raw sample file')
+    parser.add_argument('--format', default='int16',
+                        choices=('int8', 'uint8', 'int16', 'uint16', 'float32', 'float64', 'complex64', 'complex128'),
+                        help='sample element type of the file')
+    parser.add_argument('--complex', action='store_true', help='the file holds interleaved I/Q of --format')
+    parser.add_argument('--sample-rate', type=float, required=True, help='samples per second')
+    parser.add_argument('--start-time', type=float, default=None, help='POSIX time of the first sample (default now)')
+    parser.add_argument('--stream-id', default='vita49_packetizer', help='BulkIO stream ID the stream hash comes from')
+    parser.add_argument('--keyword', type=parse_keyword, action='append', default=[],
+                        help='SRI keyword for the context packets, e.g. COL_RF=1e9 (repeatable)')
+    group = parser.add_argument_group('network_settings')
+    group.add_argument('--ip', default='127.0.0.1', help='destination address (TCP: address to listen on)')
+    group.add_argument('--port', type=int, default=12344)
+    group.add_argument('--protocol', choices=('udp', 'tcp'), default='udp',
+                       help='UDP unicast/multicast (chosen from the address) or TCP')
+    group.add_argument('--interface', default=None, help='local address of the multicast interface')
+    group.add_argument('--ttl', type=int, default=32)
+    group.add_argument('--output', default=None, help='write the stream to this file instead of the network')
+    group = parser.add_argument_group('VITA49Encapsulation')
+    group.add_argument('--crc', action='store_true', help='enable_crc')
+    group.add_argument('--no-vrl-frames', action='store_true', help='send bare VRT packets')
+    group.add_argument('--max-frame-size', type=int, default=0, help='pack packets into VRL frames up to this size')
+    group = parser.add_argument_group('VITA49IFDataPacket')
+    group.add_argument('--no-stream-identifier', action='store_true')
+    group.add_argument('--no-class-identifier', action='store_true')
+    group.add_argument('--no-time-stamp', action='store_true')
+    group.add_argument('--no-trailer', action='store_true')
+    group = parser.add_argument_group('VITA49IFContextPacket')
+    group.add_argument('--no-context', action='store_true', help='send data packets only')
+    group.add_argument('--stream-identifier-offset', type=int, default=0)
+    group.add_argument('--class-identifier', default='DEFAULT')
+    group.add_argument('--device-identifier', default='FF-FF-FA:1301')
+    group = parser.add_argument_group('advanced_configuration')
+    group.add_argument('--max-payload-size', type=int, default=1452)
+    group.add_argument('--endian', choices=('native', 'little', 'big'), default='native',
+                       help='endian_representation of the samples')
+    group.add_argument('--context-interval', type=int, default=1, help='time_between_context_packets (seconds)')
+    group.add_argument('--batch', type=int, default=DEFAULT_BATCH, help='transmit_batch_size: packets per send call')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='multiple of the sample rate to send at; 0 sends as fast as possible')
+    parser.add_argument('--report-interval', type=float, default=0.0, help='seconds between progress reports')
+    parser.add_argument('--no-sendmmsg', action='store_true', help='send one datagram per system call')
+    args = parser.parse_args(argv)
+
+    if args.speed < 0:
+        parser.error('--speed must not be negative')
+    if args.sample_rate <= 0:
+        parser.error('--sample-rate must be positive')
+    packetizer = Packetizer(
+        args.stream_id, sample_rate=args.sample_rate, start_time=args.start_time,
+        complex_samples=args.complex, keywords=dict(args.keyword),
+        encapsulation=VITA49Encapsulation(enable_crc=args.crc, enable_vrl_frames=not args.no_vrl_frames,
+                                          max_frame_size=args.max_frame_size),
+        data_packet=VITA49IFDataPacket(enable_stream_identifier=not args.no_stream_identifier,
+                                       enable_class_identifier=not args.no_class_identifier,
+                                       embed_time_stamp=not args.no_time_stamp,
+                                       enable_trailer=not args.no_trailer),
+        context_packet=VITA49IFContextPacket(enable=not args.no_context,
+                                             stream_identifier_offset=args.stream_identifier_offset,
+                                             class_identifier=args.class_identifier,
+                                             device_identifier=args.device_identifier),
+        advanced=AdvancedConfiguration(max_payload_size=args.max_payload_size,
+                                       endian_representation={'native': ENDIAN_NATIVE, 'little': ENDIAN_LITTLE,
+                                                              'big': ENDIAN_BIG}[args.endian],
+                                       time_between_context_packets=args.context_interval,
+                                       transmit_batch_size=args.batch))
+    try:
+        samples = read_samples(args.samples, args.format, args.complex)
+        packetizer._setup(samples[:0])
+    except (PacketizerError, IOError, OSError) as ex:
+        print('error: %s' % ex, file=sys.stderr)
+        return 1
+
+    staging = StagingBuffer(packetizer.max_output_size(packetizer.samples_per_packet * args.batch))
+    print('%s: %d samples, %d per packet' % (args.samples, len(samples) // (2 if args.complex else 1),
+                                             packetizer.samples_per_packet))
+    try:
+        if args.output:
+            sender = FileSender(staging, args.output)
+        elif args.protocol == 'tcp':
+            print('waiting for a TCP client on %s:%d' % (args.ip, args.port))
+            sender = TcpSender(staging, args.ip, args.port)
+        else:
+            sender = UdpSender(staging, args.ip, args.port, interface=args.interface, ttl=args.ttl,
+                               batch=args.batch, use_sendmmsg=not args.no_sendmmsg)
+        try:
+            stream(packetizer, samples, sender, staging, speed=args.speed, batch=args.batch,
+                   report_interval=args.report_interval)
+        finally:
+            sender.close()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
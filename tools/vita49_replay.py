@@ -0,0 +1,586 @@
+#!/usr/bin/env python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK.
+#
+# REDHAWK is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# REDHAWK is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+"""Replay captured rh.SinkVITA49 output without a REDHAWK domain.
+
+The capture may be either a raw byte stream (what a TCP receiver of the sink
+writes to disk: back-to-back VRL frames, or bare VRT packets when VRL framing
+is disabled) or a libpcap file of the sink's UDP traffic.  Every VRL frame (or
+bare VRT packet) is replayed as one datagram, exactly as SinkVITA49 sends it.
+
+Pacing follows the VRT data packet timestamps by default, scaled by --speed.
+--speed 0 sends as fast as possible.  Datagrams are handed to the kernel in
+batches with sendmmsg(2) where available, and the capture is memory mapped
+and prefaulted before the clock starts so the tool is not the bottleneck.
+
+Examples:
+    vita49_replay.py capture.vrl --ip 127.0.0.1 --port 12344
+    vita49_replay.py capture.pcap --ip 239.1.1.1 --port 12344 --speed 2
+    vita49_replay.py capture.vrl --protocol tcp --ip 0.0.0.0 --port 12344 --speed 0
+"""
+
+from __future__ import print_function, division
+
+import argparse
+import ctypes
+import errno
+import mmap
+import os
+import socket
+import struct
+import sys
+import time
+
+# Pacing clock; immune to NTP steps and slews where Python provides one
+monotonic = getattr(time, 'monotonic', time.time)
+
+VRL_FAW = 0x56524C50            # 'VRLP' frame alignment word
+VRL_HEADER_SIZE = 8
+
+PCAP_MAGIC_US = 0xA1B2C3D4
+PCAP_MAGIC_NS = 0xA1B23C4D
+PCAP_GLOBAL_HEADER_SIZE = 24
+PCAP_RECORD_HEADER_SIZE = 16
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+
+ETH_P_IP = 0x0800
+ETH_P_8021Q = 0x8100
+IPPROTO_UDP = 17
+
+# Multicast range used by SinkVITA49 to decide between multicast and unicast
+LOW_MULTI = struct.unpack('!I', socket.inet_aton('224.0.0.1'))[0]
+HIGH_MULTI = struct.unpack('!I', socket.inet_aton('239.255.255.250'))[0]
+
+DEFAULT_BATCH = 32
+DEFAULT_WINDOW = 0.001
+PAGE_SIZE = mmap.PAGESIZE
+
+
+class CaptureError(Exception):
+    pass
+
+
+class Record(object):
+    """One datagram worth of capture: a VRL frame or a bare VRT packet."""
+    __slots__ = ('offset', 'length', 'timestamp')
+
+    def __init__(self, offset, length, timestamp):
+        self.offset = offset
+        self.length = length
+        self.timestamp = timestamp
+
+
+###############################################################################
+# VRT/VRL parsing
+###############################################################################
+
+def vrt_packet_time(buf, offset):
+    """Return the timestamp (seconds) of the VRT data packet at offset.
+
+    Context packets and packets without a real-time timestamp return None, so
+    pacing is driven by the data stream only.
+    """
+    header, = struct.unpack_from('!I', buf, offset)
+    packet_type = header >> 28
+    if packet_type not in (0, 1, 2, 3):
+        return None
+    tsi = (header >> 22) & 0x3
+    tsf = (header >> 20) & 0x3
+    if tsi == 0 and tsf != 2:
+        return None
+    pos = offset + 4
+    if packet_type in (1, 3):
+        pos += 4
+    if header & 0x08000000:
+        pos += 8
+    seconds = 0.0
+    if tsi != 0:
+        seconds = float(struct.unpack_from('!I', buf, pos)[0])
+        pos += 4
+    if tsf == 2:
+        seconds += struct.unpack_from('!Q', buf, pos)[0] * 1e-12
+    return seconds
+
+
+def vrl_frame_time(buf, offset, length):
+    """Return the timestamp of the first timestamped VRT data packet in a frame."""
+    pos = offset + VRL_HEADER_SIZE
+    end = offset + length - 4
+    while pos + 4 <= end:
+        words = struct.unpack_from('!I', buf, pos)[0] & 0xFFFF
+        if words == 0:
+            break
+        t = vrt_packet_time(buf, pos)
+        if t is not None:
+            return t
+        pos += words * 4
+    return None
+
+
+def index_stream(buf, start=0, end=None):
+    """Index a raw byte stream of VRL frames or bare VRT packets."""
+    if end is None:
+        end = len(buf)
+    records = []
+    pos = start
+    if end - pos < 4:
+        return records
+    framed = struct.unpack_from('!I', buf, pos)[0] == VRL_FAW
+    while pos + 4 <= end:
+        if framed:
+            if pos + VRL_HEADER_SIZE > end:
+                break
+            faw, word = struct.unpack_from('!II', buf, pos)
+            if faw != VRL_FAW:
+                raise CaptureError('lost VRL frame alignment at byte %d' % pos)
+            length = (word & 0x000FFFFF) * 4
+            if length < VRL_HEADER_SIZE + 4 or pos + length > end:
+                break
+            records.append(Record(pos, length, vrl_frame_time(buf, pos, length)))
+        else:
+            length = (struct.unpack_from('!I', buf, pos)[0] & 0xFFFF) * 4
+            if length == 0 or pos + length > end:
+                break
+            records.append(Record(pos, length, vrt_packet_time(buf, pos)))
+        pos += length
+    return records
+
+
+def _udp_payload(buf, pos, caplen, linktype):
+    """Return (offset, length) of the UDP payload in a pcap record, or None."""
+    end = pos + caplen
+    if linktype == LINKTYPE_ETHERNET:
+        if caplen < 14:
+            return None
+        ethertype, = struct.unpack_from('!H', buf, pos + 12)
+        pos += 14
+        while ethertype == ETH_P_8021Q and pos + 4 <= end:
+            ethertype, = struct.unpack_from('!H', buf, pos + 2)
+            pos += 4
+        if ethertype != ETH_P_IP:
+            return None
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if caplen < 16 or struct.unpack_from('!H', buf, pos + 14)[0] != ETH_P_IP:
+            return None
+        pos += 16
+    elif linktype != LINKTYPE_RAW:
+        return None
+    if pos + 20 > end:
+        return None
+    version_ihl = struct.unpack_from('!B', buf, pos)[0]
+    if version_ihl >> 4 != 4 or struct.unpack_from('!B', buf, pos + 9)[0] != IPPROTO_UDP:
+        return None
+    # Only first fragments carry the UDP header
+    if struct.unpack_from('!H', buf, pos + 6)[0] & 0x1FFF:
+        return None
+    pos += (version_ihl & 0xF) * 4
+    if pos + 8 > end:
+        return None
+    udp_length, = struct.unpack_from('!H', buf, pos + 4)
+    pos += 8
+    length = min(udp_length - 8, end - pos)
+    if length <= 0:
+        return None
+    return pos, length
+
+
+def index_pcap(buf):
+    """Index the UDP payloads of a libpcap capture."""
+    magic_le, = struct.unpack_from('<I', buf, 0)
+    if magic_le in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+        endian = '<'
+    else:
+        endian = '>'
+    linktype, = struct.unpack_from(endian + 'I', buf, 20)
+    records = []
+    pos = PCAP_GLOBAL_HEADER_SIZE
+    while pos + PCAP_RECORD_HEADER_SIZE <= len(buf):
+        _, _, caplen, _ = struct.unpack_from(endian + 'IIII', buf, pos)
+        pos += PCAP_RECORD_HEADER_SIZE
+        if pos + caplen > len(buf):
+            break
+        payload = _udp_payload(buf, pos, caplen, linktype)
+        if payload is not None:
+            offset, length = payload
+            if length >= 4 and struct.unpack_from('!I', buf, offset)[0] == VRL_FAW:
+                t = vrl_frame_time(buf, offset, length)
+            else:
+                t = vrt_packet_time(buf, offset)
+            records.append(Record(offset, length, t))
+        pos += caplen
+    return records
+
+
+def is_pcap(buf):
+    if len(buf) < PCAP_GLOBAL_HEADER_SIZE:
+        return False
+    return (struct.unpack_from('<I', buf, 0)[0] in (PCAP_MAGIC_US, PCAP_MAGIC_NS) or
+            struct.unpack_from('>I', buf, 0)[0] in (PCAP_MAGIC_US, PCAP_MAGIC_NS))
+
+
+###############################################################################
+# Capture loading
+###############################################################################
+
+class Capture(object):
+    """A memory mapped capture file and the index of its datagrams."""
+
+    def __init__(self, path, preload=True):
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            self._file.close()
+            raise CaptureError('%s is empty' % path)
+        # A private writable mapping lets ctypes take the buffer address for
+        # sendmmsg without ever writing back to the file.
+        flags = mmap.MAP_PRIVATE | getattr(mmap, 'MAP_POPULATE', 0)
+        self.buf = mmap.mmap(self._file.fileno(), size, flags=flags,
+                             prot=mmap.PROT_READ | mmap.PROT_WRITE)
+        if preload:
+            self.preload()
+        if is_pcap(self.buf):
+            self.records = index_pcap(self.buf)
+        else:
+            self.records = index_stream(self.buf)
+        if not self.records:
+            self.close()
+            raise CaptureError('no VRL frames or VRT packets found in %s' % path)
+        self._address = None
+
+    def preload(self):
+        """Fault in every page of the capture before replay starts."""
+        if hasattr(self.buf, 'madvise'):
+            self.buf.madvise(mmap.MADV_WILLNEED)
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                self.buf.madvise(mmap.MADV_SEQUENTIAL)
+        touched = 0
+        for pos in range(0, len(self.buf), PAGE_SIZE):
+            touched ^= ord(self.buf[pos:pos + 1])
+        return touched
+
+    def address(self):
+        """Base address of the mapping, for building iovecs."""
+        if self._address is None:
+            self._anchor = ctypes.c_char.from_buffer(self.buf)
+            self._address = ctypes.addressof(self._anchor)
+        return self._address
+
+    def close(self):
+        self._anchor = None
+        self._address = None
+        if self.buf is not None:
+            self.buf.close()
+            self.buf = None
+        self._file.close()
+
+
+###############################################################################
+# Senders
+###############################################################################
+
+class _iovec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+
+class _msghdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p), ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(_iovec)), ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p), ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+
+class _mmsghdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _msghdr), ('msg_len', ctypes.c_uint)]
+
+
+def _load_sendmmsg():
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        func = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.POINTER(_mmsghdr), ctypes.c_uint, ctypes.c_int]
+    func.restype = ctypes.c_int
+    return func
+
+
+class UdpSender(object):
+    """Connected UDP socket that sends a batch of datagrams per system call."""
+
+    def __init__(self, capture, ip, port, interface=None, ttl=32, batch=DEFAULT_BATCH, use_sendmmsg=True):
+        self.capture = capture
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 16 * 1024 * 1024)
+        ip_value = struct.unpack('!I', socket.inet_aton(ip))[0]
+        self.multicast = LOW_MULTI < ip_value < HIGH_MULTI
+        if self.multicast:
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+            if interface:
+                self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+        else:
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, ttl)
+        self.sock.connect((ip, port))
+        self._sendmmsg = _load_sendmmsg() if use_sendmmsg else None
+        self._batch = max(1, batch)
+        if self._sendmmsg is not None:
+            self._iov = (_iovec * self._batch)()
+            self._msgs = (_mmsghdr * self._batch)()
+            for i in range(self._batch):
+                self._msgs[i].msg_hdr.msg_iov = ctypes.pointer(self._iov[i])
+                self._msgs[i].msg_hdr.msg_iovlen = 1
+            self._base = capture.address()
+        self.syscalls = 0
+
+    def send(self, records):
+        if self._sendmmsg is None:
+            return self._send_each(records)
+        sent = 0
+        count = len(records)
+        while sent < count:
+            chunk = min(self._batch, count - sent)
+            for i in range(chunk):
+                record = records[sent + i]
+                self._iov[i].iov_base = self._base + record.offset
+                self._iov[i].iov_len = record.length
+            result = self._sendmmsg(self.sock.fileno(), self._msgs, chunk, 0)
+            self.syscalls += 1
+            if result < 0:
+                err = ctypes.get_errno()
+                if err in (errno.EINTR, errno.EAGAIN, errno.ENOBUFS):
+                    continue
+                # ECONNREFUSED is reported for an earlier datagram that hit a
+                # closed port; the receiver may simply not be up yet.
+                if err == errno.ECONNREFUSED:
+                    continue
+                raise socket.error(err, os.strerror(err))
+            sent += result
+        return sent
+
+    def _send_each(self, records):
+        buf = self.capture.buf
+        for record in records:
+            try:
+                self.sock.send(buf[record.offset:record.offset + record.length])
+            except socket.error as ex:
+                if ex.errno != errno.ECONNREFUSED:
+                    raise
+            self.syscalls += 1
+        return len(records)
+
+    def close(self):
+        self.sock.close()
+
+
+class TcpSender(object):
+    """TCP server socket, like SinkVITA49, that streams to one accepted client."""
+
+    def __init__(self, capture, ip, port, accept_timeout=None):
+        self.capture = capture
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((ip, port))
+        self.server.listen(1)
+        self.server.settimeout(accept_timeout)
+        self.sock, _ = self.server.accept()
+        self.sock.settimeout(None)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.syscalls = 0
+
+    def send(self, records):
+        buf = self.capture.buf
+        view = memoryview(buf)
+        try:
+            # Consecutive records of a raw stream capture are contiguous, so a
+            # whole batch normally goes out as one slice of the mapping.
+            start = records[0].offset
+            end = start
+            pieces = []
+            for record in records:
+                if record.offset != end:
+                    pieces.append(view[start:end])
+                    start = record.offset
+                end = record.offset + record.length
+            pieces.append(view[start:end])
+            if len(pieces) == 1:
+                self.sock.sendall(pieces[0])
+            else:
+                self.sock.sendall(b''.join(pieces))
+            self.syscalls += 1
+            del pieces
+        finally:
+            if hasattr(view, 'release'):
+                view.release()
+        return len(records)
+
+    def close(self):
+        self.sock.close()
+        self.server.close()
+
+
+###############################################################################
+# Replay
+###############################################################################
+
+def schedule(records, speed, max_gap=1.0):
+    """Return the send offset (seconds from start) for every record.
+
+    Timestamps that go backwards or jump more than max_gap (a stream restart
+    or a retune) start a new segment instead of stalling the replay.
+    """
+    offsets = []
+    elapsed = 0.0
+    previous = None
+    for record in records:
+        t = record.timestamp
+        if t is not None and previous is not None:
+            delta = t - previous
+            if 0.0 <= delta <= max_gap:
+                elapsed += delta
+        if t is not None:
+            previous = t
+        offsets.append(elapsed / speed if speed > 0 else 0.0)
+    return offsets
+
+
+class Statistics(object):
+
+    def __init__(self):
+        self.packets = 0
+        self.bytes = 0
+        self.max_late = 0.0
+        self.start = None
+        self.end = None
+
+    def report(self, target=None, syscalls=0, out=sys.stdout):
+        elapsed = max((self.end or monotonic()) - (self.start or monotonic()), 1e-9)
+        pps = self.packets / elapsed
+        mbps = self.bytes * 8 / elapsed / 1e6
+        print('sent %d packets, %d bytes in %.3f s' % (self.packets, self.bytes, elapsed), file=out)
+        print('achieved %.1f packets/s, %.3f Mbit/s' % (pps, mbps), file=out)
+        if syscalls:
+            print('%.1f packets per system call' % (self.packets / syscalls), file=out)
+        if target:
+            print('target duration %.3f s (%.1f%% of target rate), max send lateness %.3f ms' %
+                  (target, 100.0 * target / elapsed, self.max_late * 1e3), file=out)
+
+
+def replay(capture, sender, speed=1.0, batch=DEFAULT_BATCH, window=DEFAULT_WINDOW, loops=1,
+           max_gap=1.0, report_interval=0.0, out=sys.stdout):
+    """Send every record of the capture, paced by its schedule.
+
+    Packets due within `window` seconds of the first packet of a batch are sent
+    together with it; the sink itself emits a burst of packets per BulkIO push,
+    so this does not change the observable rate but lets them share a system
+    call.
+    """
+    records = capture.records
+    offsets = schedule(records, speed, max_gap)
+    # A loop lasts one mean record gap past its last record, so the next loop's
+    # first record is not due at the same moment as this loop's last one
+    span = offsets[-1] * len(offsets) / (len(offsets) - 1) if len(offsets) > 1 else 0.0
+    stats = Statistics()
+    stats.start = monotonic()
+    next_report = stats.start + report_interval if report_interval > 0 else None
+    loop = 0
+    while loops <= 0 or loop < loops:
+        loop_start = stats.start + loop * span if speed > 0 else monotonic()
+        i = 0
+        count = len(records)
+        while i < count:
+            due = loop_start + offsets[i]
+            j = i + 1
+            while j < count and j - i < batch and offsets[j] - offsets[i] <= window:
+                j += 1
+            if speed > 0:
+                now = monotonic()
+                if due > now:
+                    time.sleep(due - now)
+                else:
+                    stats.max_late = max(stats.max_late, now - due)
+            chunk = records[i:j]
+            stats.packets += sender.send(chunk)
+            stats.bytes += sum(r.length for r in chunk)
+            i = j
+            if next_report is not None and monotonic() >= next_report:
+                stats.end = monotonic()
+                stats.report(syscalls=sender.syscalls, out=out)
+                next_report += report_interval
+        loop += 1
+    stats.end = monotonic()
+    target = span * loops if speed > 0 and loops > 0 else None
+    stats.report(target=target, syscalls=sender.syscalls, out=out)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('capture', help='raw VRL/VRT stream or pcap file')
+    parser.add_argument('--ip', default='127.0.0.1', help='destination address (TCP: address to listen on)')
+    parser.add_argument('--port', type=int, default=12344)
+    parser.add_argument('--protocol', choices=('udp', 'tcp'), default='udp',
+                        help='UDP unicast/multicast (chosen from the address) or TCP')
+    parser.add_argument('--interface', default=None, help='local address of the multicast interface')
+    parser.add_argument('--ttl', type=int, default=32)
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='multiple of the timestamp-derived rate; 0 sends as fast as possible')
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH, help='packets per send call')
+    parser.add_argument('--window', type=float, default=DEFAULT_WINDOW,
+                        help='packets due within this many seconds share a send call')
+    parser.add_argument('--loops', type=int, default=1, help='number of passes over the capture; 0 repeats forever')
+    parser.add_argument('--max-gap', type=float, default=1.0,
+                        help='timestamp jumps larger than this (seconds) are not waited out')
+    parser.add_argument('--report-interval', type=float, default=0.0, help='seconds between progress reports')
+    parser.add_argument('--no-sendmmsg', action='store_true', help='send one datagram per system call')
+    parser.add_argument('--no-preload', action='store_true', help='do not prefault the capture before replay')
+    args = parser.parse_args(argv)
+
+    if args.speed < 0:
+        parser.error('--speed must not be negative')
+    try:
+        capture = Capture(args.capture, preload=not args.no_preload)
+    except (CaptureError, IOError, OSError) as ex:
+        print('error: %s' % ex, file=sys.stderr)
+        return 1
+
+    print('%s: %d packets, %d bytes' % (args.capture, len(capture.records),
+                                        sum(r.length for r in capture.records)))
+    try:
+        if args.protocol == 'tcp':
+            print('waiting for a TCP client on %s:%d' % (args.ip, args.port))
+            sender = TcpSender(capture, args.ip, args.port)
+        else:
+            sender = UdpSender(capture, args.ip, args.port, interface=args.interface, ttl=args.ttl,
+                               batch=args.batch, use_sendmmsg=not args.no_sendmmsg)
+        try:
+            replay(capture, sender, speed=args.speed, batch=args.batch, window=args.window, loops=args.loops,
+                   max_gap=args.max_gap, report_interval=args.report_interval)
+        finally:
+            sender.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        capture.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())